@@ -3,14 +3,117 @@ API Client - Replaces Direct MySQL Connection
 Fetches data from your friend's backend API instead of direct database access
 """
 import requests
-import pandas as pd
+from requests.adapters import HTTPAdapter
 from datetime import datetime, timedelta
+import json
 import time
+import hashlib
+import uuid
+import random
+import threading
+from collections import OrderedDict
+
+from config import (
+    API_BULK_ROUTES_PER_REQUEST,
+    API_BULK_PREDICTIONS_PER_REQUEST,
+    API_PREDICTION_PAGE_SIZE,
+    API_CACHE_DIR,
+    API_CONNECT_TIMEOUT,
+    API_READ_TIMEOUT,
+    API_MAX_ATTEMPTS,
+    API_BACKOFF_BASE_SECONDS,
+    API_BACKOFF_MAX_SECONDS,
+    API_POOL_SIZE,
+    API_POOL_TIMEOUT,
+    API_LAST_GOOD_MAX_ENTRIES,
+    DATA_BACKEND,
+    LOCAL_DB_FILE
+)
+from LocalDataClient import LocalDataClient
+from response_cache import ResponseCache, cache_key, cache_ttl
+from single_flight import SingleFlight
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from prediction_writer import PredictionsRejectedError
+
+# pandas is imported inside the volume methods, so route lookups start without it
+
+def backoff_delay(attempt):
+    """Random delay before retry number attempt + 1 (exponential backoff, full jitter)"""
+    return random.uniform(0, min(API_BACKOFF_MAX_SECONDS, API_BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+def is_backend_failure(error):
+    """True for errors that mean the backend is unhealthy (not 4xx responses or local pool waits)"""
+    if isinstance(error, CircuitOpenError):
+        return True
+    if isinstance(error, PoolTimeoutError):
+        return False
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        return error.response.status_code >= 500
+    return isinstance(error, requests.exceptions.RequestException)
+
+def serves_stale(error):
+    """True for errors a stale response may stand in for (backend failures and local pool waits)"""
+    return is_backend_failure(error) or isinstance(error, PoolTimeoutError)
+
+
+class PoolTimeoutError(requests.exceptions.ConnectionError):
+    """No pooled backend connection became free in time"""
+
+
+class PooledAdapter(HTTPAdapter):
+    """HTTPAdapter with a fixed-size keep-alive pool that counts waits for a free connection"""
+    
+    def __init__(self, pool_size=API_POOL_SIZE, pool_timeout=API_POOL_TIMEOUT):
+        """
+        Args:
+            pool_size: Maximum open connections per host
+            pool_timeout: Seconds to wait for a free connection
+        """
+        super().__init__(pool_maxsize=pool_size, pool_block=True)
+        self.pool_size = pool_size
+        self.pool_timeout = pool_timeout
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._lock = threading.Lock()
+        
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.timeouts = 0
+    
+    def send(self, request, stream=False, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            start = time.monotonic()
+            acquired = self._slots.acquire(timeout=self.pool_timeout)
+            with self._lock:
+                self.waits += 1
+                self.wait_seconds += time.monotonic() - start
+                if not acquired:
+                    self.timeouts += 1
+            if not acquired:
+                raise PoolTimeoutError(f"No free backend connection after {self.pool_timeout}s")
+        
+        try:
+            response = super().send(request, stream=stream, **kwargs)
+            # Read the body here, so the connection is back in the pool when the slot is
+            if not stream:
+                response.content
+            return response
+        finally:
+            self._slots.release()
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'pool_size': self.pool_size,
+                'pool_waits': self.waits,
+                'pool_wait_seconds': round(self.wait_seconds, 3),
+                'pool_timeouts': self.timeouts
+            }
+
 
 class APIClient:
     """Client for accessing backend API instead of direct MySQL"""
     
-    def __init__(self, base_url='http://localhost:8000/analytics_api.php'):
+    def __init__(self, base_url='http://localhost:8000/analytics_api.php', verbose=True, cache=None):
         """
         Initialize API client
         
@@ -18,57 +121,275 @@ class APIClient:
             base_url: Base URL of the PHP backend API
                      Default: http://localhost:8000/analytics_api.php
                      You can change this to match your setup
+            verbose: Print initialization messages (default True)
+            cache: ResponseCache for GET responses (optional, disabled if None)
         """
         self.base_url = base_url.rstrip('/')
-        self.session = requests.Session()
-        self.session.headers.update({
-            'Content-Type': 'application/json',
-            'Accept': 'application/json'
-        })
-        print(f"✓ API Client initialized")
-        print(f"  Base URL: {self.base_url}")
+        self.cache = cache
+        
+        # requests.Session is not guaranteed thread-safe, so each thread gets its
+        # own; they share one adapter, whose connection pool is
+        self._adapter = PooledAdapter()
+        self._local = threading.local()
+        
+        # Concurrent identical GETs share one upstream call
+        self.single_flight = SingleFlight()
+        
+        # One circuit breaker per backend action
+        self._breakers = {}
+        self._lock = threading.Lock()
+        
+        # Last good body of each cacheable GET (with when it was fetched and a hash
+        # of it), for failures and cached_version without a response cache
+        self._last_good = OrderedDict()
+        
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.stale_served = 0
+        
+        if verbose:
+            print(f"✓ API Client initialized")
+            print(f"  Base URL: {self.base_url}")
+            if cache is not None:
+                print(f"  Response cache: {cache.path}")
+    
+    def _session(self):
+        """Get the session owned by the current thread"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update({
+                'Content-Type': 'application/json',
+                'Accept': 'application/json'
+            })
+            session.mount('http://', self._adapter)
+            session.mount('https://', self._adapter)
+            self._local.session = session
+        return session
     
-    def _make_request(self, endpoint, method='GET', params=None, data=None, retry=3):
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+    
+    def _breaker(self, action):
+        """Get the circuit breaker of a backend action"""
+        with self._lock:
+            breaker = self._breakers.get(action)
+            if breaker is None:
+                breaker = self._breakers[action] = CircuitBreaker()
+            return breaker
+    
+    def _send(self, url, method='GET', params=None, data=None, retry=API_MAX_ATTEMPTS, headers=None,
+              idempotent=None):
         """
-        Make HTTP request with retry logic
+        Send an HTTP request, retrying with jittered exponential backoff
+        
+        Connection errors, timeouts and 5xx responses are retried; 4xx
+        responses are raised at once, since retrying cannot fix them. Waiting
+        too long for a free pooled connection is raised at once as well, and
+        does not count against the backend's circuit. A read
+        timeout is only retried for idempotent requests: the backend may have
+        applied the request before it timed out. The request fails fast while
+        the action's circuit is open.
         
         Args:
-            endpoint: API endpoint (e.g., '/routes/118/volume')
+            url: Full request URL
             method: HTTP method (GET, POST, etc.)
             params: Query parameters
             data: Request body data
-            retry: Number of retries on failure
+            retry: Number of attempts
+            headers: Extra request headers (optional)
+            idempotent: Whether resending is safe (default: GET only)
         
         Returns:
-            Response JSON or raises exception
+            requests.Response (status 2xx or 304) or raises exception
         """
-        url = f"{self.base_url}{endpoint}"
+        if method not in ('GET', 'POST'):
+            raise ValueError(f"Unsupported method: {method}")
+        
+        action = (params or {}).get('action', '')
+        breaker = self._breaker(action)
+        if not breaker.allow():
+            raise CircuitOpenError(f"Backend action '{action}' is failing; retrying in at most "
+                                   f"{breaker.reset_seconds:.0f}s")
+        
+        if idempotent is None:
+            idempotent = method == 'GET'
+        
+        self._count('requests')
+        session = self._session()
+        timeout = (API_CONNECT_TIMEOUT, API_READ_TIMEOUT)
         
         for attempt in range(retry):
             try:
                 if method == 'GET':
-                    response = self.session.get(url, params=params, timeout=30)
-                elif method == 'POST':
-                    response = self.session.post(url, json=data, params=params, timeout=30)
+                    response = session.get(url, params=params, headers=headers, timeout=timeout)
                 else:
-                    raise ValueError(f"Unsupported method: {method}")
+                    response = session.post(url, json=data, params=params, headers=headers, timeout=timeout)
                 
                 # Raise exception for bad status codes
                 response.raise_for_status()
                 
-                return response.json()
+                breaker.record_success()
+                return response
             
-            except requests.exceptions.Timeout:
-                print(f"⚠️  Timeout on attempt {attempt + 1}/{retry}")
-                if attempt == retry - 1:
-                    raise
-                time.sleep(1)
+            except PoolTimeoutError:
+                # This process is out of connections; retrying would only queue again
+                breaker.record_skipped()
+                self._count('failures')
+                raise
             
             except requests.exceptions.RequestException as e:
-                print(f"⚠️  Request failed on attempt {attempt + 1}/{retry}: {e}")
-                if attempt == retry - 1:
+                if not is_backend_failure(e):
+                    breaker.record_success()
                     raise
-                time.sleep(1)
+                
+                if isinstance(e, requests.exceptions.Timeout):
+                    print(f"⚠️  Timeout on attempt {attempt + 1}/{retry}")
+                else:
+                    print(f"⚠️  Request failed on attempt {attempt + 1}/{retry}: {e}")
+                
+                if attempt == retry - 1 or (isinstance(e, requests.exceptions.ReadTimeout) and not idempotent):
+                    self._count('failures')
+                    breaker.record_failure()
+                    raise
+                
+                self._count('retries')
+                time.sleep(backoff_delay(attempt))
+            
+            except Exception:
+                breaker.record_failure()
+                raise
+    
+    def _make_request(self, endpoint, method='GET', params=None, data=None, retry=API_MAX_ATTEMPTS,
+                      idempotent=None):
+        """
+        Make HTTP request with retry logic, served from the response cache when possible
+        
+        Concurrent identical GET requests are coalesced into one upstream call.
+        
+        Args:
+            endpoint: API endpoint (e.g., '/routes/118/volume')
+            method: HTTP method (GET, POST, etc.)
+            params: Query parameters
+            data: Request body data
+            retry: Number of attempts
+            idempotent: Whether resending is safe (default: GET only)
+        
+        Returns:
+            Response JSON or raises exception
+        """
+        url = f"{self.base_url}{endpoint}"
+        
+        if method != 'GET':
+            return self._send(url, method, params, data, retry, idempotent=idempotent).json()
+        
+        return self.single_flight.do((url, cache_key(params)), lambda: self._get(url, params, retry))
+    
+    def _get(self, url, params, retry):
+        """
+        Fetch a GET response, through the response cache if it is enabled
+        
+        While the backend is failing (or no pooled connection is free), a
+        stale cached response is returned instead of the error.
+        """
+        ttl = cache_ttl(params)
+        if ttl == 0:
+            return self._send(url, 'GET', params, retry=retry).json()
+        if self.cache is None:
+            return self._get_last_good(url, params, retry)
+        
+        key = cache_key(params)
+        cached = self.cache.get(key)
+        
+        if cached is not None and cached['fresh']:
+            return cached['body']
+        
+        # Stale entries are revalidated with the ETag instead of refetched
+        headers = None
+        if cached is not None and cached['etag']:
+            headers = {'If-None-Match': cached['etag']}
+        
+        try:
+            response = self._send(url, 'GET', params, retry=retry, headers=headers)
+        except Exception as e:
+            if cached is None or not serves_stale(e):
+                raise
+            self._count('stale_served')
+            print(f"⚠️  Serving stale {params.get('action')} response: {e}")
+            return cached['body']
+        
+        if response.status_code == 304 and cached is not None:
+            self.cache.revalidated(key, ttl)
+            return cached['body']
+        
+        body = response.json()
+        self.cache.put(key, params.get('action'), body, response.headers.get('ETag'), ttl)
+        return body
+    
+    def _get_last_good(self, url, params, retry):
+        """
+        Fetch a cacheable GET response when the response cache is disabled
+        
+        The last good response of each request is kept in memory (as text, so
+        callers cannot modify it) and returned while the backend is failing.
+        """
+        key = cache_key(params)
+        
+        try:
+            response = self._send(url, 'GET', params, retry=retry)
+        except Exception as e:
+            with self._lock:
+                entry = self._last_good.get(key)
+            if entry is None or not serves_stale(e):
+                raise
+            self._count('stale_served')
+            print(f"⚠️  Serving last good {params.get('action')} response: {e}")
+            return json.loads(entry[0])
+        
+        body = response.json()
+        version = hashlib.sha256(response.content).hexdigest()[:32]
+        with self._lock:
+            self._last_good[key] = (response.text, time.time(), version)
+            self._last_good.move_to_end(key)
+            while len(self._last_good) > API_LAST_GOOD_MAX_ENTRIES:
+                self._last_good.popitem(last=False)
+        return body
+    
+    def cached_version(self, action, **params):
+        """
+        Version of the cached response to a GET action, without calling the backend
+        
+        Lets a caller tell whether data it derived from the response can still
+        be current, e.g. to answer a conditional request with 304.
+        
+        Args:
+            action: API action
+            **params: The action's other query parameters, as the getter sends them
+        
+        Returns:
+            Version string while the response is within its API_CACHE_TTL,
+            otherwise None (the next request for it goes to the backend)
+        """
+        params = dict(params, action=action)
+        ttl = cache_ttl(params)
+        if ttl == 0:
+            return None
+        
+        key = cache_key(params)
+        if self.cache is not None:
+            return self.cache.fresh_version(key)
+        
+        with self._lock:
+            entry = self._last_good.get(key)
+        if entry is None:
+            return None
+        
+        _, fetched_at, version = entry
+        if ttl is not None and time.time() - fetched_at >= ttl:
+            return None
+        return version
     
     # ==================== ROUTE QUERIES ====================
     
@@ -154,6 +475,8 @@ class APIClient:
         Returns:
             DataFrame with aggregated volume data
         """
+        import pandas as pd
+
         try:
             params = {
                 'action': 'volume_by_route',
@@ -176,6 +499,56 @@ class APIClient:
             print(f"✗ Error fetching bus volume: {e}")
             return pd.DataFrame()
     
+    def get_bus_volume_by_routes(self, service_nos, months=None, directions=(1,), failed=None):
+        """
+        Get aggregated bus volume for several routes in as few requests as possible
+        
+        API endpoint: GET /analytics_api.php?action=volume_by_routes&service_nos={a,b}&months={m1,m2}&directions={1,2}
+        
+        Args:
+            service_nos: List of route service numbers
+            months: List of months in YYYYMM format, None for all months
+            directions: Route directions (default: direction 1 only)
+            failed: List that service numbers whose request failed are appended
+                    to (optional); they also map to an empty DataFrame, so only
+                    this tells them apart from routes without data
+        
+        Returns:
+            Dict mapping route service number to a DataFrame of its volume data
+            (with a 'direction' column); routes without data map to an empty DataFrame
+        """
+        import pandas as pd
+
+        service_nos = [str(s) for s in service_nos]
+        volume = {service_no: pd.DataFrame() for service_no in service_nos}
+        
+        for start in range(0, len(service_nos), API_BULK_ROUTES_PER_REQUEST):
+            chunk = service_nos[start:start + API_BULK_ROUTES_PER_REQUEST]
+            
+            try:
+                params = {
+                    'action': 'volume_by_routes',
+                    'service_nos': ','.join(chunk),
+                    'directions': ','.join(str(d) for d in directions)
+                }
+                
+                if months:
+                    params['months'] = ','.join(str(m) for m in months)
+                
+                data = self._make_request('', params=params)
+                routes = data.get('routes', {}) if isinstance(data, dict) else {}
+                
+                for service_no, rows in routes.items():
+                    if rows:
+                        volume[str(service_no)] = pd.DataFrame(rows)
+            
+            except Exception as e:
+                print(f"✗ Error fetching bus volume for routes {chunk}: {e}")
+                if failed is not None:
+                    failed.extend(chunk)
+        
+        return volume
+    
     def get_bus_volume_by_stop(self, stop_id, month=None):
         """
         Get bus volume for a specific stop
@@ -189,6 +562,8 @@ class APIClient:
         Returns:
             DataFrame with volume data
         """
+        import pandas as pd
+
         try:
             params = {
                 'action': 'volume_by_stop',
@@ -293,6 +668,70 @@ class APIClient:
             print(f"✗ Error saving prediction: {e}")
             return None
     
+    def save_predictions(self, predictions, batch_id=None):
+        """
+        Save many predictions via backend API
+        
+        API endpoint: POST /analytics_api.php?action=save_predictions
+        
+        Each request is stored in one database transaction together with its
+        batch key, and the backend ignores a key it has already stored, so a
+        request that timed out can be resent without saving its rows twice.
+        
+        Args:
+            predictions: List of dicts with the save_prediction fields
+                         (route_id, prediction_datetime, predicted_passengers,
+                         confidence, is_peak, model_version)
+            batch_id: Idempotency key of the batch (default: a new one); pass
+                      the same key when resending a batch
+        
+        Returns:
+            Number of predictions saved, or None if a request failed
+        
+        Raises:
+            PredictionsRejectedError: The backend rejected a request as invalid
+                                      (4xx), so resending it cannot succeed
+        """
+        rows = [
+            dict(p, prediction_datetime=p['prediction_datetime'].isoformat())
+            if isinstance(p.get('prediction_datetime'), datetime) else p
+            for p in predictions
+        ]
+        batch_id = batch_id or uuid.uuid4().hex
+        saved = 0
+        
+        for start in range(0, len(rows), API_BULK_PREDICTIONS_PER_REQUEST):
+            chunk = rows[start:start + API_BULK_PREDICTIONS_PER_REQUEST]
+            data = {'batch_id': f"{batch_id}-{start // API_BULK_PREDICTIONS_PER_REQUEST}", 'predictions': chunk}
+            
+            try:
+                response = self._make_request(
+                    '', method='POST', params={'action': 'save_predictions'}, data=data, idempotent=True
+                )
+                
+                if not response or not response.get('success'):
+                    print(f"⚠️  Failed to save predictions: {(response or {}).get('error', 'Unknown error')}")
+                    return None
+                saved += response.get('inserted', len(chunk))
+            
+            except requests.exceptions.HTTPError as e:
+                if is_backend_failure(e):
+                    print(f"✗ Error saving predictions: {e}")
+                    return None
+                
+                try:
+                    reason = e.response.json().get('error', e.response.reason)
+                except ValueError:
+                    reason = e.response.reason
+                print(f"✗ Predictions rejected by backend: {reason}")
+                raise PredictionsRejectedError(f"{e.response.status_code}: {reason}") from e
+            
+            except Exception as e:
+                print(f"✗ Error saving predictions: {e}")
+                return None
+        
+        return saved
+    
     def get_predictions(self, route_id=None, start_date=None, end_date=None, limit=100):
         """
         Retrieve predictions from backend API
@@ -328,6 +767,90 @@ class APIClient:
             print(f"✗ Error fetching predictions: {e}")
             return []
     
+    def get_prediction_page(self, route_id=None, start_date=None, end_date=None, cursor=None,
+                            limit=API_PREDICTION_PAGE_SIZE, order='desc'):
+        """
+        Retrieve one page of predictions, paginated by keyset cursor
+        
+        API endpoint: GET /analytics_api.php?action=get_predictions&cursor=...&limit=...&order=...
+        
+        Args:
+            route_id: Filter by route (optional)
+            start_date: Start datetime (optional)
+            end_date: End datetime (optional)
+            cursor: next_cursor of the previous page (None for the first page)
+            limit: Page size (the backend caps it at 1000)
+            order: 'desc' (newest first) or 'asc' by prediction_datetime
+        
+        Returns:
+            Dict with 'predictions' and 'next_cursor' (None on the last page)
+        
+        Raises:
+            Exception: If the request fails, so an export is never silently truncated
+        """
+        params = {
+            'action': 'get_predictions',
+            'cursor': cursor or '',
+            'limit': limit,
+            'order': order
+        }
+        
+        if route_id:
+            params['route_id'] = route_id
+        if start_date:
+            params['start_date'] = start_date.isoformat() if isinstance(start_date, datetime) else start_date
+        if end_date:
+            params['end_date'] = end_date.isoformat() if isinstance(end_date, datetime) else end_date
+        
+        response = self._make_request('', params=params)
+        if not isinstance(response, dict) or 'predictions' not in response:
+            raise ValueError(f"Unexpected get_predictions response: {response}")
+        return response
+    
+    def iter_prediction_pages(self, route_id=None, start_date=None, end_date=None,
+                              page_size=API_PREDICTION_PAGE_SIZE, order='desc'):
+        """
+        Lazily yield every matching prediction, one page at a time
+        
+        Each page is fetched only when the previous one has been consumed, so
+        any window can be read with constant memory.
+        
+        Args:
+            route_id: Filter by route (optional)
+            start_date: Start datetime (optional)
+            end_date: End datetime (optional)
+            page_size: Predictions per request
+            order: 'desc' (newest first) or 'asc' by prediction_datetime
+        
+        Yields:
+            Lists of predictions
+        """
+        cursor = None
+        while True:
+            page = self.get_prediction_page(route_id, start_date, end_date, cursor, page_size, order)
+            if page['predictions']:
+                yield page['predictions']
+            cursor = page.get('next_cursor')
+            if not cursor:
+                return
+    
+    def count_predictions(self):
+        """
+        Count the predictions stored by the backend
+        
+        API endpoint: GET /analytics_api.php?action=prediction_count
+        
+        Returns:
+            Number of stored predictions, or None if the backend can't be reached
+        """
+        try:
+            response = self._make_request('', params={'action': 'prediction_count'})
+            return int(response['count'])
+        
+        except Exception as e:
+            print(f"✗ Error counting predictions: {e}")
+            return None
+    
     # ==================== UTILITY FUNCTIONS ====================
     
     def test_connection(self):
@@ -378,30 +901,80 @@ class APIClient:
                 'error': str(e)
             }
     
+    def get_cache_stats(self):
+        """
+        Get response cache counters
+        
+        Returns:
+            Dict with hit/miss counters, or {'enabled': False} without a cache
+        """
+        if self.cache is None:
+            return {'enabled': False}
+        return self.cache.stats()
+    
+    def get_request_stats(self):
+        """
+        Get request coalescing, transport and circuit breaker counters
+        
+        Returns:
+            Dict with 'coalescing' (GET calls, calls that ran, calls coalesced
+            into them), 'transport' (requests, retries, failures, stale
+            responses served, breaker trips and fail-fast rejections, pool
+            waits) and the state of each action's 'circuit_breakers'
+        """
+        with self._lock:
+            breakers = {action: breaker.stats() for action, breaker in self._breakers.items()}
+            transport = {
+                'requests': self.requests,
+                'retries': self.retries,
+                'failures': self.failures,
+                'stale_served': self.stale_served
+            }
+        
+        transport['breaker_trips'] = sum(b['trips'] for b in breakers.values())
+        transport['short_circuited'] = sum(b['rejected'] for b in breakers.values())
+        transport.update(self._adapter.stats())
+        
+        return {
+            'coalescing': self.single_flight.stats(),
+            'transport': transport,
+            'circuit_breakers': breakers
+        }
+    
     def close(self):
-        """Close session"""
-        self.session.close()
+        """Close pooled connections (sessions reconnect on next use)"""
+        self._adapter.close()
         print("✓ API client session closed")
 
 
 # ==================== SINGLETON INSTANCE ====================
 
 _api_client = None
+_api_client_lock = threading.Lock()
 
 def get_api_client(base_url='http://localhost:8000/analytics_api.php'):
     """
     Get or create the API client singleton
     
+    Returns a LocalDataClient instead when DATA_BACKEND is 'local' in config.
+    The response cache is enabled when API_CACHE_DIR is set in config.
+    
     Args:
         base_url: Base URL of backend API (default: http://localhost:8000/analytics_api.php)
                  Change this to match your PHP server setup
     
     Returns:
-        APIClient instance
+        APIClient or LocalDataClient instance
     """
     global _api_client
     if _api_client is None:
-        _api_client = APIClient(base_url)
+        with _api_client_lock:
+            if _api_client is None:
+                if DATA_BACKEND == 'local':
+                    _api_client = LocalDataClient(LOCAL_DB_FILE)
+                else:
+                    cache = ResponseCache(API_CACHE_DIR) if API_CACHE_DIR else None
+                    _api_client = APIClient(base_url, cache=cache)
     return _api_client
 
 
@@ -9,7 +9,11 @@
 header('Content-Type: application/json');
 header('Access-Control-Allow-Origin: *');
 header('Access-Control-Allow-Methods: GET, POST, OPTIONS');
-header('Access-Control-Allow-Headers: Content-Type');
+header('Access-Control-Allow-Headers: Content-Type, If-None-Match');
+header('Access-Control-Expose-Headers: ETag');
+
+// Buffer the response so GET results can be tagged with an ETag
+ob_start();
 
 // Database configuration
 define('DB_HOST', '127.0.0.1');
@@ -18,6 +22,24 @@ define('DB_NAME', 'yourtrip_db');
 define('DB_USER', 'inf2003-sqldev');
 define('DB_PASS', 'Inf2003#DevSecure!2025');
 
+// Maximum number of routes accepted by one volume_by_routes request
+define('MAX_BULK_ROUTES', 100);
+
+// Maximum number of predictions accepted by one save_predictions request,
+// and rows per multi-row INSERT statement
+define('MAX_BULK_PREDICTIONS', 1000);
+define('PREDICTION_INSERT_ROWS', 250);
+
+// Maximum page size of a paginated get_predictions request
+define('MAX_PREDICTION_PAGE_SIZE', 1000);
+
+/**
+ * Split a comma-separated query parameter into a list of non-empty values
+ */
+function parseListParam($value) {
+    return array_values(array_filter(array_map('trim', explode(',', (string)$value)), 'strlen'));
+}
+
 /**
  * Get PDO database connection
  */
@@ -93,6 +115,24 @@ try {
             echo json_encode(getVolumeByRoute($pdo, $serviceNo, $month, $direction));
             break;
 
+        case 'volume_by_routes':
+            $serviceNos = parseListParam($_GET['service_nos'] ?? '');
+            $months = parseListParam($_GET['months'] ?? '');
+            $directions = parseListParam($_GET['directions'] ?? '1');
+            
+            if (!$serviceNos) {
+                http_response_code(400);
+                echo json_encode(['error' => 'Missing service_nos parameter']);
+                break;
+            }
+            if (count($serviceNos) > MAX_BULK_ROUTES) {
+                http_response_code(400);
+                echo json_encode(['error' => 'Too many routes requested (max ' . MAX_BULK_ROUTES . ')']);
+                break;
+            }
+            echo json_encode(getVolumeByRoutes($pdo, $serviceNos, $months, $directions));
+            break;
+
         case 'volume_by_stop':
             $stopId = $_GET['stop_id'] ?? null;
             $month = $_GET['month'] ?? null;
@@ -125,23 +165,46 @@ try {
             echo json_encode(savePrediction($pdo, $data));
             break;
 
+        case 'save_predictions':
+            if ($_SERVER['REQUEST_METHOD'] !== 'POST') {
+                http_response_code(405);
+                echo json_encode(['error' => 'Method not allowed. Use POST.']);
+                break;
+            }
+            
+            $data = json_decode(file_get_contents('php://input'), true);
+            echo json_encode(savePredictions($pdo, $data['predictions'] ?? null, $data['batch_id'] ?? null));
+            break;
+
         case 'get_predictions':
             $routeId = $_GET['route_id'] ?? null;
             $startDate = $_GET['start_date'] ?? null;
             $endDate = $_GET['end_date'] ?? null;
             $limit = isset($_GET['limit']) ? (int)$_GET['limit'] : 100;
             
+            // A cursor parameter (empty for the first page) selects keyset pagination
+            if (isset($_GET['cursor'])) {
+                $order = $_GET['order'] ?? 'desc';
+                echo json_encode(getPredictionPage($pdo, $routeId, $startDate, $endDate, $_GET['cursor'], $limit, $order));
+                break;
+            }
+            
             echo json_encode(getPredictions($pdo, $routeId, $startDate, $endDate, $limit));
             break;
 
+        case 'prediction_count':
+            echo json_encode(countPredictions($pdo));
+            break;
+
         default:
             http_response_code(400);
             echo json_encode([
                 'error' => 'Invalid action parameter',
                 'available_actions' => [
                     'health', 'info', 'routes', 'route_details', 'route_stops',
-                    'volume_by_route', 'volume_by_stop', 'available_months', 
-                    'data_date_range', 'save_prediction', 'get_predictions'
+                    'volume_by_route', 'volume_by_routes', 'volume_by_stop', 'available_months', 
+                    'data_date_range', 'save_prediction', 'save_predictions', 'get_predictions',
+                    'prediction_count'
                 ]
             ]);
     }
@@ -151,6 +214,33 @@ try {
     echo json_encode(['error' => 'Server error: ' . $e->getMessage()]);
 }
 
+sendWithETag(ob_get_clean());
+
+/**
+ * Send a buffered response body, answering If-None-Match with 304 Not Modified
+ * Clients that cached the body can revalidate it without downloading it again
+ */
+function sendWithETag($body) {
+    if ($_SERVER['REQUEST_METHOD'] !== 'GET' || http_response_code() !== 200) {
+        echo $body;
+        return;
+    }
+    
+    $etag = '"' . md5($body) . '"';
+    header('ETag: ' . $etag);
+    header('Cache-Control: no-cache');
+    
+    $ifNoneMatch = $_SERVER['HTTP_IF_NONE_MATCH'] ?? '';
+    foreach (explode(',', $ifNoneMatch) as $candidate) {
+        if (trim(preg_replace('/^W\//', '', trim($candidate))) === $etag) {
+            http_response_code(304);
+            return;
+        }
+    }
+    
+    echo $body;
+}
+
 // ==================== FUNCTION IMPLEMENTATIONS ====================
 
 /**
@@ -204,7 +294,11 @@ function getAPIInfo($pdo) {
             'health' => 'GET /analytics_api.php?action=health',
             'routes' => 'GET /analytics_api.php?action=routes',
             'volume_by_route' => 'GET /analytics_api.php?action=volume_by_route&service_no=118&month=202107',
-            'save_prediction' => 'POST /analytics_api.php?action=save_prediction'
+            'volume_by_routes' => 'GET /analytics_api.php?action=volume_by_routes&service_nos=118,10&months=202107,202108&directions=1',
+            'save_prediction' => 'POST /analytics_api.php?action=save_prediction',
+            'save_predictions' => 'POST /analytics_api.php?action=save_predictions',
+            'get_predictions' => 'GET /analytics_api.php?action=get_predictions&route_id=118&start_date=2025-11-01&cursor=&limit=500',
+            'prediction_count' => 'GET /analytics_api.php?action=prediction_count'
         ]
     ];
 }
@@ -360,6 +454,64 @@ function getVolumeByRoute($pdo, $serviceNo, $month = null, $direction = 1) {
     return $data;
 }
 
+/**
+ * Get aggregated bus volume for several routes, months and directions at once
+ * Runs the BusVolume/Routes join a single time and groups the rows by route
+ */
+function getVolumeByRoutes($pdo, $serviceNos, $months = [], $directions = [1]) {
+    $routePlaceholders = implode(',', array_fill(0, count($serviceNos), '?'));
+    $directionPlaceholders = implode(',', array_fill(0, count($directions), '?'));
+    
+    $query = "
+        SELECT 
+            r.ServiceNo,
+            r.Direction,
+            bv.day,
+            bv.hour,
+            bv.month,
+            SUM(bv.vol_in) as total_passengers,
+            COUNT(DISTINCT bv.stop_id) as num_stops
+        FROM BusVolume bv
+        INNER JOIN Routes r ON bv.stop_id = r.BusStopCode
+        WHERE r.ServiceNo IN ($routePlaceholders)
+            AND r.Direction IN ($directionPlaceholders)
+    ";
+    $params = array_merge($serviceNos, $directions);
+    
+    if ($months) {
+        $monthPlaceholders = implode(',', array_fill(0, count($months), '?'));
+        $query .= " AND bv.month IN ($monthPlaceholders)";
+        $params = array_merge($params, $months);
+    }
+    
+    $query .= "
+        GROUP BY r.ServiceNo, r.Direction, bv.day, bv.hour, bv.month
+        ORDER BY r.ServiceNo, r.Direction, bv.month, bv.day, bv.hour
+    ";
+    
+    $stmt = $pdo->prepare($query);
+    $stmt->execute($params);
+    
+    // Every requested route is present, even when it has no volume data
+    $routes = [];
+    foreach ($serviceNos as $serviceNo) {
+        $routes[$serviceNo] = [];
+    }
+    
+    while ($row = $stmt->fetch()) {
+        $routes[$row['ServiceNo']][] = [
+            'direction' => (int)$row['Direction'],
+            'day' => $row['day'],
+            'hour' => (int)$row['hour'],
+            'month' => (int)$row['month'],
+            'total_passengers' => (int)$row['total_passengers'],
+            'num_stops' => (int)$row['num_stops']
+        ];
+    }
+    
+    return ['routes' => (object)$routes];
+}
+
 /**
  * Get bus volume for a specific stop
  */
@@ -435,6 +587,20 @@ function getDataDateRange($pdo) {
     ];
 }
 
+/**
+ * Create the table of saved save_predictions batch keys if it is missing
+ * (DDL commits implicitly in MySQL, so this runs outside the transaction)
+ */
+function ensurePredictionBatchTable($pdo) {
+    $pdo->exec("
+        CREATE TABLE IF NOT EXISTS PredictionBatches (
+            batch_id VARCHAR(64) NOT NULL PRIMARY KEY,
+            inserted INT NOT NULL,
+            created_at DATETIME NOT NULL
+        )
+    ");
+}
+
 /**
  * Save a prediction to database
  */
@@ -469,6 +635,115 @@ function savePrediction($pdo, $data) {
     }
 }
 
+/**
+ * Save many predictions with multi-row INSERTs in one transaction
+ * Either every row is stored or none is, so a failed batch can be resent as a whole
+ */
+function savePredictions($pdo, $rows, $batchId = null) {
+    if (!is_array($rows) || count($rows) === 0) {
+        http_response_code(400);
+        return ['success' => false, 'error' => 'predictions must be a non-empty list'];
+    }
+    
+    if ($batchId !== null && (!is_string($batchId) || $batchId === '' || strlen($batchId) > 64)) {
+        http_response_code(400);
+        return ['success' => false, 'error' => 'batch_id must be a string of at most 64 characters'];
+    }
+    
+    if (count($rows) > MAX_BULK_PREDICTIONS) {
+        http_response_code(413);
+        return ['success' => false, 'error' => 'Too many predictions (max ' . MAX_BULK_PREDICTIONS . ')'];
+    }
+    
+    $required = ['route_id', 'prediction_datetime', 'predicted_passengers', 'confidence'];
+    foreach ($rows as $index => $row) {
+        foreach ($required as $field) {
+            if (!isset($row[$field])) {
+                http_response_code(400);
+                return ['success' => false, 'error' => "Prediction $index is missing $field"];
+            }
+        }
+    }
+    
+    try {
+        if ($batchId !== null) {
+            ensurePredictionBatchTable($pdo);
+        }
+        
+        $pdo->beginTransaction();
+        
+        // The batch key commits with the rows, so a resent batch finds its key
+        // and is acknowledged without inserting the rows a second time
+        if ($batchId !== null) {
+            $stmt = $pdo->prepare("INSERT IGNORE INTO PredictionBatches (batch_id, inserted, created_at) VALUES (?, ?, NOW())");
+            $stmt->execute([$batchId, count($rows)]);
+            
+            if ($stmt->rowCount() === 0) {
+                $pdo->rollBack();
+                return [
+                    'success' => true,
+                    'inserted' => count($rows),
+                    'duplicate' => true,
+                    'message' => 'Batch already saved'
+                ];
+            }
+        }
+        
+        foreach (array_chunk($rows, PREDICTION_INSERT_ROWS) as $chunk) {
+            $placeholders = implode(', ', array_fill(0, count($chunk), '(?, ?, ?, ?, ?, ?, NOW())'));
+            $stmt = $pdo->prepare("
+                INSERT INTO Predictions 
+                (route_id, prediction_datetime, predicted_passengers, confidence, is_peak, model_version, created_at)
+                VALUES $placeholders
+            ");
+            
+            $params = [];
+            foreach ($chunk as $row) {
+                $params[] = $row['route_id'];
+                $params[] = $row['prediction_datetime'];
+                $params[] = $row['predicted_passengers'];
+                $params[] = $row['confidence'];
+                $params[] = !empty($row['is_peak']) ? 1 : 0;
+                $params[] = $row['model_version'] ?? 'v1.0';
+            }
+            $stmt->execute($params);
+        }
+        
+        $pdo->commit();
+        
+        return [
+            'success' => true,
+            'inserted' => count($rows),
+            'message' => 'Predictions saved successfully'
+        ];
+    } catch (Exception $e) {
+        if ($pdo->inTransaction()) {
+            $pdo->rollBack();
+        }
+        http_response_code(500);
+        return [
+            'success' => false,
+            'error' => $e->getMessage()
+        ];
+    }
+}
+
+/**
+ * Convert a Predictions row to its JSON representation
+ */
+function formatPrediction($row) {
+    return [
+        'prediction_id' => (int)$row['prediction_id'],
+        'route_id' => $row['route_id'],
+        'prediction_datetime' => $row['prediction_datetime'],
+        'predicted_passengers' => (int)$row['predicted_passengers'],
+        'confidence' => (float)$row['confidence'],
+        'is_peak' => (bool)$row['is_peak'],
+        'model_version' => $row['model_version'],
+        'created_at' => $row['created_at']
+    ];
+}
+
 /**
  * Get predictions from database
  */
@@ -499,18 +774,114 @@ function getPredictions($pdo, $routeId = null, $startDate = null, $endDate = nul
 
     $predictions = [];
     while ($row = $stmt->fetch()) {
-        $predictions[] = [
-            'prediction_id' => (int)$row['prediction_id'],
-            'route_id' => $row['route_id'],
-            'prediction_datetime' => $row['prediction_datetime'],
-            'predicted_passengers' => (int)$row['predicted_passengers'],
-            'confidence' => (float)$row['confidence'],
-            'is_peak' => (bool)$row['is_peak'],
-            'model_version' => $row['model_version'],
-            'created_at' => $row['created_at']
-        ];
+        $predictions[] = formatPrediction($row);
     }
 
     return $predictions;
 }
+
+/**
+ * Count stored predictions
+ */
+function countPredictions($pdo) {
+    $stmt = $pdo->query("SELECT COUNT(*) as count FROM Predictions");
+    return ['count' => (int)$stmt->fetch()['count']];
+}
+
+/**
+ * Encode the position after a prediction as an opaque page cursor
+ */
+function encodePredictionCursor($datetime, $id) {
+    return strtr(base64_encode($datetime . '|' . $id), '+/', '-_');
+}
+
+/**
+ * Decode a page cursor into [prediction_datetime, id], or null if it is invalid
+ */
+function decodePredictionCursor($cursor) {
+    $decoded = base64_decode(strtr($cursor, '-_', '+/'), true);
+    if ($decoded === false) {
+        return null;
+    }
+    
+    $parts = explode('|', $decoded);
+    if (count($parts) !== 2 || !ctype_digit($parts[1])) {
+        return null;
+    }
+    
+    return [$parts[0], (int)$parts[1]];
+}
+
+/**
+ * Get one page of predictions, using keyset pagination on (prediction_datetime, id)
+ * Each page is an index range scan that starts after the previous page's last row,
+ * so late pages cost the same as the first and rows inserted meanwhile are not skipped
+ * or repeated. An empty cursor starts at the first page; next_cursor is null on the last.
+ */
+function getPredictionPage($pdo, $routeId = null, $startDate = null, $endDate = null,
+                           $cursor = '', $limit = 100, $order = 'desc') {
+    if ($order !== 'asc' && $order !== 'desc') {
+        http_response_code(400);
+        return ['error' => 'order must be asc or desc'];
+    }
+    
+    $limit = max(1, min((int)$limit, MAX_PREDICTION_PAGE_SIZE));
+    
+    $query = "SELECT id as prediction_id, route_id, prediction_datetime, predicted_passengers, confidence, is_peak, model_version, created_at FROM Predictions WHERE 1=1";
+    $params = [];
+
+    if ($routeId) {
+        $query .= " AND route_id = ?";
+        $params[] = $routeId;
+    }
+
+    if ($startDate) {
+        $query .= " AND prediction_datetime >= ?";
+        $params[] = $startDate;
+    }
+
+    if ($endDate) {
+        $query .= " AND prediction_datetime <= ?";
+        $params[] = $endDate;
+    }
+    
+    if ($cursor !== '') {
+        $position = decodePredictionCursor($cursor);
+        if ($position === null) {
+            http_response_code(400);
+            return ['error' => 'Invalid cursor'];
+        }
+        
+        // Written out instead of a row comparison so MySQL uses the index range
+        $op = $order === 'asc' ? '>' : '<';
+        $query .= " AND (prediction_datetime $op ? OR (prediction_datetime = ? AND id $op ?))";
+        $params[] = $position[0];
+        $params[] = $position[0];
+        $params[] = $position[1];
+    }
+
+    // One extra row tells whether another page follows
+    $direction = strtoupper($order);
+    $query .= " ORDER BY prediction_datetime $direction, id $direction LIMIT " . ($limit + 1);
+
+    $stmt = $pdo->prepare($query);
+    $stmt->execute($params);
+
+    $predictions = [];
+    $nextCursor = null;
+    while ($row = $stmt->fetch()) {
+        if (count($predictions) === $limit) {
+            $last = end($predictions);
+            $nextCursor = encodePredictionCursor($last['prediction_datetime'], $last['prediction_id']);
+            break;
+        }
+        $predictions[] = formatPrediction($row);
+    }
+
+    return [
+        'predictions' => $predictions,
+        'next_cursor' => $nextCursor,
+        'limit' => $limit
+    ];
+}
 ?>
\ No newline at end of file
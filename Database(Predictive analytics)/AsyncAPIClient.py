@@ -0,0 +1,223 @@
+"""
+Async API Client - Concurrent Fan-Out over the Backend API
+Same method surface as APIClient, awaitable, with bounded concurrency and
+gather-style bulk helpers for fetching many routes and months at once
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from APIClient import APIClient
+from config import API_BASE_URL, API_MAX_CONCURRENCY, API_BULK_ROUTES_PER_REQUEST, API_PREDICTION_PAGE_SIZE
+
+
+class AsyncAPIClient:
+    """Asyncio wrapper that runs APIClient calls concurrently on a bounded worker pool"""
+
+    def __init__(self, base_url=API_BASE_URL, max_concurrency=API_MAX_CONCURRENCY, cache=None):
+        """
+        Initialize async API client
+
+        Args:
+            base_url: Base URL of the PHP backend API
+            max_concurrency: Maximum number of requests in flight at once
+            cache: ResponseCache for GET responses (optional)
+        """
+        self.base_url = base_url.rstrip('/')
+        self.max_concurrency = max_concurrency
+        self.cache = cache
+
+        # APIClient is thread-safe, and sharing one lets concurrent identical
+        # requests from different workers coalesce
+        self._api_client = APIClient(self.base_url, verbose=False, cache=cache)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency,
+            thread_name_prefix='async-api'
+        )
+        print(f"✓ Async API Client initialized (max {max_concurrency} concurrent requests)")
+
+    def _client(self):
+        """Get the APIClient shared by the worker threads"""
+        return self._api_client
+
+    async def _call(self, method_name, *args, **kwargs):
+        """Run an APIClient method on the worker pool"""
+        def run():
+            return getattr(self._client(), method_name)(*args, **kwargs)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, run)
+
+    # ==================== ROUTE QUERIES ====================
+
+    async def get_all_routes(self):
+        """Async version of APIClient.get_all_routes"""
+        return await self._call('get_all_routes')
+
+    async def get_route_details(self, service_no):
+        """Async version of APIClient.get_route_details"""
+        return await self._call('get_route_details', service_no)
+
+    async def get_route_stops(self, service_no, direction=1):
+        """Async version of APIClient.get_route_stops"""
+        return await self._call('get_route_stops', service_no, direction)
+
+    # ==================== BUS VOLUME QUERIES ====================
+
+    async def get_bus_volume_by_route(self, service_no, month=None, direction=1):
+        """Async version of APIClient.get_bus_volume_by_route"""
+        return await self._call('get_bus_volume_by_route', service_no, month, direction)
+
+    async def get_bus_volume_by_routes(self, service_nos, months=None, directions=(1,), failed=None):
+        """Async version of APIClient.get_bus_volume_by_routes"""
+        return await self._call('get_bus_volume_by_routes', service_nos, months, directions, failed)
+
+    async def get_bus_volume_by_stop(self, stop_id, month=None):
+        """Async version of APIClient.get_bus_volume_by_stop"""
+        return await self._call('get_bus_volume_by_stop', stop_id, month)
+
+    async def get_available_months(self):
+        """Async version of APIClient.get_available_months"""
+        return await self._call('get_available_months')
+
+    async def get_data_date_range(self):
+        """Async version of APIClient.get_data_date_range"""
+        return await self._call('get_data_date_range')
+
+    # ==================== PREDICTION STORAGE ====================
+
+    async def save_prediction(self, route_id, prediction_datetime, predicted_passengers,
+                              confidence, is_peak, model_version='v1.0'):
+        """Async version of APIClient.save_prediction"""
+        return await self._call(
+            'save_prediction', route_id, prediction_datetime, predicted_passengers,
+            confidence, is_peak, model_version
+        )
+
+    async def save_predictions(self, predictions, batch_id=None):
+        """Async version of APIClient.save_predictions"""
+        return await self._call('save_predictions', predictions, batch_id)
+
+    async def get_predictions(self, route_id=None, start_date=None, end_date=None, limit=100):
+        """Async version of APIClient.get_predictions"""
+        return await self._call('get_predictions', route_id, start_date, end_date, limit)
+
+    async def get_prediction_page(self, route_id=None, start_date=None, end_date=None, cursor=None,
+                                  limit=API_PREDICTION_PAGE_SIZE, order='desc'):
+        """Async version of APIClient.get_prediction_page"""
+        return await self._call('get_prediction_page', route_id, start_date, end_date, cursor, limit, order)
+
+    async def count_predictions(self):
+        """Async version of APIClient.count_predictions"""
+        return await self._call('count_predictions')
+
+    # ==================== UTILITY FUNCTIONS ====================
+
+    async def test_connection(self):
+        """Async version of APIClient.test_connection"""
+        return await self._call('test_connection')
+
+    async def get_api_info(self):
+        """Async version of APIClient.get_api_info"""
+        return await self._call('get_api_info')
+
+    # ==================== BULK HELPERS ====================
+
+    async def gather(self, *coros):
+        """
+        Await several calls concurrently
+
+        At most max_concurrency requests are in flight; the rest queue on the pool.
+
+        Returns:
+            List of results in the same order as coros
+        """
+        return await asyncio.gather(*coros)
+
+    async def get_bus_volume_slices(self, routes, months, direction=1, failed=None):
+        """
+        Fetch the volume of every (route, month) pair concurrently
+
+        Each month is one bulk volume_by_routes request per chunk of routes,
+        and all of those requests run at the same time.
+
+        Args:
+            routes: List of route IDs
+            months: List of months in YYYYMM format
+            direction: Route direction (default 1)
+            failed: List that (route_id, month) pairs whose request failed are
+                    appended to (optional)
+
+        Returns:
+            Dict mapping (route_id, month) to a volume DataFrame
+        """
+        chunk_size = API_BULK_ROUTES_PER_REQUEST
+        chunks = [routes[i:i + chunk_size] for i in range(0, len(routes), chunk_size)]
+        batches = [(chunk, month) for month in months for chunk in chunks]
+
+        failures = [[] for _ in batches]
+        responses = await self.gather(*[
+            self.get_bus_volume_by_routes(chunk, [month], (direction,), batch_failed)
+            for (chunk, month), batch_failed in zip(batches, failures)
+        ])
+
+        slices = {}
+        for (chunk, month), volume, batch_failed in zip(batches, responses, failures):
+            for route_id in chunk:
+                slices[(route_id, month)] = volume.get(str(route_id), pd.DataFrame())
+            if failed is not None:
+                failed.extend((route_id, month) for route_id in batch_failed)
+        return slices
+
+    async def get_route_details_many(self, service_nos):
+        """
+        Fetch details and stops for several routes concurrently
+
+        Returns:
+            Dict mapping route ID to {'details': [...], 'stops': [...]}
+        """
+        results = await self.gather(*[
+            self.gather(self.get_route_details(s), self.get_route_stops(s))
+            for s in service_nos
+        ])
+        return {
+            service_no: {'details': details, 'stops': stops}
+            for service_no, (details, stops) in zip(service_nos, results)
+        }
+
+    def run(self, coro):
+        """Run a coroutine to completion from synchronous code"""
+        return asyncio.run(coro)
+
+    def close(self):
+        """Shut down the worker pool"""
+        self._executor.shutdown(wait=True)
+        print("✓ Async API client closed")
+
+
+# ==================== TESTING ====================
+
+if __name__ == '__main__':
+    import time
+
+    print("="*70)
+    print("ASYNC API CLIENT TEST")
+    print("="*70)
+    print()
+
+    client = AsyncAPIClient()
+    routes = ['118', '10', '100']
+
+    months = client.run(client.get_available_months())
+    print(f"✓ Months available: {len(months)}")
+
+    start = time.time()
+    slices = client.run(client.get_bus_volume_slices(routes, months))
+    elapsed = time.time() - start
+
+    print(f"✓ Fetched {len(slices)} (route, month) slices in {elapsed:.2f}s")
+    for (route_id, month), df in list(slices.items())[:5]:
+        print(f"  Route {route_id} {month}: {len(df)} records")
+
+    client.close()
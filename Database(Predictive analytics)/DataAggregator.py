@@ -6,9 +6,70 @@ Uses API instead of direct database connection
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from APIClient import get_api_client
+from APIClient import APIClient, get_api_client
+from AsyncAPIClient import AsyncAPIClient
 from config import AVAILABLE_ROUTES, API_BASE_URL
 
+def build_route_features(df, service_no):
+    """
+    Derive calendar features from one route's volume rows (vectorized)
+    
+    Args:
+        df: Volume DataFrame with day, hour, month (YYYYMM) and total_passengers
+        service_no: Route service number
+    
+    Returns:
+        DataFrame with route_id, year, month, day, hour, day_of_week,
+        is_weekend and passengers columns
+    """
+    is_holiday = (df['day'] == 'H').to_numpy()
+    
+    # Extract date components from month (YYYYMM format)
+    year_month = df['month'].astype(int)
+    
+    return pd.DataFrame({
+        'route_id': service_no,
+        'year': year_month // 100,
+        'month': year_month % 100,
+        'day': df['day'],
+        'hour': df['hour'],
+        # Estimate day_of_week (simplified - assume WD=Monday, H=Sunday)
+        'day_of_week': np.where(is_holiday, 6, 0),
+        'is_weekend': is_holiday.astype(int),
+        'passengers': df['total_passengers']
+    }, index=df.index)
+
+def add_lag_features(df):
+    """
+    Add prev_hour_passengers and date columns with grouped, vectorized transforms
+    
+    Rows are sorted by route, year, month and hour. The first row of each route
+    has no previous hour, so it gets the route's average ridership.
+    
+    Args:
+        df: Combined DataFrame from build_route_features for all routes and months
+    
+    Returns:
+        Sorted DataFrame with prev_hour_passengers and date columns
+    """
+    # Sort by route, date, and hour for lag feature calculation
+    df = df.sort_values(['route_id', 'year', 'month', 'hour'])
+    
+    grouped = df.groupby('route_id', sort=False)['passengers']
+    df['prev_hour_passengers'] = grouped.shift(1)
+    
+    # Fill NaN values in lag feature with route average
+    route_avg = grouped.transform('sum') / grouped.transform('count')
+    df['prev_hour_passengers'] = df['prev_hour_passengers'].fillna(route_avg)
+    
+    # Create a proper date column for reference (one string per distinct month)
+    year_month = df['year'] * 100 + df['month']
+    labels = {ym: f"{ym // 100}-{ym % 100:02d}-01" for ym in year_month.unique()}
+    df['date'] = year_month.map(labels)
+    
+    return df
+
+
 class DataAggregator:
     """Aggregates bus volume data for ML training using API"""
     
@@ -41,35 +102,24 @@ class DataAggregator:
         # Get volume data from API (instead of direct DB query)
         df = self.api.get_bus_volume_by_route(service_no, month, direction)
         
+        return self._build_route_frame(df, service_no)
+    
+    def _build_route_frame(self, df, service_no):
+        """
+        Convert raw route volume rows into hourly ridership records
+        
+        Args:
+            df: Volume DataFrame returned by the API
+            service_no: Route service number
+        
+        Returns:
+            DataFrame with aggregated hourly ridership
+        """
         if df.empty:
             print(f"⚠️  No data found for route {service_no}")
             return pd.DataFrame()
         
-        # Convert day type to is_weekend
-        df['is_weekend'] = df['day'].apply(lambda x: 1 if x == 'H' else 0)
-        
-        # Extract date components from month (YYYYMM format)
-        df['year'] = df['month'].astype(str).str[:4].astype(int)
-        df['month_num'] = df['month'].astype(str).str[4:].astype(int)
-        
-        # Estimate day_of_week (simplified - assume WD=Monday, H=Sunday)
-        df['day_of_week'] = df['day'].apply(lambda x: 6 if x == 'H' else 0)
-        
-        # Add route_id
-        df['route_id'] = service_no
-        
-        # Rename and select relevant columns
-        # Drop the original 'month' column and use 'month_num' instead
-        result = df[[
-            'route_id', 'year', 'month_num', 'day', 'hour',
-            'day_of_week', 'is_weekend', 'total_passengers'
-        ]].copy()
-
-        # Rename for consistency with training data format
-        result = result.rename(columns={
-            'total_passengers': 'passengers',
-            'month_num': 'month'
-        })
+        result = build_route_features(df, service_no)
         
         print(f"✓ Aggregated {len(result)} hourly records for Route {service_no}")
         print(f"  - Total passengers: {result['passengers'].sum():,}")
@@ -77,13 +127,14 @@ class DataAggregator:
         
         return result
     
-    def aggregate_all_routes(self, routes=None, month=None):
+    def aggregate_all_routes(self, routes=None, month=None, volume_data=None):
         """
         Aggregate data for all routes
         
         Args:
             routes: List of route IDs (default: all available routes)
             month: Specific month or None for all
+            volume_data: Dict of route ID to prefetched volume DataFrame (optional)
         
         Returns:
             Combined DataFrame for all routes
@@ -95,11 +146,19 @@ class DataAggregator:
         print(f"AGGREGATING DATA FOR {len(routes)} ROUTES")
         print(f"{'='*60}\n")
         
+        # Fetch every route in one bulk request unless the data was prefetched
+        if volume_data is None:
+            volume_data = self.api.get_bus_volume_by_routes(
+                routes, months=[month] if month else None
+            )
+        
         all_data = []
         
         for route_id in routes:
             try:
-                route_data = self.aggregate_route_volume(route_id, month)
+                print(f"Aggregating data for Route {route_id}...")
+                df = volume_data.get(str(route_id), pd.DataFrame())
+                route_data = self._build_route_frame(df, route_id)
                 if not route_data.empty:
                     all_data.append(route_data)
             except Exception as e:
@@ -137,13 +196,63 @@ class DataAggregator:
         
         return combined_df
     
-    def prepare_training_data(self, routes=None, months=None):
+    def fetch_volume(self, routes=None, months=None, concurrent=False, direction=1, failed=None):
+        """
+        Fetch volume for many routes and months with bulk requests
+        
+        Sequentially this is one volume_by_routes request per chunk of routes
+        covering every month. Concurrently it is one request per (chunk, month),
+        all in flight at once, so total time is roughly the slowest request.
+        
+        Args:
+            routes: List of route IDs (default: all available routes)
+            months: List of months in YYYYMM format
+            concurrent: Run the requests concurrently (default False)
+            direction: Route direction (default 1)
+            failed: List that (route_id, month) pairs whose request failed are
+                    appended to (optional; they map to an empty DataFrame)
+        
+        Returns:
+            Dict mapping month to a dict of route ID to volume DataFrame
+        """
+        if routes is None:
+            routes = AVAILABLE_ROUTES
+        
+        volume = {month: {} for month in months}
+        
+        # Only the HTTP backend benefits from concurrent fan-out
+        if concurrent and isinstance(self.api, APIClient):
+            client = AsyncAPIClient(self.api.base_url, cache=getattr(self.api, 'cache', None))
+            try:
+                slices = client.run(client.get_bus_volume_slices(routes, months, direction, failed))
+            finally:
+                client.close()
+            
+            for (route_id, month), df in slices.items():
+                volume[month][str(route_id)] = df
+            return volume
+        
+        failed_routes = []
+        by_route = self.api.get_bus_volume_by_routes(routes, months, (direction,), failed=failed_routes)
+        if failed is not None:
+            failed.extend((str(route_id), month) for route_id in failed_routes for month in months)
+        for route_id, df in by_route.items():
+            for month in months:
+                if df.empty:
+                    volume[month][route_id] = df
+                else:
+                    volume[month][route_id] = df[df['month'] == int(month)].reset_index(drop=True)
+        
+        return volume
+    
+    def prepare_training_data(self, routes=None, months=None, concurrent=False):
         """
         Prepare data for model training
         
         Args:
             routes: List of route IDs (default: all)
             months: List of months in YYYYMM format (default: all available)
+            concurrent: Fetch all (route, month) slices concurrently (default False)
         
         Returns:
             DataFrame ready for model training with lag features
@@ -155,11 +264,14 @@ class DataAggregator:
         
         print(f"\nPreparing training data for {len(months)} months...")
         
+        print("Fetching volume data in bulk" + (" (concurrent)..." if concurrent else "..."))
+        volume = self.fetch_volume(routes, months, concurrent=concurrent)
+        
         # Aggregate data for all specified months
         all_month_data = []
         for month in months:
             print(f"\nProcessing month {month}...")
-            month_data = self.aggregate_all_routes(routes, month)
+            month_data = self.aggregate_all_routes(routes, month, volume_data=volume[month])
             if not month_data.empty:
                 all_month_data.append(month_data)
         
@@ -170,21 +282,9 @@ class DataAggregator:
         # Combine all months
         df = pd.concat(all_month_data, ignore_index=True)
         
-        # Sort by route, date, and hour for lag feature calculation
-        df = df.sort_values(['route_id', 'year', 'month', 'hour'])
-        
         # Create lag features (previous hour's ridership)
         print("\nCreating lag features...")
-        df['prev_hour_passengers'] = df.groupby('route_id')['passengers'].shift(1)
-        
-        # Fill NaN values in lag feature with route average
-        for route_id in df['route_id'].unique():
-            route_avg = df[df['route_id'] == route_id]['passengers'].mean()
-            df.loc[(df['route_id'] == route_id) & 
-                   (df['prev_hour_passengers'].isna()), 'prev_hour_passengers'] = route_avg
-        
-        # Create a proper date column for reference
-        df['date'] = df['year'].astype(str) + '-' + df['month'].astype(str).str.zfill(2) + '-01'
+        df = add_lag_features(df)
         
         print(f"\n✓ Training data prepared: {len(df):,} records")
         
@@ -0,0 +1,674 @@
+"""
+Local Data Client - SQLite Backend with the APIClient Interface
+Serves routes, stops, services and BusVolume from a local SQLite file, so
+training, serving and benchmarks can run without the PHP server or SSH tunnel
+"""
+import os
+import csv
+import json
+import base64
+import sqlite3
+import threading
+from datetime import datetime
+
+from config import LOCAL_DB_FILE, LOCAL_DATA_DIR, BUS_VOLUME_EXPORT_FILE, API_PREDICTION_PAGE_SIZE
+from prediction_writer import PredictionsRejectedError
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS BusStops (
+    BUS_STOP TEXT PRIMARY KEY,
+    LOC_DESC TEXT,
+    RoadName TEXT,
+    Latitude REAL,
+    Longitude REAL
+);
+
+CREATE TABLE IF NOT EXISTS BusServices (
+    ServiceNo TEXT,
+    Operator TEXT,
+    Direction INTEGER,
+    Category TEXT,
+    OriginCode TEXT,
+    DestinationCode TEXT,
+    AM_Peak_Freq_Mins TEXT,
+    PM_Peak_Freq_Mins TEXT
+);
+
+CREATE TABLE IF NOT EXISTS Routes (
+    ServiceNo TEXT,
+    Operator TEXT,
+    Direction INTEGER,
+    StopSequence INTEGER,
+    BusStopCode TEXT,
+    Distance REAL
+);
+
+CREATE TABLE IF NOT EXISTS BusVolume (
+    stop_id TEXT,
+    day TEXT,
+    hour INTEGER,
+    vol_in INTEGER,
+    vol_out INTEGER,
+    month INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS Predictions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    route_id TEXT,
+    prediction_datetime TEXT,
+    predicted_passengers INTEGER,
+    confidence REAL,
+    is_peak INTEGER,
+    model_version TEXT,
+    created_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS PredictionBatches (
+    batch_id TEXT PRIMARY KEY,
+    inserted INTEGER,
+    created_at TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_busvolume_stop_month ON BusVolume(stop_id, month);
+CREATE INDEX IF NOT EXISTS idx_routes_service_direction ON Routes(ServiceNo, Direction);
+CREATE INDEX IF NOT EXISTS idx_busservices_service ON BusServices(ServiceNo);
+CREATE INDEX IF NOT EXISTS idx_predictions_route_datetime ON Predictions(route_id, prediction_datetime);
+CREATE INDEX IF NOT EXISTS idx_predictions_datetime ON Predictions(prediction_datetime);
+"""
+
+
+def _load_lta_json(path):
+    """Load the 'value' records of an LTA DataMall JSON export"""
+    with open(path) as f:
+        return json.load(f).get('value', [])
+
+def build_local_database(db_path=LOCAL_DB_FILE, data_dir=LOCAL_DATA_DIR,
+                         volume_file=BUS_VOLUME_EXPORT_FILE):
+    """
+    Build the local SQLite database from the JSON exports and a BusVolume export
+
+    Args:
+        db_path: SQLite file to create (replaced if it exists)
+        data_dir: Directory containing bus_routes/, bus_stops/ and bus_services/
+        volume_file: CSV export of the BusVolume table with columns
+                     stop_id, day, hour, vol_in, vol_out, month (optional)
+
+    Returns:
+        Dict with row counts per table
+    """
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    tmp_path = f"{db_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    conn.executescript(SCHEMA)
+
+    stops = _load_lta_json(os.path.join(data_dir, 'bus_stops', 'BusStops.json'))
+    conn.executemany(
+        "INSERT OR REPLACE INTO BusStops VALUES (?, ?, ?, ?, ?)",
+        [(s['BusStopCode'], s.get('Description'), s.get('RoadName'),
+          s.get('Latitude'), s.get('Longitude')) for s in stops]
+    )
+
+    services = _load_lta_json(os.path.join(data_dir, 'bus_services', 'BusServices.json'))
+    conn.executemany(
+        "INSERT INTO BusServices VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [(s['ServiceNo'], s.get('Operator'), s.get('Direction'), s.get('Category'),
+          s.get('OriginCode'), s.get('DestinationCode'),
+          s.get('AM_Peak_Freq'), s.get('PM_Peak_Freq')) for s in services]
+    )
+
+    routes = _load_lta_json(os.path.join(data_dir, 'bus_routes', 'BusRoutes.json'))
+    conn.executemany(
+        "INSERT INTO Routes VALUES (?, ?, ?, ?, ?, ?)",
+        [(r['ServiceNo'], r.get('Operator'), r.get('Direction'), r.get('StopSequence'),
+          r.get('BusStopCode'), r.get('Distance')) for r in routes]
+    )
+
+    volume_rows = 0
+    if volume_file and os.path.exists(volume_file):
+        with open(volume_file, newline='') as f:
+            reader = csv.DictReader(f)
+            batch = []
+            for row in reader:
+                batch.append((row['stop_id'], row['day'], int(row['hour']),
+                              int(row['vol_in']), int(row['vol_out']), int(row['month'])))
+                if len(batch) >= 50000:
+                    conn.executemany("INSERT INTO BusVolume VALUES (?, ?, ?, ?, ?, ?)", batch)
+                    volume_rows += len(batch)
+                    batch = []
+            if batch:
+                conn.executemany("INSERT INTO BusVolume VALUES (?, ?, ?, ?, ?, ?)", batch)
+                volume_rows += len(batch)
+    else:
+        print(f"⚠️  BusVolume export not found: {volume_file} (volume queries will be empty)")
+
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+    os.replace(tmp_path, db_path)
+
+    counts = {
+        'BusStops': len(stops),
+        'BusServices': len(services),
+        'Routes': len(routes),
+        'BusVolume': volume_rows
+    }
+    print(f"✓ Local database built: {db_path}")
+    for table, count in counts.items():
+        print(f"  {table}: {count:,} rows")
+
+    return counts
+
+
+# pandas is imported inside the volume methods, so route lookups start without it
+class LocalDataClient:
+    """Drop-in replacement for APIClient backed by a local SQLite file"""
+
+    def __init__(self, db_path=LOCAL_DB_FILE, verbose=True):
+        """
+        Initialize local data client
+
+        Args:
+            db_path: SQLite file built with build_local_database()
+            verbose: Print initialization messages (default True)
+        """
+        if not os.path.exists(db_path):
+            raise FileNotFoundError(
+                f"Local database not found: {db_path}\n"
+                "Please run python LocalDataClient.py build first."
+            )
+
+        self.db_path = db_path
+        self.base_url = f"sqlite:///{db_path}"
+        self.cache = None
+        self._local = threading.local()
+
+        if verbose:
+            print(f"✓ Local Data Client initialized")
+            print(f"  Database: {self.db_path}")
+
+    def _conn(self):
+        """Get the SQLite connection owned by the current thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _query(self, query, params=()):
+        """Run a query and return the rows as dicts"""
+        return [dict(row) for row in self._conn().execute(query, params).fetchall()]
+
+    # ==================== ROUTE QUERIES ====================
+
+    def get_all_routes(self):
+        """Get all available bus routes (same shape as APIClient.get_all_routes)"""
+        try:
+            return self._query("""
+                SELECT
+                    r.ServiceNo,
+                    bs.Operator,
+                    bs.Category,
+                    COUNT(DISTINCT r.BusStopCode) as total_stops
+                FROM Routes r
+                LEFT JOIN BusServices bs ON r.ServiceNo = bs.ServiceNo
+                GROUP BY r.ServiceNo, bs.Operator, bs.Category
+                ORDER BY r.ServiceNo
+            """)
+        except Exception as e:
+            print(f"✗ Error fetching routes: {e}")
+            return []
+
+    def get_route_details(self, service_no):
+        """Get details for a specific route (same shape as APIClient.get_route_details)"""
+        try:
+            return self._query("""
+                SELECT
+                    bs.ServiceNo,
+                    bs.Operator,
+                    bs.Direction,
+                    bs.Category,
+                    bs.AM_Peak_Freq_Mins,
+                    bs.PM_Peak_Freq_Mins,
+                    origin.LOC_DESC as Origin,
+                    dest.LOC_DESC as Destination
+                FROM BusServices bs
+                LEFT JOIN BusStops origin ON bs.OriginCode = origin.BUS_STOP
+                LEFT JOIN BusStops dest ON bs.DestinationCode = dest.BUS_STOP
+                WHERE bs.ServiceNo = ?
+            """, (str(service_no),))
+        except Exception as e:
+            print(f"✗ Error fetching route details: {e}")
+            return []
+
+    def get_route_stops(self, service_no, direction=1):
+        """Get all stops for a route (same shape as APIClient.get_route_stops)"""
+        try:
+            return self._query("""
+                SELECT
+                    r.ServiceNo,
+                    r.Direction,
+                    r.StopSequence,
+                    r.BusStopCode,
+                    bs.LOC_DESC,
+                    bs.Latitude,
+                    bs.Longitude,
+                    r.Distance
+                FROM Routes r
+                JOIN BusStops bs ON r.BusStopCode = bs.BUS_STOP
+                WHERE r.ServiceNo = ? AND r.Direction = ?
+                ORDER BY r.StopSequence
+            """, (str(service_no), int(direction)))
+        except Exception as e:
+            print(f"✗ Error fetching route stops: {e}")
+            return []
+
+    # ==================== BUS VOLUME QUERIES ====================
+
+    def get_bus_volume_by_route(self, service_no, month=None, direction=1):
+        """Get aggregated bus volume for a route (same shape as APIClient.get_bus_volume_by_route)"""
+        import pandas as pd
+
+        try:
+            query = """
+                SELECT
+                    bv.day,
+                    bv.hour,
+                    bv.month,
+                    SUM(bv.vol_in) as total_passengers,
+                    COUNT(DISTINCT bv.stop_id) as num_stops
+                FROM BusVolume bv
+                INNER JOIN Routes r ON bv.stop_id = r.BusStopCode
+                WHERE r.ServiceNo = ? AND r.Direction = ?
+            """
+            params = [str(service_no), int(direction)]
+
+            if month:
+                query += " AND bv.month = ?"
+                params.append(int(month))
+
+            query += " GROUP BY bv.day, bv.hour, bv.month ORDER BY bv.month, bv.day, bv.hour"
+
+            data = self._query(query, params)
+
+            if data:
+                return pd.DataFrame(data)
+            else:
+                print(f"⚠️  No data returned for route {service_no}")
+                return pd.DataFrame()
+
+        except Exception as e:
+            print(f"✗ Error fetching bus volume: {e}")
+            return pd.DataFrame()
+
+    def get_bus_volume_by_routes(self, service_nos, months=None, directions=(1,), failed=None):
+        """Get aggregated bus volume for several routes (same shape as APIClient.get_bus_volume_by_routes)"""
+        import pandas as pd
+
+        service_nos = [str(s) for s in service_nos]
+        volume = {service_no: pd.DataFrame() for service_no in service_nos}
+
+        try:
+            query = f"""
+                SELECT
+                    r.ServiceNo,
+                    r.Direction as direction,
+                    bv.day,
+                    bv.hour,
+                    bv.month,
+                    SUM(bv.vol_in) as total_passengers,
+                    COUNT(DISTINCT bv.stop_id) as num_stops
+                FROM BusVolume bv
+                INNER JOIN Routes r ON bv.stop_id = r.BusStopCode
+                WHERE r.ServiceNo IN ({','.join('?' * len(service_nos))})
+                    AND r.Direction IN ({','.join('?' * len(directions))})
+            """
+            params = service_nos + [int(d) for d in directions]
+
+            if months:
+                query += f" AND bv.month IN ({','.join('?' * len(months))})"
+                params += [int(m) for m in months]
+
+            query += """
+                GROUP BY r.ServiceNo, r.Direction, bv.day, bv.hour, bv.month
+                ORDER BY r.ServiceNo, r.Direction, bv.month, bv.day, bv.hour
+            """
+
+            df = pd.DataFrame(self._query(query, params))
+            if not df.empty:
+                for service_no, rows in df.groupby('ServiceNo', sort=False):
+                    volume[service_no] = rows.drop(columns='ServiceNo').reset_index(drop=True)
+
+        except Exception as e:
+            print(f"✗ Error fetching bus volume for routes {service_nos}: {e}")
+            if failed is not None:
+                failed.extend(service_nos)
+
+        return volume
+
+    def get_bus_volume_by_stop(self, stop_id, month=None):
+        """Get bus volume for a specific stop (same shape as APIClient.get_bus_volume_by_stop)"""
+        import pandas as pd
+
+        try:
+            query = "SELECT day, hour, vol_in, vol_out, month FROM BusVolume WHERE stop_id = ?"
+            params = [str(stop_id)]
+
+            if month:
+                query += " AND month = ?"
+                params.append(int(month))
+
+            query += " ORDER BY month, day, hour"
+
+            data = self._query(query, params)
+            return pd.DataFrame(data) if data else pd.DataFrame()
+
+        except Exception as e:
+            print(f"✗ Error fetching stop volume: {e}")
+            return pd.DataFrame()
+
+    def get_available_months(self):
+        """Get all available months in BusVolume data"""
+        try:
+            rows = self._query("SELECT DISTINCT month FROM BusVolume ORDER BY month")
+            return [int(row['month']) for row in rows]
+        except Exception as e:
+            print(f"✗ Error fetching available months: {e}")
+            return []
+
+    def get_data_date_range(self):
+        """Get the date range of available data"""
+        try:
+            row = self._query("""
+                SELECT
+                    MIN(month) as earliest_month,
+                    MAX(month) as latest_month,
+                    COUNT(*) as total_records
+                FROM BusVolume
+            """)[0]
+            return {
+                'earliest_month': int(row['earliest_month'] or 0),
+                'latest_month': int(row['latest_month'] or 0),
+                'total_records': int(row['total_records'])
+            }
+        except Exception as e:
+            print(f"✗ Error fetching date range: {e}")
+            return {
+                'earliest_month': None,
+                'latest_month': None,
+                'total_records': 0
+            }
+
+    # ==================== PREDICTION STORAGE ====================
+
+    def save_prediction(self, route_id, prediction_datetime, predicted_passengers,
+                        confidence, is_peak, model_version='v1.0'):
+        """Save a prediction to the local Predictions table"""
+        try:
+            conn = self._conn()
+            cursor = conn.execute(
+                "INSERT INTO Predictions "
+                "(route_id, prediction_datetime, predicted_passengers, confidence, is_peak, model_version, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    str(route_id),
+                    prediction_datetime.isoformat() if isinstance(prediction_datetime, datetime) else prediction_datetime,
+                    int(predicted_passengers),
+                    float(confidence),
+                    1 if is_peak else 0,
+                    model_version,
+                    datetime.now().isoformat(sep=' ', timespec='seconds')
+                )
+            )
+            conn.commit()
+            return cursor.lastrowid
+
+        except Exception as e:
+            print(f"✗ Error saving prediction: {e}")
+            return None
+
+    def save_predictions(self, predictions, batch_id=None):
+        """Save many predictions in one transaction (same shape as APIClient.save_predictions)"""
+        created_at = datetime.now().isoformat(sep=' ', timespec='seconds')
+        try:
+            rows = [
+                (
+                    str(p['route_id']),
+                    p['prediction_datetime'].isoformat() if isinstance(p['prediction_datetime'], datetime) else p['prediction_datetime'],
+                    int(p['predicted_passengers']),
+                    float(p['confidence']),
+                    1 if p.get('is_peak') else 0,
+                    p.get('model_version', 'v1.0'),
+                    created_at
+                )
+                for p in predictions
+            ]
+        except (KeyError, TypeError, ValueError) as e:
+            raise PredictionsRejectedError(f"Invalid prediction: {e!r}") from e
+
+        try:
+            conn = self._conn()
+            with conn:
+                if batch_id is not None:
+                    # Databases built before batch keys existed lack the table
+                    conn.execute("CREATE TABLE IF NOT EXISTS PredictionBatches "
+                                 "(batch_id TEXT PRIMARY KEY, inserted INTEGER, created_at TEXT)")
+                    cursor = conn.execute(
+                        "INSERT OR IGNORE INTO PredictionBatches (batch_id, inserted, created_at) VALUES (?, ?, ?)",
+                        (batch_id, len(rows), created_at)
+                    )
+                    if cursor.rowcount == 0:
+                        return len(rows)  # Already saved
+                conn.executemany(
+                    "INSERT INTO Predictions "
+                    "(route_id, prediction_datetime, predicted_passengers, confidence, is_peak, model_version, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+            return len(rows)
+
+        except Exception as e:
+            print(f"✗ Error saving predictions: {e}")
+            return None
+
+    def get_predictions(self, route_id=None, start_date=None, end_date=None, limit=100):
+        """Retrieve predictions from the local Predictions table"""
+        try:
+            query = ("SELECT id as prediction_id, route_id, prediction_datetime, predicted_passengers, "
+                     "confidence, is_peak, model_version, created_at FROM Predictions WHERE 1=1")
+            params = []
+
+            if route_id:
+                query += " AND route_id = ?"
+                params.append(str(route_id))
+            if start_date:
+                query += " AND prediction_datetime >= ?"
+                params.append(start_date.isoformat() if isinstance(start_date, datetime) else start_date)
+            if end_date:
+                query += " AND prediction_datetime <= ?"
+                params.append(end_date.isoformat() if isinstance(end_date, datetime) else end_date)
+
+            query += " ORDER BY prediction_datetime DESC LIMIT ?"
+            params.append(int(limit))
+
+            predictions = self._query(query, params)
+            for p in predictions:
+                p['is_peak'] = bool(p['is_peak'])
+            return predictions
+
+        except Exception as e:
+            print(f"✗ Error fetching predictions: {e}")
+            return []
+
+    def get_prediction_page(self, route_id=None, start_date=None, end_date=None, cursor=None,
+                            limit=API_PREDICTION_PAGE_SIZE, order='desc'):
+        """Retrieve one keyset page of predictions, with the same cursors as the PHP backend"""
+        if order not in ('asc', 'desc'):
+            raise ValueError("order must be asc or desc")
+        limit = max(1, min(int(limit), 1000))  # Same cap as the PHP backend
+
+        query = ("SELECT id as prediction_id, route_id, prediction_datetime, predicted_passengers, "
+                 "confidence, is_peak, model_version, created_at FROM Predictions WHERE 1=1")
+        params = []
+
+        if route_id:
+            query += " AND route_id = ?"
+            params.append(str(route_id))
+        if start_date:
+            query += " AND prediction_datetime >= ?"
+            params.append(start_date.isoformat() if isinstance(start_date, datetime) else start_date)
+        if end_date:
+            query += " AND prediction_datetime <= ?"
+            params.append(end_date.isoformat() if isinstance(end_date, datetime) else end_date)
+
+        if cursor:
+            last_datetime, last_id = base64.urlsafe_b64decode(cursor).decode().rsplit('|', 1)
+            op = '>' if order == 'asc' else '<'
+            query += f" AND (prediction_datetime {op} ? OR (prediction_datetime = ? AND id {op} ?))"
+            params.extend([last_datetime, last_datetime, int(last_id)])
+
+        query += f" ORDER BY prediction_datetime {order.upper()}, id {order.upper()} LIMIT ?"
+        params.append(limit + 1)
+
+        predictions = self._query(query, params)
+        next_cursor = None
+        if len(predictions) > limit:
+            predictions = predictions[:limit]
+            last = predictions[-1]
+            next_cursor = base64.urlsafe_b64encode(
+                f"{last['prediction_datetime']}|{last['prediction_id']}".encode()
+            ).decode()
+
+        for p in predictions:
+            p['is_peak'] = bool(p['is_peak'])
+        return {'predictions': predictions, 'next_cursor': next_cursor, 'limit': limit}
+
+    def iter_prediction_pages(self, route_id=None, start_date=None, end_date=None,
+                              page_size=API_PREDICTION_PAGE_SIZE, order='desc'):
+        """Lazily yield every matching prediction, one page at a time"""
+        cursor = None
+        while True:
+            page = self.get_prediction_page(route_id, start_date, end_date, cursor, page_size, order)
+            if page['predictions']:
+                yield page['predictions']
+            cursor = page['next_cursor']
+            if not cursor:
+                return
+
+    def count_predictions(self):
+        """Count stored predictions, or None if the database can't be read"""
+        try:
+            return self._query("SELECT COUNT(*) as count FROM Predictions")[0]['count']
+        except Exception as e:
+            print(f"✗ Error counting predictions: {e}")
+            return None
+
+    def cached_version(self, action, **params):
+        """Local queries are not cached, so no response has a version (same shape as APIClient.cached_version)"""
+        return None
+
+    # ==================== UTILITY FUNCTIONS ====================
+
+    def test_connection(self):
+        """Test the local database"""
+        try:
+            self._conn().execute("SELECT 1").fetchone()
+            print("✓ Local database connection test successful")
+            print(f"  Database: {self.db_path}")
+            return True
+        except Exception as e:
+            print(f"✗ Local database connection test failed: {e}")
+            return False
+
+    def get_api_info(self):
+        """Get local backend information (same shape as APIClient.get_api_info)"""
+        try:
+            date_range = self.get_data_date_range()
+            route_count = self._query("SELECT COUNT(DISTINCT ServiceNo) as n FROM Routes")[0]['n']
+            return {
+                'api_name': 'YourTrip Analytics Local Backend',
+                'version': '1.0',
+                'database': self.db_path,
+                'statistics': {
+                    'total_volume_records': date_range['total_records'],
+                    'total_routes': int(route_count),
+                    'earliest_month': date_range['earliest_month'],
+                    'latest_month': date_range['latest_month']
+                }
+            }
+        except Exception as e:
+            print(f"✗ Error getting API info: {e}")
+            return {
+                'base_url': self.base_url,
+                'status': 'error',
+                'error': str(e)
+            }
+
+    def get_cache_stats(self):
+        """The local backend has no response cache"""
+        return {'enabled': False}
+
+    def get_request_stats(self):
+        """The local backend makes no upstream requests to coalesce"""
+        return {'enabled': False}
+
+    def close(self):
+        """Close this thread's database connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+        print("✓ Local data client closed")
+
+
+# ==================== TESTING ====================
+
+if __name__ == '__main__':
+    import sys
+    import time
+
+    print("="*70)
+    print("LOCAL DATA CLIENT TEST")
+    print("="*70)
+    print()
+
+    if 'build' in sys.argv[1:] or not os.path.exists(LOCAL_DB_FILE):
+        print("[Build] Creating local database from JSON and BusVolume exports")
+        build_local_database()
+        print()
+
+    client = LocalDataClient()
+
+    print("[Test 1] Get Available Routes")
+    routes = client.get_all_routes()
+    print(f"✓ Routes found: {len(routes)}")
+    print()
+
+    print("[Test 2] Get Available Months")
+    months = client.get_available_months()
+    print(f"✓ Months available: {len(months)}")
+    print()
+
+    if routes:
+        service_no = routes[0]['ServiceNo']
+        print(f"[Test 3] Query Latency for Route {service_no}")
+        for name, call in [
+            ('route_stops', lambda: client.get_route_stops(service_no)),
+            ('volume_by_route', lambda: client.get_bus_volume_by_route(service_no, months[0] if months else None))
+        ]:
+            start = time.perf_counter()
+            for _ in range(100):
+                call()
+            elapsed = (time.perf_counter() - start) / 100 * 1000
+            print(f"  {name:<18} {elapsed:.3f} ms per call")
+        print()
+
+    print("="*70)
+    print("✓ LOCAL DATA CLIENT TESTS COMPLETE")
+    print("="*70)
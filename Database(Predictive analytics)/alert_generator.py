@@ -2,35 +2,18 @@
 Alert Logic - Real-Time Alert Generation
 Generates alerts based on prediction thresholds (NOT stored in database)
 """
-from datetime import datetime
-from prediction_functions import predict_multiple_hours, load_model
-from config import CAPACITY_PER_BUS, HIGH_DEMAND_THRESHOLD, CRITICAL_THRESHOLD, AVAILABLE_ROUTES
-
-def generate_alert(prediction, alert_type, severity, message, recommendation=None):
-    """
-    Create an alert object
-    
-    Args:
-        prediction: Prediction dict
-        alert_type: Type of alert (e.g., 'HIGH_DEMAND', 'UNUSUAL_PATTERN')
-        severity: 'INFO', 'WARNING', or 'CRITICAL'
-        message: Alert message
-        recommendation: Recommended action (optional)
-    
-    Returns:
-        Alert dict
-    """
-    return {
-        'type': alert_type,
-        'route_id': prediction['route_id'],
-        'datetime': prediction['datetime'],
-        'predicted_passengers': prediction['predicted_passengers'],
-        'severity': severity,
-        'message': message,
-        'recommendation': recommendation,
-        'generated_at': datetime.now().isoformat(),
-        'confidence': prediction.get('confidence', 0.85)
-    }
+from datetime import datetime, timedelta
+from APIClient import get_api_client
+from prediction_functions import predict_multiple_hours, predict_ridership_batch
+from model_provider import get_model_provider
+from native_threads import map_threads
+# generate_alert lives with the rule engine that builds every alert; kept importable from here
+from alert_rules import get_alert_rule_engine, generate_alert  # noqa: F401
+from config import (
+    AVAILABLE_ROUTES,
+    ALERT_BATCH_CHUNK_SIZE,
+    ALERT_MAX_WORKERS
+)
 
 def check_high_demand(prediction):
     """
@@ -42,40 +25,7 @@ def check_high_demand(prediction):
     Returns:
         Alert dict or None
     """
-    passengers = prediction['predicted_passengers']
-    
-    # CRITICAL: Severe overcrowding (>270 passengers = 1.5x capacity)
-    if passengers > CRITICAL_THRESHOLD:
-        return generate_alert(
-            prediction,
-            'HIGH_DEMAND',
-            'CRITICAL',
-            f"Severe overcrowding predicted: {passengers} passengers (capacity: {CAPACITY_PER_BUS})",
-            "Deploy additional buses immediately and consider express service"
-        )
-    
-    # WARNING: Over capacity (>180 passengers)
-    elif passengers > CAPACITY_PER_BUS:
-        return generate_alert(
-            prediction,
-            'HIGH_DEMAND',
-            'WARNING',
-            f"High demand predicted: {passengers} passengers (capacity: {CAPACITY_PER_BUS})",
-            "Consider deploying additional bus"
-        )
-    
-    # INFO: Approaching capacity (>200 passengers but haven't exceeded capacity yet)
-    # This catches cases where capacity might be tight
-    elif passengers > HIGH_DEMAND_THRESHOLD:
-        return generate_alert(
-            prediction,
-            'HIGH_DEMAND',
-            'INFO',
-            f"Elevated demand predicted: {passengers} passengers",
-            "Monitor situation closely"
-        )
-    
-    return None
+    return _check_group(prediction, 'high_demand')
 
 def check_unusual_pattern(prediction):
     """
@@ -87,33 +37,7 @@ def check_unusual_pattern(prediction):
     Returns:
         Alert dict or None
     """
-    passengers = prediction['predicted_passengers']
-    hour = prediction['features']['hour']
-    is_weekend = prediction['features']['is_weekend']
-    
-    # Unusual late-night/early morning high demand
-    if (hour >= 22 or hour <= 5):
-        if passengers > 100:  # Unusual for late night
-            return generate_alert(
-                prediction,
-                'UNUSUAL_PATTERN',
-                'INFO',
-                f"Unusually high late-night demand: {passengers} passengers (typical: ~30-50)",
-                "Possible special event in area. Consider monitoring situation."
-            )
-    
-    # Unusual weekend peak
-    if is_weekend and hour in [7, 8, 9]:
-        if passengers > 150:  # High for weekend morning
-            return generate_alert(
-                prediction,
-                'UNUSUAL_PATTERN',
-                'INFO',
-                f"Unusually high weekend morning demand: {passengers} passengers",
-                "Possible event or unusual activity pattern"
-            )
-    
-    return None
+    return _check_group(prediction, 'unusual_pattern')
 
 def check_peak_hour_capacity(prediction):
     """
@@ -125,24 +49,14 @@ def check_peak_hour_capacity(prediction):
     Returns:
         Alert dict or None
     """
-    if not prediction['is_peak']:
-        return None
-    
-    passengers = prediction['predicted_passengers']
-    
-    # During peak hours, even 150+ passengers deserves attention
-    if passengers >= 150 and passengers <= CAPACITY_PER_BUS:
-        return generate_alert(
-            prediction,
-            'PEAK_CAPACITY',
-            'INFO',
-            f"Peak hour approaching capacity: {passengers} passengers",
-            "Prepare for possible additional deployment"
-        )
-    
-    return None
+    return _check_group(prediction, 'peak_capacity')
+
+def _check_group(prediction, group):
+    """Evaluate one rule group from the rule table against a single prediction"""
+    alerts = get_alert_rule_engine().alerts_for([prediction], groups=[group])
+    return alerts[0] if alerts else None
 
-def generate_alerts_for_route(route_id, hours=24, model=None):
+def generate_alerts_for_route(route_id, hours=24, model=None, cube=None):
     """
     Generate all alerts for a specific route
     
@@ -150,41 +64,99 @@ def generate_alerts_for_route(route_id, hours=24, model=None):
         route_id: Route service number
         hours: Hours ahead to check (default 24)
         model: Pre-loaded model (optional)
+        cube: Precomputed ForecastCube (optional)
     
     Returns:
         List of alert dicts
     """
     # Get predictions for the next N hours
-    predictions = predict_multiple_hours(route_id, hours=hours, model=model)
+    predictions = predict_multiple_hours(route_id, hours=hours, model=model, cube=cube)
+    
+    return apply_alert_rules(predictions)
+
+def apply_alert_rules(predictions):
+    """
+    Run the alert checks over a list of predictions
+    
+    Args:
+        predictions: List of prediction dicts
+    
+    Returns:
+        List of alert dicts, in prediction order
+    """
+    # All rules are evaluated at once as masks over the prediction arrays;
+    # a high demand alert suppresses the other checks for that hour
+    return get_alert_rule_engine().alerts_for(predictions)
+
+def predict_all_routes(routes, hours=24, model=None, cube=None, db_client=None,
+                       chunk_size=ALERT_BATCH_CHUNK_SIZE, max_workers=ALERT_MAX_WORKERS):
+    """
+    Predict every route x hour with batched model calls
+    
+    The route-hours form one feature matrix, split into chunks of chunk_size
+    rows that are predicted concurrently on a thread pool (gevent's native
+    threads on gevent workers, so the event loop keeps serving). A chunk that
+    fails is retried route by route, so one bad route only loses its own hours.
+    
+    Args:
+        routes: List of route IDs
+        hours: Hours ahead to predict
+        model: Pre-loaded model (optional)
+        cube: Precomputed ForecastCube (optional)
+        db_client: Database client (optional)
+        chunk_size: Route-hours per model call
+        max_workers: Threads predicting chunks concurrently
     
-    alerts = []
+    Returns:
+        (predictions, failed_routes) tuple: prediction dicts route by route in
+        hour order, and the sorted routes that could not be predicted
+    """
+    if db_client is None:
+        db_client = get_api_client()
     
-    for pred in predictions:
-        # Check for high demand (CRITICAL/WARNING/INFO based on threshold)
-        alert = check_high_demand(pred)
-        if alert:
-            alerts.append(alert)
-            continue  # Don't check other conditions if high demand alert already triggered
+    now = datetime.now()
+    items = [(route_id, now + timedelta(hours=i)) for route_id in routes for i in range(hours)]
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    
+    def predict_chunk(chunk):
+        try:
+            return predict_ridership_batch(chunk, model, db_client, cube=cube), []
+        except Exception as e:
+            print(f"Warning: Batch prediction failed, retrying route by route: {e}")
         
-        # Check for unusual patterns
-        alert = check_unusual_pattern(pred)
-        if alert:
-            alerts.append(alert)
+        # Route-hours are generated route by route, so each route is one run
+        predictions, failed = [], []
+        by_route = {}
+        for item in chunk:
+            by_route.setdefault(item[0], []).append(item)
         
-        # Check peak hour capacity
-        alert = check_peak_hour_capacity(pred)
-        if alert:
-            alerts.append(alert)
-    
-    return alerts
+        for route_id, route_items in by_route.items():
+            try:
+                predictions.extend(predict_ridership_batch(route_items, model, db_client, cube=cube))
+            except Exception as e:
+                print(f"Warning: Could not generate alerts for route {route_id}: {e}")
+                failed.append(route_id)
+        return predictions, failed
+    
+    results = map_threads(predict_chunk, chunks, max_workers)
+    
+    predictions = [prediction for chunk_predictions, _ in results for prediction in chunk_predictions]
+    failed_routes = sorted({route_id for _, failed in results for route_id in failed})
+    return predictions, failed_routes
 
-def generate_all_alerts(hours=24, routes=None):
+def generate_all_alerts(hours=24, routes=None, cube=None, chunk_size=ALERT_BATCH_CHUNK_SIZE,
+                        max_workers=ALERT_MAX_WORKERS, failed_routes=None):
     """
     Generate alerts for all routes
     
     Args:
         hours: Hours ahead to check
         routes: List of route IDs (default: all available routes)
+        cube: Precomputed ForecastCube (optional)
+        chunk_size: Route-hours per model call
+        max_workers: Threads predicting chunks concurrently
+        failed_routes: List that routes which could not be predicted are
+                       appended to (optional; their alerts are missing)
     
     Returns:
         List of all alerts
@@ -192,15 +164,15 @@ def generate_all_alerts(hours=24, routes=None):
     if routes is None:
         routes = AVAILABLE_ROUTES
     
-    model = load_model()
-    all_alerts = []
+    # Shared in-memory model; only hours the forecast cube does not cover use it
+    model = get_model_provider().get()
     
-    for route_id in routes:
-        try:
-            alerts = generate_alerts_for_route(route_id, hours=hours, model=model)
-            all_alerts.extend(alerts)
-        except Exception as e:
-            print(f"Warning: Could not generate alerts for route {route_id}: {e}")
+    # One batched prediction pass over every route x hour, then the alert checks
+    predictions, failed = predict_all_routes(routes, hours, model=model, cube=cube,
+                                             chunk_size=chunk_size, max_workers=max_workers)
+    if failed_routes is not None:
+        failed_routes.extend(failed)
+    all_alerts = apply_alert_rules(predictions)
     
     # Sort by severity and time
     severity_order = {'CRITICAL': 0, 'WARNING': 1, 'INFO': 2}
@@ -0,0 +1,271 @@
+"""
+Alert Rules - Vectorized, Table-Driven Alert Engine
+Compiles the alert rule table from config.py (or a JSON override file) into
+boolean masks over prediction arrays, so every route-hour is checked at once
+"""
+import os
+import json
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from config import (
+    CAPACITY_PER_BUS,
+    HIGH_DEMAND_THRESHOLD,
+    CRITICAL_THRESHOLD,
+    ALERT_RULES,
+    ALERT_RULES_FILE
+)
+
+# Threshold names rules may use instead of literal numbers
+THRESHOLDS = {
+    'CAPACITY_PER_BUS': CAPACITY_PER_BUS,
+    'HIGH_DEMAND_THRESHOLD': HIGH_DEMAND_THRESHOLD,
+    'CRITICAL_THRESHOLD': CRITICAL_THRESHOLD
+}
+
+# Condition name -> (input column, comparison)
+CONDITIONS = {
+    'passengers_gt': ('passengers', np.greater),
+    'passengers_ge': ('passengers', np.greater_equal),
+    'passengers_lt': ('passengers', np.less),
+    'passengers_le': ('passengers', np.less_equal),
+    'hours': ('hour', np.isin),
+    'is_weekend': ('is_weekend', np.equal),
+    'is_peak': ('is_peak', np.equal)
+}
+
+
+def generate_alert(prediction, alert_type, severity, message, recommendation=None, generated_at=None):
+    """
+    Create an alert object
+
+    Args:
+        prediction: Prediction dict
+        alert_type: Type of alert (e.g., 'HIGH_DEMAND', 'UNUSUAL_PATTERN')
+        severity: 'INFO', 'WARNING', or 'CRITICAL'
+        message: Alert message
+        recommendation: Recommended action (optional)
+        generated_at: ISO timestamp shared by a batch of alerts (default: now)
+
+    Returns:
+        Alert dict
+    """
+    return {
+        'type': alert_type,
+        'route_id': prediction['route_id'],
+        'datetime': prediction['datetime'],
+        'predicted_passengers': prediction['predicted_passengers'],
+        'severity': severity,
+        'message': message,
+        'recommendation': recommendation,
+        'generated_at': generated_at or datetime.now().isoformat(),
+        'confidence': prediction.get('confidence', 0.85)
+    }
+
+def load_alert_rules(path=ALERT_RULES_FILE):
+    """
+    Load the alert rule table
+
+    Args:
+        path: JSON file with a list of rules (default from ALERT_RULES_FILE);
+              the built-in ALERT_RULES are used when it is empty
+
+    Returns:
+        List of rule dicts
+    """
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return ALERT_RULES
+
+
+class AlertRule:
+    """One compiled row of the rule table"""
+
+    def __init__(self, spec):
+        """
+        Args:
+            spec: Rule dict with group, type, severity, when, message,
+                  recommendation and optional stop
+        """
+        self.group = spec.get('group', spec['type'])
+        self.type = spec['type']
+        self.severity = spec['severity']
+        self.stop = bool(spec.get('stop', False))
+        self.message = spec['message']
+        self.recommendation = spec.get('recommendation')
+
+        self.conditions = []
+        for name, value in spec.get('when', {}).items():
+            if name not in CONDITIONS:
+                raise ValueError(f"Unknown alert rule condition: {name}")
+            column, compare = CONDITIONS[name]
+            if isinstance(value, str):
+                value = THRESHOLDS[value]
+            if isinstance(value, list):
+                value = np.asarray(value)
+            self.conditions.append((column, compare, value))
+
+    def mask(self, columns):
+        """Boolean mask of the rows matching every condition"""
+        n = len(columns['passengers'])
+        result = np.ones(n, dtype=bool)
+        for column, compare, value in self.conditions:
+            result &= compare(columns[column], value)
+        return result
+
+    def format(self, passengers, hour):
+        """Render the alert message for one row"""
+        return self.message.format(passengers=passengers, hour=hour, capacity=CAPACITY_PER_BUS)
+
+
+class AlertRuleEngine:
+    """Evaluates the rule table over arrays of predictions"""
+
+    def __init__(self, rules=None):
+        """
+        Args:
+            rules: List of rule dicts (default: load_alert_rules())
+        """
+        self.rules = [AlertRule(spec) for spec in (rules if rules is not None else load_alert_rules())]
+
+        # Groups run in order of first appearance in the table
+        self.groups = []
+        for rule in self.rules:
+            if rule.group not in self.groups:
+                self.groups.append(rule.group)
+
+    def evaluate(self, passengers, hour, is_weekend, is_peak, groups=None):
+        """
+        Find every alert the rules raise
+
+        Args:
+            passengers: Array of predicted passengers
+            hour: Array of hours (0-23)
+            is_weekend: Array of 0/1 weekend flags
+            is_peak: Array of peak-hour booleans
+            groups: Only evaluate these rule groups (optional)
+
+        Returns:
+            (rows, rule_indices) arrays, ordered by row and then group order
+        """
+        columns = {
+            'passengers': np.asarray(passengers),
+            'hour': np.asarray(hour),
+            'is_weekend': np.asarray(is_weekend),
+            'is_peak': np.asarray(is_peak, dtype=bool)
+        }
+        n = len(columns['passengers'])
+
+        blocked = np.zeros(n, dtype=bool)
+        rows, rule_indices, group_order = [], [], []
+
+        active_groups = self.groups if groups is None else [g for g in self.groups if g in groups]
+
+        for group_index, group in enumerate(active_groups):
+            matched = np.zeros(n, dtype=bool)
+
+            for rule_index, rule in enumerate(self.rules):
+                if rule.group != group:
+                    continue
+
+                hit = rule.mask(columns) & ~matched & ~blocked
+                matched |= hit
+                hit_rows = np.flatnonzero(hit)
+                rows.append(hit_rows)
+                rule_indices.append(np.full(len(hit_rows), rule_index))
+                group_order.append(np.full(len(hit_rows), group_index))
+
+                if rule.stop:
+                    blocked |= hit
+
+        if not rows:
+            return np.empty(0, dtype=int), np.empty(0, dtype=int)
+
+        rows = np.concatenate(rows)
+        rule_indices = np.concatenate(rule_indices)
+        order = np.lexsort((np.concatenate(group_order), rows))
+        return rows[order], rule_indices[order]
+
+    def alerts_for(self, predictions, groups=None):
+        """
+        Build alert dicts for a list of predictions
+
+        Args:
+            predictions: List of prediction dicts
+            groups: Only evaluate these rule groups (optional)
+
+        Returns:
+            List of alert dicts, in prediction order
+        """
+        if not predictions:
+            return []
+
+        passengers = np.fromiter((p['predicted_passengers'] for p in predictions), dtype=np.int64)
+        hour = np.fromiter((p['features']['hour'] for p in predictions), dtype=np.int64)
+        is_weekend = np.fromiter((p['features']['is_weekend'] for p in predictions), dtype=np.int64)
+        is_peak = np.fromiter((p['is_peak'] for p in predictions), dtype=bool)
+
+        rows, rule_indices = self.evaluate(passengers, hour, is_weekend, is_peak, groups)
+
+        generated_at = datetime.now().isoformat()
+        alerts = []
+        for row, rule_index in zip(rows.tolist(), rule_indices.tolist()):
+            rule = self.rules[rule_index]
+            prediction = predictions[row]
+            alerts.append(generate_alert(
+                prediction, rule.type, rule.severity,
+                rule.format(prediction['predicted_passengers'], int(hour[row])),
+                rule.recommendation, generated_at
+            ))
+
+        return alerts
+
+
+# Engine compiled from the configured rules, shared by the alert generator
+_rule_engine = None
+_rule_engine_lock = threading.Lock()
+
+def get_alert_rule_engine():
+    """Get the shared AlertRuleEngine (compiled on first use)"""
+    global _rule_engine
+
+    if _rule_engine is None:
+        with _rule_engine_lock:
+            if _rule_engine is None:
+                _rule_engine = AlertRuleEngine()
+
+    return _rule_engine
+
+
+# ==================== TESTING ====================
+
+if __name__ == '__main__':
+    import time
+
+    print("="*60)
+    print("ALERT RULE ENGINE TEST")
+    print("="*60)
+    print()
+
+    engine = get_alert_rule_engine()
+    print(f"✓ Compiled {len(engine.rules)} rules in {len(engine.groups)} groups")
+    for rule in engine.rules:
+        print(f"  [{rule.group}] {rule.type}/{rule.severity}"
+              f"{' (stop)' if rule.stop else ''}")
+    print()
+
+    rng = np.random.default_rng(0)
+    n = 500_000
+    hour = rng.integers(0, 24, n)
+    is_weekend = rng.integers(0, 2, n)
+    is_peak = np.isin(hour, [7, 8, 9, 17, 18, 19]) & (is_weekend == 0)
+    passengers = rng.integers(0, 320, n)
+
+    start = time.perf_counter()
+    rows, rule_indices = engine.evaluate(passengers, hour, is_weekend, is_peak)
+    elapsed = time.perf_counter() - start
+
+    print(f"✓ Evaluated {n:,} route-hours in {elapsed * 1000:.1f} ms ({len(rows):,} alerts)")
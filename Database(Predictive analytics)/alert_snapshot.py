@@ -0,0 +1,224 @@
+"""
+Alert Snapshot - Materialized All-Routes Alerts
+Recomputes the alerts for every route when the hour rolls over or the model
+changes, and serves route- and window-filtered views from memory
+"""
+import threading
+from datetime import datetime, timedelta
+
+from model_provider import get_model_provider
+from config import AVAILABLE_ROUTES, ALERT_SNAPSHOT_HOURS, ALERT_SNAPSHOT_CHECK_SECONDS
+
+
+class AlertSnapshot:
+    """Immutable set of alerts for all routes, generated at one point in time"""
+
+    def __init__(self, alerts, routes, hours, generated_at, model_version=None, failed_routes=()):
+        """
+        Args:
+            alerts: Alerts from generate_all_alerts (sorted by severity and time)
+            routes: Routes the alerts were generated for
+            hours: Hours ahead covered by the snapshot
+            generated_at: datetime the predictions start from
+            model_version: Version of the model that made the predictions
+            failed_routes: Routes whose predictions failed, so their alerts are missing
+        """
+        self.alerts = alerts
+        self.failed_routes = set(failed_routes)
+        self.routes = set(routes) - self.failed_routes
+        self.hours = hours
+        self.generated_at = generated_at
+        self.model_version = model_version
+        from alert_generator import get_alert_summary
+
+        self.hour_key = generated_at.replace(minute=0, second=0, microsecond=0)
+        self.summary = get_alert_summary(alerts)
+
+        # Hour offset of each alert from the start of the snapshot, for window filters
+        self._offsets = [
+            (datetime.fromisoformat(alert['datetime']) - generated_at) / timedelta(hours=1)
+            for alert in alerts
+        ]
+        self._views = {}
+
+    @property
+    def partial(self):
+        """True if some routes could not be predicted"""
+        return bool(self.failed_routes)
+
+    def covers(self, route_id=None, hours=24):
+        """Check whether a view can be served from this snapshot"""
+        return hours <= self.hours and (route_id is None or route_id in self.routes)
+
+    def view(self, route_id=None, hours=24):
+        """
+        Get the alerts for a route and window, with their summary
+
+        Views are computed once per (route, hours) and then served from memory.
+
+        Args:
+            route_id: Route ID, or None for all routes
+            hours: Hours ahead to include
+
+        Returns:
+            (alerts, summary) tuple
+        """
+        key = (route_id, hours)
+        cached = self._views.get(key)
+        if cached is not None:
+            return cached
+
+        if route_id is None and hours >= self.hours:
+            result = (self.alerts, self.summary)
+        else:
+            alerts = [
+                alert for alert, offset in zip(self.alerts, self._offsets)
+                if offset < hours and (route_id is None or alert['route_id'] == route_id)
+            ]
+            # Single-route alerts are listed in time order, like generate_alerts_for_route
+            if route_id is not None:
+                alerts.sort(key=lambda alert: alert['datetime'])
+            from alert_generator import get_alert_summary
+            result = (alerts, get_alert_summary(alerts))
+
+        self._views[key] = result
+        return result
+
+
+class AlertSnapshotManager:
+    """Keeps the alert snapshot current and rebuilds it in the background"""
+
+    def __init__(self, forecast_cube=None, model_provider=None, routes=None, hours=ALERT_SNAPSHOT_HOURS):
+        """
+        Args:
+            forecast_cube: ForecastCubeManager supplying precomputed predictions (optional)
+            model_provider: ModelProvider (default: the process-wide provider)
+            routes: List of route IDs (default: all available routes)
+            hours: Hours ahead each snapshot covers
+        """
+        self.forecast_cube = forecast_cube
+        self.model_provider = model_provider or get_model_provider()
+        self.routes = list(routes or AVAILABLE_ROUTES)
+        self.hours = hours
+        self.snapshot = None
+
+        self._build_lock = threading.Lock()
+        self._listeners = []
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._thread = None
+
+    def get(self):
+        """
+        Get the current snapshot without blocking
+
+        Returns:
+            AlertSnapshot, or None before the first build or once the hour has
+            rolled over without a rebuild
+        """
+        snapshot = self.snapshot
+        if snapshot is None or datetime.now() - snapshot.hour_key >= timedelta(hours=1):
+            return None
+        return snapshot
+
+    def is_stale(self):
+        """Check whether the hour or model has changed since the last build (or it was partial)"""
+        snapshot = self.snapshot
+        if snapshot is None or snapshot.partial:
+            return True
+        hour_key = datetime.now().replace(minute=0, second=0, microsecond=0)
+        return snapshot.hour_key != hour_key or snapshot.model_version != self.model_provider.version
+
+    def add_listener(self, callback):
+        """
+        Register a callback run after every rebuild
+
+        Args:
+            callback: Function called as callback(snapshot) with the new snapshot
+        """
+        self._listeners.append(callback)
+
+    def refresh(self, force=False):
+        """
+        Rebuild the snapshot if the hour or model has changed
+
+        Readers keep getting the previous snapshot until the new one is swapped
+        in. If another refresh is already running this returns immediately.
+
+        Returns:
+            True if a new snapshot was built
+        """
+        if not self._build_lock.acquire(blocking=False):
+            return False
+
+        # Imported on first build so creating the manager does not load pandas
+        from alert_generator import generate_all_alerts
+
+        try:
+            if not force and not self.is_stale():
+                return False
+
+            model = self.model_provider.get()
+            cube = self.forecast_cube.get() if self.forecast_cube is not None else None
+            generated_at = datetime.now()
+
+            failed_routes = []
+            alerts = generate_all_alerts(hours=self.hours, routes=self.routes, cube=cube,
+                                         failed_routes=failed_routes)
+            snapshot = AlertSnapshot(
+                alerts, self.routes, self.hours, generated_at,
+                model_version=getattr(model, 'model_version', None),
+                failed_routes=failed_routes
+            )
+            self.snapshot = snapshot
+
+            print(f"✓ Alert snapshot built: {len(alerts)} alerts for {len(self.routes)} routes "
+                  f"x {self.hours} hours")
+            if failed_routes:
+                print(f"⚠️  Snapshot is partial, retrying next check: no predictions for routes {failed_routes}")
+        finally:
+            self._build_lock.release()
+
+        for callback in list(self._listeners):
+            try:
+                callback(snapshot)
+            except Exception as e:
+                print(f"Warning: Alert snapshot listener failed: {e}")
+
+        return True
+
+    def invalidate(self, model=None, version=None):
+        """Rebuild the snapshot in the background (ModelProvider listener)"""
+        self._wake_event.set()
+
+    def _run(self, interval):
+        while not self._stop_event.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Warning: Could not refresh alert snapshot: {e}")
+
+            # Wake up at the next hour boundary at the latest
+            now = datetime.now()
+            next_hour = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+            self._wake_event.wait(min(interval, (next_hour - now).total_seconds() + 1))
+            self._wake_event.clear()
+
+    def start(self, interval=ALERT_SNAPSHOT_CHECK_SECONDS):
+        """Start the background refresh job"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(interval,), name='alert-snapshot', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background refresh job"""
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
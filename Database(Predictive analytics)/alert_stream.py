@@ -0,0 +1,274 @@
+"""
+Alert Stream - Server-Sent Events for Alert Changes
+Diffs consecutive alert snapshots and fans the changes out to a queue per
+connected client, with heartbeats and Last-Event-ID resume
+"""
+import json
+import uuid
+import queue
+import threading
+from collections import deque
+
+from config import (
+    ALERT_STREAM_BUFFER,
+    ALERT_STREAM_CLIENT_QUEUE,
+    ALERT_STREAM_HEARTBEAT_SECONDS,
+    ALERT_STREAM_RETRY_MS
+)
+
+SEVERITY_RANK = {'INFO': 0, 'WARNING': 1, 'CRITICAL': 2}
+
+
+def alert_key(alert):
+    """
+    Identify an alert across snapshots
+
+    Snapshots are generated at different minutes, so alerts are matched on the
+    hour they are for rather than the exact prediction timestamp.
+    """
+    return (alert['route_id'], alert['type'], alert['datetime'][:13])
+
+def diff_alerts(old_alerts, new_alerts):
+    """
+    Compare two alert lists
+
+    Args:
+        old_alerts: Alerts from the previous snapshot
+        new_alerts: Alerts from the new snapshot
+
+    Returns:
+        Dict with added, removed, escalated and deescalated alert lists
+    """
+    old = {alert_key(alert): alert for alert in old_alerts}
+    new = {alert_key(alert): alert for alert in new_alerts}
+
+    changes = {'added': [], 'removed': [], 'escalated': [], 'deescalated': []}
+
+    for key, alert in new.items():
+        previous = old.get(key)
+        if previous is None:
+            changes['added'].append(alert)
+            continue
+
+        change = SEVERITY_RANK[alert['severity']] - SEVERITY_RANK[previous['severity']]
+        if change > 0:
+            changes['escalated'].append(dict(alert, previous_severity=previous['severity']))
+        elif change < 0:
+            changes['deescalated'].append(dict(alert, previous_severity=previous['severity']))
+
+    changes['removed'] = [alert for key, alert in old.items() if key not in new]
+    return changes
+
+def _filter_route(alerts, route_id):
+    if route_id is None:
+        return alerts
+    return [alert for alert in alerts if alert['route_id'] == route_id]
+
+def format_event(event_id, event_type, data):
+    """Encode one server-sent event"""
+    return f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data)}\n\n"
+
+def _change_event(event_id, generated_at, changes, route_id):
+    """Encode a change event for one route filter, or None if nothing changed for it"""
+    data = {name: _filter_route(alerts, route_id) for name, alerts in changes.items()}
+    if not any(data.values()):
+        return None
+    data['snapshot_generated_at'] = generated_at
+    return format_event(event_id, 'alerts', data)
+
+
+class _Client:
+    """One connected stream and the queue the broker fills for it"""
+
+    def __init__(self, route_id, queue_size):
+        self.route_id = route_id
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.lagging = False
+
+
+class AlertBroker:
+    """Publishes alert snapshot changes to server-sent event streams"""
+
+    def __init__(self, buffer_size=ALERT_STREAM_BUFFER, client_queue_size=ALERT_STREAM_CLIENT_QUEUE):
+        """
+        Args:
+            buffer_size: Number of past change events kept for resuming clients
+            client_queue_size: Undelivered events per client before it is resynced
+        """
+        # Event ids embed this token, so ids from another process or an earlier
+        # run are recognised and answered with a full snapshot
+        self.token = uuid.uuid4().hex[:8]
+        self.seq = 0
+        self.snapshot = None
+        self.alerts = []
+        self.client_queue_size = client_queue_size
+        self.resyncs = 0
+
+        self._events = deque(maxlen=buffer_size)
+        self._clients = set()
+        self._lock = threading.Lock()
+
+    @property
+    def clients(self):
+        return len(self._clients)
+
+    def _event_id(self, seq):
+        return f"{self.token}-{seq}"
+
+    def _parse_event_id(self, event_id):
+        """Sequence number of a Last-Event-ID from this broker, or None"""
+        try:
+            token, seq = str(event_id).rsplit('-', 1)
+            return int(seq) if token == self.token else None
+        except (ValueError, AttributeError):
+            return None
+
+    def publish(self, snapshot):
+        """
+        Record a new alert snapshot and push the changes to every stream
+
+        Used as an AlertSnapshotManager listener, so the fan-out runs on the
+        snapshot thread: each change is encoded once per route filter and put
+        on every client's queue without blocking. A client whose queue is
+        full is marked lagging and resynced with a snapshot event.
+
+        Args:
+            snapshot: AlertSnapshot that was just built
+        """
+        with self._lock:
+            previous = self.alerts
+            alerts = snapshot.alerts
+            if snapshot.failed_routes:
+                # Routes a partial snapshot could not predict keep their last
+                # known alerts instead of having them all reported as removed
+                alerts = alerts + [alert for alert in previous if alert['route_id'] in snapshot.failed_routes]
+            changes = diff_alerts(previous, alerts)
+            self.snapshot = snapshot
+            self.alerts = alerts
+
+            if not any(changes.values()):
+                return
+
+            self.seq += 1
+            seq = self.seq
+            generated_at = snapshot.generated_at.isoformat()
+            self._events.append((seq, generated_at, changes))
+            clients = list(self._clients)
+
+        encoded = {}
+        for client in clients:
+            if client.route_id not in encoded:
+                encoded[client.route_id] = _change_event(
+                    self._event_id(seq), generated_at, changes, client.route_id
+                )
+            event = encoded[client.route_id]
+            if event is None:
+                continue
+            try:
+                client.queue.put_nowait((seq, event))
+            except queue.Full:
+                client.lagging = True
+
+    def _snapshot_event(self, route_id):
+        """Full current state, sent to new clients and ones that cannot resume (lock held)"""
+        snapshot = self.snapshot
+        alerts = _filter_route(self.alerts, route_id)
+        data = {
+            'alerts': alerts,
+            'snapshot_generated_at': snapshot.generated_at.isoformat() if snapshot is not None else None
+        }
+        return format_event(self._event_id(self.seq), 'snapshot', data)
+
+    def _change_events(self, after_seq, route_id):
+        """Buffered change events after a sequence number, or None if some were dropped (lock held)"""
+        if self._events and after_seq < self._events[0][0] - 1:
+            return None
+
+        events = []
+        for seq, generated_at, changes in self._events:
+            if seq <= after_seq:
+                continue
+            event = _change_event(self._event_id(seq), generated_at, changes, route_id)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def _resync(self, client):
+        """Drop a lagging client's queue and return a snapshot event and its sequence number"""
+        with self._lock:
+            client.lagging = False
+            while True:
+                try:
+                    client.queue.get_nowait()
+                except queue.Empty:
+                    break
+            self.resyncs += 1
+            return self._snapshot_event(client.route_id), self.seq
+
+    def stream(self, last_event_id=None, route_id=None, heartbeat=ALERT_STREAM_HEARTBEAT_SECONDS):
+        """
+        Generate a client's server-sent event stream
+
+        The stream only waits on its own queue, which publish() fills. It holds
+        no thread of its own beyond the one serving the response: under the
+        default gevent worker (see serve.py) that is a greenlet, so open streams
+        cost memory, not worker threads.
+
+        Args:
+            last_event_id: Last-Event-ID sent by a reconnecting client (optional)
+            route_id: Only send alerts for this route (optional)
+            heartbeat: Seconds between keep-alive comments when nothing changes
+
+        Yields:
+            Encoded server-sent event strings
+        """
+        client = _Client(route_id, self.client_queue_size)
+
+        # Registering and reading seq under one lock means every later change
+        # reaches the queue, and nothing earlier does twice
+        with self._lock:
+            self._clients.add(client)
+            after_seq = self._parse_event_id(last_event_id) if last_event_id else None
+            replay = self._change_events(after_seq, route_id) if after_seq is not None else None
+            current_seq = self.seq
+            first = replay if replay is not None else [self._snapshot_event(route_id)]
+
+        try:
+            yield f"retry: {ALERT_STREAM_RETRY_MS}\n\n"
+            for event in first:
+                yield event
+
+            while True:
+                if client.lagging:
+                    event, current_seq = self._resync(client)
+                    yield event
+                    continue
+
+                try:
+                    seq, event = client.queue.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ": heartbeat\n\n"
+                    continue
+
+                if seq > current_seq:
+                    current_seq = seq
+                    yield event
+        finally:
+            with self._lock:
+                self._clients.discard(client)
+
+    def stats(self):
+        """
+        Get stream counters
+
+        Returns:
+            Dict with connected clients, lagging-client resyncs, last event id
+            and buffered events
+        """
+        with self._lock:
+            return {
+                'clients': len(self._clients),
+                'resyncs': self.resyncs,
+                'last_event_id': self._event_id(self.seq),
+                'buffered_events': len(self._events)
+            }
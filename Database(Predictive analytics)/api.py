@@ -1,39 +1,157 @@
 """
 Flask API for Predictive Alerts with MySQL Integration
 Serves predictions and real-time alerts from database data
+
+Importing this module is cheap: the model, API client and caches are created
+by init() (called from create_app()), and the pandas-based prediction modules
+are imported on first use.
 """
-from flask import Flask, Blueprint, request, jsonify
+from flask import Flask, Blueprint, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from datetime import datetime, timedelta
+import json
+import threading
+from itertools import islice
 import traceback
 
-from prediction_functions import (
-    predict_ridership,
-    predict_multiple_hours,
-    predict_daily_forecast,
-    get_recent_predictions,
-    load_model
-)
-from alert_generator import (
-    generate_alerts_for_route,
-    generate_all_alerts,
-    get_alert_summary
-)
-from APIClient import get_api_client
-from config import AVAILABLE_ROUTES
+from http_cache import http_cached, set_content_version, RESPONSE_CACHE
+from config import AVAILABLE_ROUTES, BATCH_MAX_REQUEST_BYTES, BATCH_STREAM_CHUNK_SIZE
 
 # Create Blueprint
 analytics_bp = Blueprint('analytics', __name__, url_prefix='/analytics')
 
-# Load model and database client at startup
-print("Initializing Analytics API...")
-print("Loading prediction model...")
-MODEL = load_model()
-print("✓ Model loaded successfully")
+# Shared service state, created by init()
+MODEL_PROVIDER = None
+DB_CLIENT = None
+FORECAST_CUBE = None
+ALERT_SNAPSHOT = None
+ALERT_BROKER = None
+
+_init_lock = threading.Lock()
+
+def init(warm_up=False):
+    """
+    Create the model provider, database client and caches (once per process)
+
+    The model itself is loaded on first use. With warm_up, a background thread
+    loads it and imports the prediction modules straight away, so the first
+    request does not pay for them.
+
+    Args:
+        warm_up: Load the model and prediction modules in the background
+    """
+    global MODEL_PROVIDER, DB_CLIENT, FORECAST_CUBE, ALERT_SNAPSHOT, ALERT_BROKER
+
+    with _init_lock:
+        if MODEL_PROVIDER is not None:
+            return
+
+        from APIClient import get_api_client
+        from forecast_cube import ForecastCubeManager
+        from model_provider import get_model_provider
+        from alert_snapshot import AlertSnapshotManager
+        from alert_stream import AlertBroker
+
+        print("Initializing Analytics API...")
+
+        # Process-wide model shared with the alert generator and prediction functions;
+        # watches the model manifest and swaps in retrained models without a restart
+        model_provider = get_model_provider()
+        DB_CLIENT = get_api_client()
+
+        # Precomputed predictions for every route x hour, rebuilt in the background
+        # whenever the model or historical averages change
+        FORECAST_CUBE = ForecastCubeManager(db_client=DB_CLIENT, model_provider=model_provider)
+        model_provider.add_listener(FORECAST_CUBE.invalidate)
+
+        # All-routes alerts recomputed when the hour rolls over or the model changes
+        ALERT_SNAPSHOT = AlertSnapshotManager(forecast_cube=FORECAST_CUBE, model_provider=model_provider)
+        model_provider.add_listener(ALERT_SNAPSHOT.invalidate)
+
+        # Pushes the difference between consecutive snapshots to /alerts/stream clients
+        ALERT_BROKER = AlertBroker()
+        ALERT_SNAPSHOT.add_listener(ALERT_BROKER.publish)
+
+        # Set last: it marks initialization as complete
+        MODEL_PROVIDER = model_provider
+
+    if warm_up:
+        threading.Thread(target=_warm_up, name='api-warm-up', daemon=True).start()
+
+def _warm_up():
+    try:
+        MODEL_PROVIDER.get()
+        import prediction_functions, alert_generator  # noqa: F401
+        print("✓ Analytics API warmed up")
+    except Exception as e:
+        print(f"Warning: Warm-up failed: {e}")
+
+def start_background_jobs():
+    """
+    Start the model watcher, historical average, forecast cube and alert snapshot threads
+
+    Threads do not survive fork(), so preforking servers call this in each
+    worker after forking rather than at import.
+    """
+    from historical_averages import start_refresh_job
+
+    init()
+    MODEL_PROVIDER.start()
+    start_refresh_job(DB_CLIENT)
+    FORECAST_CUBE.start()
+    ALERT_SNAPSHOT.start()
+
+def stop_background_jobs():
+    """Stop the background threads and save queued predictions (on worker shutdown)"""
+    from prediction_writer import get_prediction_writer
+    from historical_averages import stop_refresh_job
+    get_prediction_writer().stop()
+
+    if MODEL_PROVIDER is None:
+        return
+    ALERT_SNAPSHOT.stop()
+    FORECAST_CUBE.stop()
+    stop_refresh_job()
+    MODEL_PROVIDER.stop()
 
-print("Connecting to database...")
-DB_CLIENT = get_api_client()
-print("✓ Database connected")
+# ==================== CACHE VERSIONS ====================
+
+def _forecast_versions():
+    """Versions a forecast depends on: model, historical averages and today's date"""
+    today = datetime.now().date().isoformat()
+
+    # The cube version already combines the model and averages versions
+    cube = FORECAST_CUBE.get()
+    if cube is not None:
+        return (cube.version, today)
+
+    from historical_averages import get_historical_average_table
+    MODEL_PROVIDER.get()
+    return (MODEL_PROVIDER.version, get_historical_average_table(DB_CLIENT).version, today)
+
+def _backend_versions(*requests):
+    """
+    Versions of the cached backend responses a view is built from
+
+    Args:
+        requests: (action, params) pairs, with the params the client's getter sends
+
+    Returns:
+        List of versions, or None if any response is not cached and fresh
+    """
+    versions = [DB_CLIENT.cached_version(action, **params) for action, params in requests]
+    return None if None in versions else versions
+
+def _routes_versions():
+    """Versions /routes depends on: the cached routes response"""
+    return _backend_versions(('routes', {}))
+
+def _route_details_versions(route_id):
+    """Versions /routes/<id> depends on: the cached route details and stops responses"""
+    return _backend_versions(
+        ('route_details', {'service_no': route_id}),
+        ('route_stops', {'service_no': route_id, 'direction': 1})
+    )
 
 # ==================== PREDICTION ENDPOINTS ====================
 
@@ -68,12 +186,14 @@ def get_predictions():
             return jsonify({'error': 'Hours must be between 1 and 48'}), 400
         
         # Generate predictions
+        from prediction_functions import predict_multiple_hours
         predictions = predict_multiple_hours(
             route_id, 
             hours=hours, 
-            model=MODEL, 
+            model=MODEL_PROVIDER.get(), 
             db_client=DB_CLIENT,
-            save_to_db=save_to_db
+            save_to_db=save_to_db,
+            cube=FORECAST_CUBE.get()
         )
         
         return jsonify({
@@ -88,22 +208,123 @@ def get_predictions():
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+@analytics_bp.route('/predictions/batch', methods=['POST'])
+def post_prediction_batch():
+    """
+    Predict many routes and hours in one call, grouped by route
+    
+    JSON body:
+        items (required): List of {"route", "datetime"} or
+                          {"route", "start" (optional), "hours" (optional)}
+        save (optional): JSON boolean, save predictions to database (default: false)
+    
+    Query params:
+        stream (optional): Stream one NDJSON line per route, then a summary
+                           line (also enabled by Accept: application/x-ndjson)
+    
+    Example: POST /analytics/predictions/batch
+             {"items": [{"route": "118", "hours": 6}, {"route": "10", "datetime": "2024-07-01T08:00"}]}
+    """
+    from batch_predictions import BatchRequestError, parse_batch_items, predict_batch_groups
+    
+    try:
+        # Read at most one byte past the limit, whatever Content-Length claims
+        body = request.stream.read(BATCH_MAX_REQUEST_BYTES + 1)
+        if len(body) > BATCH_MAX_REQUEST_BYTES:
+            return jsonify({'error': f'Request body too large (max {BATCH_MAX_REQUEST_BYTES} bytes)'}), 413
+        
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            payload = None
+        if not isinstance(payload, dict):
+            return jsonify({'error': 'Request body must be a JSON object with an items list'}), 400
+        
+        # bool("false") is True, so anything but a JSON boolean is refused
+        save_to_db = payload.get('save', False)
+        if not isinstance(save_to_db, bool):
+            return jsonify({'error': 'save must be a JSON boolean (true or false)'}), 400
+        
+        groups = parse_batch_items(payload.get('items'))
+        stream = (request.args.get('stream', 'false').lower() == 'true'
+                  or request.accept_mimetypes.best == 'application/x-ndjson')
+        
+        model = MODEL_PROVIDER.get()
+        cube = FORECAST_CUBE.get()
+        
+        if stream:
+            def generate():
+                count = 0
+                try:
+                    for route_id, predictions in predict_batch_groups(
+                        groups, model, DB_CLIENT, save_to_db, cube, chunk_size=BATCH_STREAM_CHUNK_SIZE
+                    ):
+                        count += len(predictions)
+                        yield json.dumps({'route_id': route_id, 'predictions': predictions}) + '\n'
+                    yield json.dumps({'summary': {
+                        'routes': len(groups),
+                        'count': count,
+                        'model_version': getattr(model, 'model_version', None),
+                        'saved_to_database': save_to_db,
+                        'generated_at': datetime.now().isoformat()
+                    }}) + '\n'
+                except Exception as e:
+                    print(f"Error in /predictions/batch stream: {e}")
+                    traceback.print_exc()
+                    yield json.dumps({'error': str(e)}) + '\n'
+            
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        
+        results = [
+            {'route_id': route_id, 'predictions': predictions}
+            for route_id, predictions in predict_batch_groups(groups, model, DB_CLIENT, save_to_db, cube)
+        ]
+        
+        return jsonify({
+            'routes': results,
+            'count': sum(len(group['predictions']) for group in results),
+            'model_version': getattr(model, 'model_version', None),
+            'saved_to_database': save_to_db,
+            'generated_at': datetime.now().isoformat()
+        })
+    
+    except BatchRequestError as e:
+        response = {'error': str(e)}
+        if e.details:
+            response['details'] = e.details
+        if any(d['error'].startswith('Route not found') for d in e.details):
+            response['available_routes'] = AVAILABLE_ROUTES
+        return jsonify(response), e.status
+    
+    except Exception as e:
+        print(f"Error in /predictions/batch: {e}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
 @analytics_bp.route('/predictions/history', methods=['GET'])
 def get_prediction_history():
     """
-    Get historical predictions from database
+    Stream saved predictions from database as NDJSON
+    
+    One prediction per line, fetched from the backend page by page while the
+    response is written, followed by a summary line. Any window (e.g. a month
+    of history) can be exported without loading it into memory.
     
     Query params:
         route (optional): Filter by route
         hours (optional): Hours back to retrieve (default: 24)
-        limit (optional): Maximum results (default: 100)
+        start, end (optional): ISO datetimes, instead of hours
+        limit (optional): Maximum results (default: no limit)
+        order (optional): desc (newest first, default) or asc
     
-    Example: GET /analytics/predictions/history?route=118&hours=24
+    Example: GET /analytics/predictions/history?route=118&start=2025-11-01&end=2025-12-01&order=asc
     """
     try:
         route_id = request.args.get('route', None)
         hours = int(request.args.get('hours', 24))
-        limit = int(request.args.get('limit', 100))
+        limit = request.args.get('limit', None)
+        limit = int(limit) if limit else None
+        order = request.args.get('order', 'desc').lower()
         
         # Validation
         if route_id and route_id not in AVAILABLE_ROUTES:
@@ -112,19 +333,41 @@ def get_prediction_history():
                 'available_routes': AVAILABLE_ROUTES
             }), 404
         
-        # Get predictions from database
-        predictions = get_recent_predictions(
-            route_id=route_id,
-            hours=hours,
-            db_client=DB_CLIENT
-        )
+        if order not in ('asc', 'desc'):
+            return jsonify({'error': 'order must be asc or desc'}), 400
         
-        return jsonify({
-            'route_id': route_id,
-            'predictions': predictions,
-            'count': len(predictions),
-            'retrieved_at': datetime.now().isoformat()
-        })
+        if limit is not None and limit < 1:
+            return jsonify({'error': 'limit must be positive'}), 400
+        
+        try:
+            start = request.args.get('start')
+            start = datetime.fromisoformat(start) if start else datetime.now() - timedelta(hours=hours)
+            end = request.args.get('end')
+            end = datetime.fromisoformat(end) if end else None
+        except ValueError as e:
+            return jsonify({'error': f'Invalid start or end: {e}'}), 400
+        
+        def generate():
+            count = 0
+            try:
+                pages = DB_CLIENT.iter_prediction_pages(route_id, start, end, order=order)
+                predictions = (prediction for page in pages for prediction in page)
+                for prediction in islice(predictions, limit):
+                    count += 1
+                    yield json.dumps(prediction) + '\n'
+                yield json.dumps({'summary': {
+                    'route_id': route_id,
+                    'start': start.isoformat(),
+                    'end': end.isoformat() if end else None,
+                    'count': count,
+                    'retrieved_at': datetime.now().isoformat()
+                }}) + '\n'
+            except Exception as e:
+                print(f"Error in /predictions/history stream: {e}")
+                traceback.print_exc()
+                yield json.dumps({'error': str(e)}) + '\n'
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
     
     except Exception as e:
         print(f"Error in /predictions/history: {e}")
@@ -136,7 +379,7 @@ def get_prediction_history():
 @analytics_bp.route('/alerts', methods=['GET'])
 def get_alerts():
     """
-    Get real-time predictive alerts
+    Get predictive alerts (served from the hourly all-routes snapshot)
     
     Query params:
         route (optional): Specific route ID, or all routes if not specified
@@ -152,24 +395,38 @@ def get_alerts():
         if hours < 1 or hours > 168:  # Max 1 week
             return jsonify({'error': 'Hours must be between 1 and 168'}), 400
         
-        # Generate alerts (real-time, not from database)
-        if route_id:
-            if route_id not in AVAILABLE_ROUTES:
-                return jsonify({
-                    'error': f'Route not found: {route_id}',
-                    'available_routes': AVAILABLE_ROUTES
-                }), 404
-            alerts = generate_alerts_for_route(route_id, hours=hours, model=MODEL)
-        else:
-            alerts = generate_all_alerts(hours=hours)
+        if route_id and route_id not in AVAILABLE_ROUTES:
+            return jsonify({
+                'error': f'Route not found: {route_id}',
+                'available_routes': AVAILABLE_ROUTES
+            }), 404
         
-        summary = get_alert_summary(alerts)
+        # Serve from the hourly snapshot; generate in real time only until the first one is built
+        snapshot = ALERT_SNAPSHOT.get()
+        failed_routes = []
+        if snapshot is not None and snapshot.covers(route_id, hours):
+            alerts, summary = snapshot.view(route_id, hours)
+            generated_at = snapshot.generated_at.isoformat()
+            if route_id is None:
+                failed_routes = sorted(snapshot.failed_routes)
+        else:
+            from alert_generator import generate_alerts_for_route, generate_all_alerts, get_alert_summary
+            if route_id:
+                alerts = generate_alerts_for_route(route_id, hours=hours, model=MODEL_PROVIDER.get(),
+                                                   cube=FORECAST_CUBE.get())
+            else:
+                alerts = generate_all_alerts(hours=hours, cube=FORECAST_CUBE.get(), failed_routes=failed_routes)
+            summary = get_alert_summary(alerts)
+            generated_at = datetime.now().isoformat()
         
         return jsonify({
             'alerts': alerts,
             'summary': summary,
-            'generated_at': datetime.now().isoformat(),
-            'note': 'Alerts are generated in real-time and not stored in database'
+            'partial': bool(failed_routes),
+            'failed_routes': failed_routes,
+            'generated_at': generated_at,
+            'snapshot_generated_at': snapshot.generated_at.isoformat() if snapshot else None,
+            'note': 'Alerts are generated hourly from live predictions and not stored in database'
         })
     
     except Exception as e:
@@ -177,9 +434,44 @@ def get_alerts():
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+@analytics_bp.route('/alerts/stream', methods=['GET'])
+def stream_alerts():
+    """
+    Stream alert changes as server-sent events
+    
+    Sends a 'snapshot' event with the current alerts, then an 'alerts' event
+    with the added, removed, escalated and deescalated alerts each time the
+    hourly snapshot is rebuilt. Idle streams get a heartbeat comment.
+    
+    Query params:
+        route (optional): Specific route ID, or all routes if not specified
+        last_event_id (optional): Resume after this event (same as the
+                                  Last-Event-ID header browsers send on reconnect)
+    
+    Example: GET /analytics/alerts/stream?route=118
+    """
+    route_id = request.args.get('route', None)
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    
+    if route_id and route_id not in AVAILABLE_ROUTES:
+        return jsonify({
+            'error': f'Route not found: {route_id}',
+            'available_routes': AVAILABLE_ROUTES
+        }), 404
+    
+    return Response(
+        stream_with_context(ALERT_BROKER.stream(last_event_id, route_id)),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # Stop nginx buffering the stream
+        }
+    )
+
 # ==================== FORECAST ENDPOINTS ====================
 
 @analytics_bp.route('/forecast', methods=['GET'])
+@http_cached('forecast', _forecast_versions)
 def get_forecast():
     """
     Get multi-day forecast for a route
@@ -209,20 +501,18 @@ def get_forecast():
         if days < 1 or days > 30:
             return jsonify({'error': 'Days must be between 1 and 30'}), 400
         
-        # Generate forecast
-        forecast = []
+        # Generate forecast (all days in a single batched model call)
+        from prediction_functions import predict_multi_day_forecast
         today = datetime.now().date()
-        
-        for day_offset in range(days):
-            target_date = today + timedelta(days=day_offset)
-            daily_forecast = predict_daily_forecast(
-                route_id, 
-                target_date, 
-                model=MODEL, 
-                db_client=DB_CLIENT,
-                save_to_db=save_to_db
-            )
-            forecast.append(daily_forecast)
+        forecast = predict_multi_day_forecast(
+            route_id,
+            today,
+            days,
+            model=MODEL_PROVIDER.get(),
+            db_client=DB_CLIENT,
+            save_to_db=save_to_db,
+            cube=FORECAST_CUBE.get()
+        )
         
         # Calculate summary statistics
         weekly_total = sum(day['daily_total'] for day in forecast)
@@ -258,6 +548,7 @@ def get_forecast():
 # ==================== ROUTE INFORMATION ENDPOINTS ====================
 
 @analytics_bp.route('/routes', methods=['GET'])
+@http_cached('routes', _routes_versions)
 def get_routes():
     """
     Get all available routes
@@ -267,6 +558,10 @@ def get_routes():
     try:
         routes = DB_CLIENT.get_all_routes()
         
+        # The client returns [] when the backend fails, so only real data is cached
+        if routes:
+            set_content_version(routes)
+        
         return jsonify({
             'routes': routes,
             'count': len(routes),
@@ -279,6 +574,7 @@ def get_routes():
         return jsonify({'error': str(e)}), 500
 
 @analytics_bp.route('/routes/<route_id>', methods=['GET'])
+@http_cached('route_details', _route_details_versions)
 def get_route_details(route_id):
     """
     Get details for a specific route
@@ -292,6 +588,10 @@ def get_route_details(route_id):
         if not details:
             return jsonify({'error': f'Route not found: {route_id}'}), 404
         
+        # Every route has stops, so none means the stops request failed
+        if stops:
+            set_content_version(details, stops)
+        
         return jsonify({
             'route_id': route_id,
             'details': details,
@@ -319,7 +619,9 @@ def health_check():
         
         return jsonify({
             'status': 'healthy',
-            'model_loaded': MODEL is not None,
+            'model_loaded': MODEL_PROVIDER.model is not None,
+            'model_version': MODEL_PROVIDER.version,
+            'model': MODEL_PROVIDER.info(),
             'database_connected': db_status,
             'available_routes': AVAILABLE_ROUTES,
             'data_info': {
@@ -327,6 +629,7 @@ def health_check():
                 'latest_month': data_range['latest_month'],
                 'total_records': data_range['total_records']
             },
+            'api_cache': DB_CLIENT.get_cache_stats(),
             'timestamp': datetime.now().isoformat()
         })
     except Exception as e:
@@ -339,16 +642,17 @@ def health_check():
 @analytics_bp.route('/stats', methods=['GET'])
 def get_stats():
     """Get API statistics"""
+    from prediction_writer import get_prediction_writer
+    
     try:
-        # Count predictions in database
-        query = "SELECT COUNT(*) as count FROM Predictions"
-        result = DB_CLIENT.execute_query(query)
-        prediction_count = result[0]['count'] if result else 0
-        
         return jsonify({
-            'predictions_stored': prediction_count,
+            'predictions_stored': DB_CLIENT.count_predictions(),
             'routes_available': len(AVAILABLE_ROUTES),
-            'model_version': 'v1.0',
+            'model_version': MODEL_PROVIDER.version,
+            'alert_stream': ALERT_BROKER.stats(),
+            'http_cache': RESPONSE_CACHE.stats(),
+            'backend_requests': DB_CLIENT.get_request_stats(),
+            'prediction_writer': get_prediction_writer().stats(),
             'timestamp': datetime.now().isoformat()
         })
     except Exception as e:
@@ -356,8 +660,17 @@ def get_stats():
 
 # ==================== FLASK APP ====================
 
-def create_app():
-    """Create and configure Flask app"""
+def create_app(start_jobs=True, warm_up=False):
+    """
+    Create and configure Flask app
+
+    Args:
+        start_jobs: Start the background refresh threads (serve.py starts
+                    them in each worker after forking instead)
+        warm_up: Load the model in the background instead of on first request
+    """
+    init(warm_up=warm_up)
+    
     app = Flask(__name__)
     CORS(app)  # Enable CORS for frontend
     
@@ -373,6 +686,9 @@ def create_app():
     def internal_error(error):
         return jsonify({'error': 'Internal server error'}), 500
     
+    if start_jobs:
+        start_background_jobs()
+    
     return app
 
 if __name__ == '__main__':
@@ -380,15 +696,14 @@ if __name__ == '__main__':
     print("PREDICTIVE ANALYTICS API SERVER (MySQL Integration)")
     print("="*70)
     print()
-    print("✓ Model loaded and ready")
-    print("✓ Database connected")
-    print()
     print("Available endpoints:")
     print("  Predictions:")
     print("    - GET  /analytics/predictions")
+    print("    - POST /analytics/predictions/batch")
     print("    - GET  /analytics/predictions/history")
     print("  Alerts:")
     print("    - GET  /analytics/alerts")
+    print("    - GET  /analytics/alerts/stream (server-sent events)")
     print("  Forecasts:")
     print("    - GET  /analytics/forecast")
     print("  Routes:")
@@ -398,9 +713,10 @@ if __name__ == '__main__':
     print("    - GET  /analytics/health")
     print("    - GET  /analytics/stats")
     print()
-    print("Starting server on http://localhost:5001")
+    print("Starting development server on http://localhost:5001")
+    print("(use serve.py for production: preforked workers, graceful shutdown)")
     print("="*70)
     print()
     
-    app = create_app()
+    app = create_app(warm_up=True)
     app.run(host='127.0.0.1', port=5001, debug=True)
\ No newline at end of file
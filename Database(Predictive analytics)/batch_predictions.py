@@ -0,0 +1,149 @@
+"""
+Batch Predictions - Request Parsing and Grouped Prediction Passes
+Validates the items of a POST /analytics/predictions/batch request, expands
+them into (route, datetime) pairs and predicts them in as few model calls as
+possible, grouped by route
+"""
+from datetime import datetime, timedelta
+
+from config import (
+    AVAILABLE_ROUTES,
+    BATCH_MAX_ITEMS,
+    BATCH_MAX_PREDICTIONS,
+    BATCH_MAX_HOURS,
+    BATCH_DEFAULT_HOURS
+)
+
+
+class BatchRequestError(ValueError):
+    """Invalid batch request, with per-item details and an HTTP status"""
+
+    def __init__(self, message, details=None, status=400):
+        super().__init__(message)
+        self.details = details or []
+        self.status = status
+
+
+def _parse_datetime(value):
+    """Parse an ISO 8601 string, converting timezone-aware values to local time"""
+    parsed = datetime.fromisoformat(str(value))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+def parse_batch_items(items, routes=None, max_items=BATCH_MAX_ITEMS,
+                      max_predictions=BATCH_MAX_PREDICTIONS, max_hours=BATCH_MAX_HOURS):
+    """
+    Validate batch items and expand them into datetimes per route
+
+    Each item is either {"route", "datetime"} for a single hour, or
+    {"route", "start" (optional, default now), "hours" (optional)} for a
+    range of consecutive hours.
+
+    Args:
+        items: List of item dicts from the request body
+        routes: Valid route IDs (default: all available routes)
+        max_items: Maximum number of items
+        max_predictions: Maximum number of route-hours after expansion
+        max_hours: Maximum hours per range item
+
+    Returns:
+        Dict of route_id -> list of datetimes, in order of first appearance
+
+    Raises:
+        BatchRequestError: If the items are invalid or over a limit
+    """
+    valid_routes = set(routes or AVAILABLE_ROUTES)
+
+    if not isinstance(items, list) or not items:
+        raise BatchRequestError("'items' must be a non-empty list")
+
+    if len(items) > max_items:
+        raise BatchRequestError(f"Too many items: {len(items)} (max {max_items})", status=413)
+
+    groups = {}
+    errors = []
+    total = 0
+    now = datetime.now()
+
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({'index': index, 'error': 'Item must be an object'})
+            continue
+
+        route_id = str(item.get('route', ''))
+        if not route_id:
+            errors.append({'index': index, 'error': 'Missing route'})
+            continue
+        if route_id not in valid_routes:
+            errors.append({'index': index, 'error': f'Route not found: {route_id}'})
+            continue
+
+        try:
+            if 'datetime' in item:
+                datetimes = [_parse_datetime(item['datetime'])]
+            else:
+                start = _parse_datetime(item['start']) if item.get('start') else now
+                hours = int(item.get('hours', BATCH_DEFAULT_HOURS))
+                if hours < 1 or hours > max_hours:
+                    errors.append({'index': index, 'error': f'Hours must be between 1 and {max_hours}'})
+                    continue
+                datetimes = [start + timedelta(hours=i) for i in range(hours)]
+        except (TypeError, ValueError) as e:
+            errors.append({'index': index, 'error': f'Invalid datetime or hours: {e}'})
+            continue
+
+        total += len(datetimes)
+        if total > max_predictions:
+            raise BatchRequestError(
+                f"Too many predictions requested (max {max_predictions} route-hours)", status=413
+            )
+
+        groups.setdefault(route_id, []).extend(datetimes)
+
+    if errors:
+        raise BatchRequestError(f"{len(errors)} invalid item(s)", details=errors)
+
+    return groups
+
+def predict_batch_groups(groups, model=None, db_client=None, save_to_db=False, cube=None,
+                         chunk_size=None):
+    """
+    Predict every route's datetimes, yielding the results route by route
+
+    Without chunk_size the whole batch is one predict_ridership_batch call.
+    With it, routes are packed into passes of about chunk_size predictions,
+    so a streaming response can send the first routes before the last are done.
+
+    Args:
+        groups: Dict of route_id -> list of datetimes (from parse_batch_items)
+        model: Pre-loaded model (optional)
+        db_client: Database client (optional)
+        save_to_db: Whether to save predictions to database
+        cube: Precomputed ForecastCube (optional)
+        chunk_size: Predictions per model call (optional)
+
+    Yields:
+        (route_id, predictions) tuples, in the order of groups
+    """
+    from prediction_functions import predict_ridership_batch
+
+    route_ids = list(groups)
+    limit = chunk_size or sum(len(datetimes) for datetimes in groups.values())
+
+    chunk, chunk_rows = [], 0
+    for position, route_id in enumerate(route_ids):
+        chunk.append(route_id)
+        chunk_rows += len(groups[route_id])
+        if chunk_rows < limit and position < len(route_ids) - 1:
+            continue
+
+        items = [(r, dt) for r in chunk for dt in groups[r]]
+        predictions = predict_ridership_batch(items, model, db_client, save_to_db, cube)
+
+        offset = 0
+        for r in chunk:
+            n = len(groups[r])
+            yield r, predictions[offset:offset + n]
+            offset += n
+        chunk, chunk_rows = [], 0
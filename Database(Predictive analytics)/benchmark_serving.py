@@ -0,0 +1,93 @@
+"""
+Benchmark: API Serving Throughput
+Fires concurrent GET requests at a running analytics API and reports
+throughput and latency percentiles, to compare the development server
+(python api.py) with the preforked production server (python serve.py).
+
+Usage:
+    python benchmark_serving.py http://127.0.0.1:5001 --concurrency 1 8 32 --requests 400
+"""
+import sys
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+ENDPOINTS = [
+    '/analytics/health',
+    '/analytics/predictions?route=118&hours=6',
+    '/analytics/alerts?route=118&hours=24',
+    '/analytics/forecast?route=118&days=7'
+]
+
+
+def run_level(base_url, concurrency, total_requests, endpoints=ENDPOINTS):
+    """
+    Send total_requests requests with concurrency clients in flight
+
+    Returns:
+        Dict with requests/second, latency percentiles (ms) and error count
+    """
+    local = threading.local()
+
+    def fetch(i):
+        # One keep-alive session per client thread, like a browser
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+
+        start = time.perf_counter()
+        try:
+            response = session.get(base_url + endpoints[i % len(endpoints)], timeout=60)
+            ok = response.status_code == 200
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(fetch, range(total_requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array([latency for latency, _ in results]) * 1000
+    return {
+        'rps': total_requests / elapsed,
+        'p50': np.percentile(latencies, 50),
+        'p95': np.percentile(latencies, 95),
+        'p99': np.percentile(latencies, 99),
+        'errors': sum(1 for _, ok in results if not ok)
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('url', nargs='?', default='http://127.0.0.1:5001')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--requests', type=int, default=400)
+    args = parser.parse_args()
+
+    base_url = args.url.rstrip('/')
+    try:
+        requests.get(base_url + '/analytics/health', timeout=30)
+    except requests.RequestException:
+        print(f"✗ No API server at {base_url} - start api.py or serve.py first")
+        sys.exit(1)
+
+    # Warm up caches so every level sees the same server state
+    run_level(base_url, 4, 2 * len(ENDPOINTS))
+
+    print("="*70)
+    print("API SERVING BENCHMARK")
+    print("="*70)
+    print(f"Server: {base_url}   Requests per level: {args.requests}")
+    print()
+    print(f"{'Clients':>8} | {'req/s':>9} | {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} | {'Errors':>6}")
+    print("-"*70)
+
+    for concurrency in args.concurrency:
+        result = run_level(base_url, concurrency, args.requests)
+        print(f"{concurrency:>8} | {result['rps']:>9.1f} | {result['p50']:>8.1f} "
+              f"{result['p95']:>8.1f} {result['p99']:>8.1f} | {result['errors']:>6}")
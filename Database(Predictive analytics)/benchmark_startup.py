@@ -0,0 +1,66 @@
+"""
+Benchmark: Cold-Start Time
+Times each startup stage of the analytics service in a fresh interpreter
+(imports, API initialization, first model load), as paid by a new server
+worker, a CLI tool or a test run.
+
+Usage:
+    python benchmark_startup.py [--runs 5]
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+STAGES = [
+    ('import config', "import config"),
+    ('import APIClient + client', "from APIClient import get_api_client; get_api_client()"),
+    ('import api', "import api"),
+    ('create_app() (no jobs)', "import api; api.create_app(start_jobs=False)"),
+    ('import prediction_functions', "import prediction_functions"),
+    ('first model load', "import api; api.init(); api.MODEL_PROVIDER.get()")
+]
+
+
+def time_stage(code, runs):
+    """
+    Run code in fresh interpreters
+
+    Returns:
+        List of wall times in seconds, or None if the code failed
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-c', code], cwd=here, capture_output=True)
+        times.append(time.perf_counter() - start)
+        if result.returncode != 0:
+            return None
+    return times
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    baseline = time_stage("pass", args.runs)
+
+    print("="*60)
+    print("COLD-START BENCHMARK")
+    print("="*60)
+    print(f"Interpreter start-up: {statistics.median(baseline) * 1000:.0f} ms "
+          f"(included below), {args.runs} runs per stage")
+    print()
+    print(f"{'Stage':<30} | {'Median ms':>10} {'Min ms':>10}")
+    print("-"*60)
+
+    for name, code in STAGES:
+        times = time_stage(code, args.runs)
+        if times is None:
+            print(f"{name:<30} | {'failed':>10}")
+            continue
+        print(f"{name:<30} | {statistics.median(times) * 1000:>10.0f} {min(times) * 1000:>10.0f}")
@@ -0,0 +1,92 @@
+"""
+Circuit Breaker - Fail Fast While a Backend Action Is Unhealthy
+After a run of consecutive failures the circuit opens and calls are refused
+without touching the backend. Once the reset period has passed, a single trial
+call is let through: success closes the circuit, failure opens it again.
+"""
+import time
+import threading
+
+from config import API_BREAKER_FAILURES, API_BREAKER_RESET_SECONDS
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a backend action whose circuit is open"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one backend action"""
+
+    def __init__(self, failure_threshold=API_BREAKER_FAILURES, reset_seconds=API_BREAKER_RESET_SECONDS):
+        """
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            reset_seconds: Seconds the circuit stays open before a trial call
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.trips = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Check whether a call may go to the backend
+
+        Returns:
+            True if the call may proceed (closed, or the half-open trial call)
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = HALF_OPEN
+                return True
+
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.opened_at = None
+
+    def record_skipped(self):
+        """The allowed call never reached the backend (e.g. no free local connection)"""
+        with self._lock:
+            # Give the half-open trial to the next call; the reset period has passed already
+            if self.state == HALF_OPEN:
+                self.state = OPEN
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self.trips += 1
+
+    def stats(self):
+        """
+        Get breaker state and counters
+
+        Returns:
+            Dict with state, consecutive failures, trips and rejected calls
+        """
+        with self._lock:
+            return {
+                'state': self.state,
+                'failures': self.failures,
+                'trips': self.trips,
+                'rejected': self.rejected
+            }
@@ -2,6 +2,7 @@
 Configuration - API-based access (no direct MySQL connection)
 """
 import os
+from importlib.util import find_spec
 
 # ==================== API CONFIGURATION ====================
 
@@ -15,8 +16,80 @@ API_BASE_URL = os.getenv('API_BASE_URL', 'http://localhost:8000/Analytics_api.ph
 # Option 3: Different port
 # API_BASE_URL = 'http://localhost:8080/analytics_api.php'
 
-print(f"✓ API Configuration loaded")
-print(f"  API URL: {API_BASE_URL}")
+# Maximum number of concurrent requests made by AsyncAPIClient
+API_MAX_CONCURRENCY = int(os.getenv('API_MAX_CONCURRENCY', 8))
+
+# Routes per volume_by_routes request (the PHP backend accepts at most 100)
+API_BULK_ROUTES_PER_REQUEST = 25
+
+# Predictions per save_predictions request (the PHP backend accepts at most 1000)
+API_BULK_PREDICTIONS_PER_REQUEST = 500
+
+# Predictions per get_predictions page (the PHP backend accepts at most 1000)
+API_PREDICTION_PAGE_SIZE = 500
+
+# ==================== API TRANSPORT ====================
+
+# Seconds to establish a connection, and to wait for each response
+API_CONNECT_TIMEOUT = float(os.getenv('API_CONNECT_TIMEOUT', 3.05))
+API_READ_TIMEOUT = float(os.getenv('API_READ_TIMEOUT', 10))
+
+# Attempts per request; retries wait a random time up to
+# min(API_BACKOFF_MAX_SECONDS, API_BACKOFF_BASE_SECONDS * 2^retry)
+API_MAX_ATTEMPTS = int(os.getenv('API_MAX_ATTEMPTS', 3))
+API_BACKOFF_BASE_SECONDS = float(os.getenv('API_BACKOFF_BASE_SECONDS', 0.5))
+API_BACKOFF_MAX_SECONDS = float(os.getenv('API_BACKOFF_MAX_SECONDS', 8))
+
+# Keep-alive connections to the backend shared by all threads; requests wait
+# up to API_POOL_TIMEOUT seconds for a free one
+API_POOL_SIZE = int(os.getenv('API_POOL_SIZE', 16))
+API_POOL_TIMEOUT = float(os.getenv('API_POOL_TIMEOUT', 10))
+
+# An action's circuit opens after this many consecutive failed requests and
+# fails fast (serving stale cached responses where possible) until a trial
+# request succeeds, at most once every API_BREAKER_RESET_SECONDS
+API_BREAKER_FAILURES = int(os.getenv('API_BREAKER_FAILURES', 5))
+API_BREAKER_RESET_SECONDS = float(os.getenv('API_BREAKER_RESET_SECONDS', 30))
+
+# Without API_CACHE_DIR, the last good response of this many cacheable GET
+# requests is kept in memory, to be served while the backend is failing
+API_LAST_GOOD_MAX_ENTRIES = int(os.getenv('API_LAST_GOOD_MAX_ENTRIES', 256))
+
+# ==================== DATA BACKEND ====================
+
+# 'api' uses the PHP backend; 'local' uses a SQLite file built from the data/ exports
+DATA_BACKEND = os.getenv('DATA_BACKEND', 'api')
+LOCAL_DB_FILE = os.getenv('LOCAL_DB_FILE', 'data/local_analytics.sqlite3')
+LOCAL_DATA_DIR = 'data'
+BUS_VOLUME_EXPORT_FILE = os.getenv('BUS_VOLUME_EXPORT_FILE', 'data/bus_volume/BusVolume.csv')
+
+# ==================== API RESPONSE CACHE ====================
+
+# Opt-in on-disk cache for APIClient responses (disabled when empty). When it
+# is disabled, stale fallback during backend failures uses the in-memory
+# last-good responses instead (API_LAST_GOOD_MAX_ENTRIES)
+API_CACHE_DIR = os.getenv('API_CACHE_DIR', '')
+API_CACHE_MAX_MB = float(os.getenv('API_CACHE_MAX_MB', 256))
+
+# Seconds each action is cached for; actions not listed are never cached
+API_CACHE_TTL = {
+    'routes': 6 * 3600,
+    'route_details': 6 * 3600,
+    'route_stops': 6 * 3600,
+    'volume_by_route': 3600,
+    'volume_by_routes': 3600,
+    'volume_by_stop': 3600,
+    'available_months': 600,
+    'data_date_range': 600
+}
+
+# Published BusVolume months never change: queries pinned to these
+# parameters are cached forever
+API_CACHE_IMMUTABLE_PARAMS = {
+    'volume_by_route': 'month',
+    'volume_by_routes': 'months',
+    'volume_by_stop': 'month'
+}
 
 # ==================== ALERT THRESHOLDS ====================
 
@@ -24,6 +97,69 @@ CAPACITY_PER_BUS = 180
 HIGH_DEMAND_THRESHOLD = 200
 CRITICAL_THRESHOLD = 270  # 1.5x capacity
 
+# All-routes alerts predict every route x hour in chunks spread over a thread pool
+ALERT_BATCH_CHUNK_SIZE = 1000  # Route-hours per model call
+ALERT_MAX_WORKERS = 4
+
+# Materialized all-routes alerts, rebuilt when the hour rolls over or the model changes
+ALERT_SNAPSHOT_HOURS = 168  # Longest window /analytics/alerts serves
+ALERT_SNAPSHOT_CHECK_SECONDS = 60
+
+# /analytics/alerts/stream (server-sent events)
+ALERT_STREAM_HEARTBEAT_SECONDS = 15  # Keep-alive comment interval for idle streams
+ALERT_STREAM_RETRY_MS = 5000  # Client reconnect delay
+ALERT_STREAM_BUFFER = 256  # Change events kept for Last-Event-ID resume
+ALERT_STREAM_CLIENT_QUEUE = 32  # Undelivered events per client before it is resynced
+
+# ==================== ALERT RULES ====================
+
+# Evaluated in order. Within a group the first matching rule wins; a matching rule
+# with 'stop' suppresses every later group for that route-hour. Thresholds may be
+# numbers or the names of the threshold constants above. Conditions:
+# passengers_gt/ge/lt/le, hours (list), is_weekend, is_peak.
+# Message placeholders: {passengers}, {hour}, {capacity}.
+ALERT_RULES = [
+    {
+        'group': 'high_demand', 'type': 'HIGH_DEMAND', 'severity': 'CRITICAL', 'stop': True,
+        'when': {'passengers_gt': 'CRITICAL_THRESHOLD'},
+        'message': "Severe overcrowding predicted: {passengers} passengers (capacity: {capacity})",
+        'recommendation': "Deploy additional buses immediately and consider express service"
+    },
+    {
+        'group': 'high_demand', 'type': 'HIGH_DEMAND', 'severity': 'WARNING', 'stop': True,
+        'when': {'passengers_gt': 'CAPACITY_PER_BUS'},
+        'message': "High demand predicted: {passengers} passengers (capacity: {capacity})",
+        'recommendation': "Consider deploying additional bus"
+    },
+    {
+        'group': 'high_demand', 'type': 'HIGH_DEMAND', 'severity': 'INFO', 'stop': True,
+        'when': {'passengers_gt': 'HIGH_DEMAND_THRESHOLD'},
+        'message': "Elevated demand predicted: {passengers} passengers",
+        'recommendation': "Monitor situation closely"
+    },
+    {
+        'group': 'unusual_pattern', 'type': 'UNUSUAL_PATTERN', 'severity': 'INFO',
+        'when': {'hours': [22, 23, 0, 1, 2, 3, 4, 5], 'passengers_gt': 100},
+        'message': "Unusually high late-night demand: {passengers} passengers (typical: ~30-50)",
+        'recommendation': "Possible special event in area. Consider monitoring situation."
+    },
+    {
+        'group': 'unusual_pattern', 'type': 'UNUSUAL_PATTERN', 'severity': 'INFO',
+        'when': {'is_weekend': 1, 'hours': [7, 8, 9], 'passengers_gt': 150},
+        'message': "Unusually high weekend morning demand: {passengers} passengers",
+        'recommendation': "Possible event or unusual activity pattern"
+    },
+    {
+        'group': 'peak_capacity', 'type': 'PEAK_CAPACITY', 'severity': 'INFO',
+        'when': {'is_peak': True, 'passengers_ge': 150, 'passengers_le': 'CAPACITY_PER_BUS'},
+        'message': "Peak hour approaching capacity: {passengers} passengers",
+        'recommendation': "Prepare for possible additional deployment"
+    }
+]
+
+# Optional JSON file with a list of rules in the same format, replacing ALERT_RULES
+ALERT_RULES_FILE = os.getenv('ALERT_RULES_FILE', '')
+
 # ==================== MODEL CONFIGURATION ====================
 
 MODEL_FILE = 'models/ridership_model.pkl'
@@ -31,13 +167,85 @@ RANDOM_STATE = 42
 TEST_SIZE = 0.2
 N_ESTIMATORS = 100
 
+# 'flat' serves predictions from the array-based forest engine; 'sklearn' uses the pickled model as-is
+MODEL_ENGINE = os.getenv('MODEL_ENGINE', 'flat')
+FLAT_FOREST_BLOCK_ENTRIES = 32768  # (row, tree) pairs walked per block; large batches take several blocks
+
+# Memory-mapped .npy tree arrays plus manifest.json, shared by every worker process
+MODEL_ARTIFACT_DIR = 'models/ridership_model'
+MODEL_ARTIFACT_KEEP = 3  # Version directories kept for workers still mapping an older model
+MODEL_RELOAD_CHECK_SECONDS = 30  # How often the API checks the manifest for a retrained model
+
+# ==================== HISTORICAL AVERAGES ====================
+
+# Precomputed (route, direction, day type, hour) averages used for prev_hour_passengers
+HISTORICAL_AVERAGES_FILE = 'data/historical_averages.json'
+HISTORICAL_AVERAGES_REFRESH_SECONDS = 3600  # How often to check for new months
+HISTORICAL_AVERAGES_MISSING_RETRY_SECONDS = 3600  # How long a route without volume data is not re-fetched
+
+# ==================== FEATURE STORE ====================
+
+# Training features partitioned by route and month; retraining only fetches new months
+FEATURE_STORE_DIR = 'data/feature_store'
+
+# ==================== FORECAST CUBE ====================
+
+# Precomputed predictions for every route x hour over the next N days
+FORECAST_CUBE_FILE = 'models/forecast_cube.npz'
+FORECAST_CUBE_DAYS = 31  # Covers the 30-day forecast window plus today
+FORECAST_CUBE_CHECK_SECONDS = 60  # How often the background job checks for changes
+
+# ==================== PREDICTION WRITER ====================
+
+# Write-behind queue for saved predictions (prediction_writer.py)
+PREDICTION_WRITE_BATCH_SIZE = 500  # Flush as soon as this many are queued
+PREDICTION_WRITE_FLUSH_SECONDS = 2.0  # ...or this long after the first one
+PREDICTION_WRITE_MAX_QUEUE = 50000  # Beyond this, new predictions go straight to the spool
+PREDICTION_SPOOL_DIR = os.getenv('PREDICTION_SPOOL_DIR', 'data/prediction_spool')
+PREDICTION_SPOOL_RETRY_SECONDS = 30  # First retry delay for failed batches (doubles up to the max)
+PREDICTION_SPOOL_RETRY_MAX_SECONDS = 600
+# Batches the backend rejects as invalid (4xx) are moved here instead of retried
+PREDICTION_DEAD_LETTER_DIR = os.getenv('PREDICTION_DEAD_LETTER_DIR', 'data/prediction_dead_letter')
+
+# ==================== BATCH PREDICTIONS ====================
+
+# Limits for POST /analytics/predictions/batch
+BATCH_MAX_REQUEST_BYTES = 1024 * 1024
+BATCH_MAX_ITEMS = 1000
+BATCH_MAX_PREDICTIONS = 50000  # Route-hours after expanding ranges
+BATCH_MAX_HOURS = 168  # Per range item
+BATCH_DEFAULT_HOURS = 6
+BATCH_STREAM_CHUNK_SIZE = 2000  # Predictions per model call when streaming NDJSON
+
+# ==================== HTTP CACHING ====================
+
+# Cache-Control max-age (seconds) of the ETag-cached analytics endpoints
+HTTP_CACHE_MAX_AGE = {
+    'routes': 3600,
+    'route_details': 3600,
+    'forecast': 300
+}
+HTTP_CACHE_MAX_ENTRIES = 256  # Rendered response bodies kept per process
+
+# ==================== PRODUCTION SERVER ====================
+
+# serve.py (gunicorn); every setting can be overridden from the environment
+SERVE_BIND = os.getenv('SERVE_BIND', '127.0.0.1:5001')
+SERVE_WORKERS = int(os.getenv('SERVE_WORKERS', (os.cpu_count() or 1) * 2 + 1))
+SERVE_THREADS = int(os.getenv('SERVE_THREADS', 8))  # Requests in flight per gthread worker
+# gevent serves each connection (including every open alert stream) on a greenlet
+# instead of a thread; gthread is the fallback when gevent is not installed
+SERVE_WORKER_CLASS = os.getenv('SERVE_WORKER_CLASS', 'gevent' if find_spec('gevent') else 'gthread')
+SERVE_WORKER_CONNECTIONS = int(os.getenv('SERVE_WORKER_CONNECTIONS', 1000))  # Greenlets per gevent worker
+SERVE_TIMEOUT = int(os.getenv('SERVE_TIMEOUT', 120))  # Restart workers silent this long
+SERVE_GRACEFUL_TIMEOUT = int(os.getenv('SERVE_GRACEFUL_TIMEOUT', 30))  # Drain time on shutdown
+SERVE_KEEPALIVE = int(os.getenv('SERVE_KEEPALIVE', 5))
+
 # ==================== AVAILABLE ROUTES ====================
 
 # These will be fetched from API, but define defaults as fallback
 AVAILABLE_ROUTES = ['10', '100', '100A', '101', '102', '105', '105B', '106', '106A', '118']
 
-print(f"✓ Default routes configured: {len(AVAILABLE_ROUTES)} routes")
-
 # ==================== NOTES ====================
 
 # NOTE: We no longer connect directly to MySQL!
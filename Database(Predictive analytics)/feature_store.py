@@ -0,0 +1,259 @@
+"""
+Feature Store - Incremental, Partitioned Training Data
+Keeps route-level ridership features on disk as one .npz shard per
+(route, month) plus a manifest, so retraining only fetches new months
+"""
+import os
+import json
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from DataAggregator import DataAggregator, build_route_features
+from config import AVAILABLE_ROUTES, FEATURE_STORE_DIR
+
+# Columns stored in every shard, besides the route_id implied by the partition
+SHARD_COLUMNS = ['year', 'month', 'day', 'hour', 'day_of_week', 'is_weekend', 'passengers']
+
+
+class FeatureStore:
+    """Columnar store of training features partitioned by route and month"""
+
+    def __init__(self, root=FEATURE_STORE_DIR):
+        """
+        Args:
+            root: Directory holding the shards and manifest.json
+        """
+        self.root = root
+        self.manifest_path = os.path.join(root, 'manifest.json')
+        self.manifest = self._load_manifest()
+
+    # ==================== MANIFEST ====================
+
+    def _load_manifest(self):
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        return {'partitions': {}, 'updated_at': None}
+
+    def _save_manifest(self):
+        os.makedirs(self.root, exist_ok=True)
+        self.manifest['updated_at'] = datetime.now().isoformat()
+
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    @staticmethod
+    def partition_key(route_id, month):
+        return f"{route_id}/{int(month)}"
+
+    def has_partition(self, route_id, month):
+        return self.partition_key(route_id, month) in self.manifest['partitions']
+
+    def missing_partitions(self, routes, months):
+        """
+        List the (route, month) partitions that have not been stored yet
+
+        Returns:
+            List of (route_id, month) tuples
+        """
+        return [
+            (str(route_id), int(month))
+            for month in months
+            for route_id in routes
+            if not self.has_partition(route_id, month)
+        ]
+
+    # ==================== WRITING ====================
+
+    def write_partition(self, route_id, month, frame):
+        """
+        Store one (route, month) partition
+
+        Rows are kept sorted by hour, with the lag feature computed inside the
+        partition. Only the first row's lag depends on neighbouring partitions
+        and is filled in at load time.
+
+        Args:
+            route_id: Route service number
+            month: Month in YYYYMM format
+            frame: Output of build_route_features for this route and month
+                   (may be empty for routes with no data that month)
+        """
+        key = self.partition_key(route_id, month)
+
+        if frame.empty:
+            self.manifest['partitions'][key] = {'rows': 0, 'file': None}
+            return
+
+        frame = frame.sort_values('hour', kind='stable')
+        relative_path = os.path.join(f"route={route_id}", f"month={int(month)}.npz")
+        path = os.path.join(self.root, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        passengers = frame['passengers'].to_numpy()
+        inner_lag = np.empty(len(passengers), dtype=np.float64)
+        inner_lag[0] = np.nan
+        inner_lag[1:] = passengers[:-1]
+
+        # Day types are stored as fixed-width strings so shards load without pickle
+        arrays = {col: frame[col].to_numpy() for col in SHARD_COLUMNS}
+        arrays['day'] = arrays['day'].astype(str)
+        np.savez(path, inner_lag=inner_lag, **arrays)
+
+        self.manifest['partitions'][key] = {
+            'rows': int(len(frame)),
+            'file': relative_path,
+            'written_at': datetime.now().isoformat()
+        }
+
+    def sync(self, aggregator=None, routes=None, months=None, concurrent=True):
+        """
+        Fetch and store every partition that is missing from the manifest
+
+        Args:
+            aggregator: DataAggregator used to fetch volume (optional)
+            routes: List of route IDs (default: all available routes)
+            months: List of months (default: every month the API reports)
+            concurrent: Fetch missing slices concurrently (default True)
+
+        Partitions whose fetch failed are left out of the manifest, so the next
+        sync fetches them again instead of storing them as empty.
+
+        Returns:
+            List of (route_id, month) partitions that were added
+        """
+        if aggregator is None:
+            aggregator = DataAggregator()
+
+        if routes is None:
+            routes = AVAILABLE_ROUTES
+
+        if months is None:
+            months = aggregator.api.get_available_months()
+        months = [int(month) for month in months]
+
+        missing = self.missing_partitions(routes, months)
+        if not missing:
+            print(f"✓ Feature store up to date ({len(self.manifest['partitions'])} partitions)")
+            return []
+
+        fetch_routes = sorted({route_id for route_id, _ in missing})
+        fetch_months = sorted({month for _, month in missing})
+        print(f"Fetching {len(missing)} new partitions "
+              f"({len(fetch_routes)} routes x {len(fetch_months)} months)...")
+
+        failed = []
+        volume = aggregator.fetch_volume(fetch_routes, fetch_months, concurrent=concurrent, failed=failed)
+        failed = {(str(route_id), int(month)) for route_id, month in failed}
+
+        added = [partition for partition in missing if partition not in failed]
+        for route_id, month in added:
+            df = volume.get(month, {}).get(route_id, pd.DataFrame())
+            frame = build_route_features(df, route_id) if not df.empty else pd.DataFrame()
+            self.write_partition(route_id, month, frame)
+
+        if added:
+            self._save_manifest()
+        print(f"✓ Feature store updated: {len(added)} partitions added")
+        if failed:
+            print(f"⚠️  {len(failed)} partitions could not be fetched and will be retried on the next sync")
+        return added
+
+    # ==================== READING ====================
+
+    def load(self, routes=None, months=None):
+        """
+        Load training data with lag features from the stored partitions
+
+        Produces the same rows and values as DataAggregator.prepare_training_data,
+        in the same order, with a fresh index.
+
+        Args:
+            routes: List of route IDs (default: every stored route)
+            months: List of months (default: every stored month)
+
+        Returns:
+            DataFrame ready for model training with lag features
+        """
+        keys = []
+        for key, info in self.manifest['partitions'].items():
+            route_id, month = key.rsplit('/', 1)
+            if not info['rows']:
+                continue
+            if routes is not None and route_id not in {str(r) for r in routes}:
+                continue
+            if months is not None and int(month) not in {int(m) for m in months}:
+                continue
+            keys.append((route_id, int(month), info['file']))
+
+        if not keys:
+            return pd.DataFrame()
+
+        # Same order as sorting by route, year, month, hour
+        keys.sort(key=lambda k: (k[0], k[1]))
+
+        columns = {col: [] for col in SHARD_COLUMNS + ['inner_lag']}
+        route_ids = []
+        starts = []
+        offset = 0
+
+        for route_id, month, relative_path in keys:
+            with np.load(os.path.join(self.root, relative_path)) as shard:
+                for col in columns:
+                    columns[col].append(shard[col])
+                n = len(shard['passengers'])
+            route_ids.append(np.full(n, route_id, dtype=object))
+            starts.append(offset)
+            offset += n
+
+        data = {col: np.concatenate(parts) for col, parts in columns.items()}
+        route_column = np.concatenate(route_ids)
+        passengers = data['passengers']
+        prev_hour = data.pop('inner_lag')
+
+        # Only partition boundaries need their lag recomputed
+        for i, start in enumerate(starts):
+            if i > 0 and keys[i - 1][0] == keys[i][0]:
+                prev_hour[start] = passengers[start - 1]
+
+        df = pd.DataFrame({'route_id': route_column, **data})
+        df = df[['route_id', 'year', 'month', 'day', 'hour', 'day_of_week', 'is_weekend', 'passengers']]
+
+        grouped = df.groupby('route_id', sort=False)['passengers']
+        route_avg = grouped.transform('sum') / grouped.transform('count')
+        df['prev_hour_passengers'] = pd.Series(prev_hour, index=df.index).fillna(route_avg)
+
+        year_month = df['year'] * 100 + df['month']
+        labels = {ym: f"{ym // 100}-{ym % 100:02d}-01" for ym in year_month.unique()}
+        df['date'] = year_month.map(labels)
+
+        return df
+
+
+# ==================== TESTING ====================
+
+if __name__ == '__main__':
+    import time
+
+    print("="*60)
+    print("FEATURE STORE SYNC")
+    print("="*60)
+    print()
+
+    store = FeatureStore()
+
+    start = time.time()
+    added = store.sync()
+    print(f"Sync took {time.time() - start:.2f}s ({len(added)} partitions added)")
+
+    start = time.time()
+    df = store.load()
+    print(f"Load took {time.time() - start:.2f}s ({len(df):,} records)")
+
+    if not df.empty:
+        print()
+        print(df.head())
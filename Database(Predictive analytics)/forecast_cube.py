@@ -0,0 +1,393 @@
+"""
+Forecast Cube - Precomputed Network-Wide Predictions
+Predicts every route x hour for the next N days in one pass and serves
+prediction lookups as array slices instead of model invocations
+"""
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from APIClient import get_api_client
+from historical_averages import get_historical_average_table
+from model_provider import get_model_provider
+from model_artifacts import get_model_version
+from native_threads import run_blocking
+from config import (
+    AVAILABLE_ROUTES,
+    MODEL_FILE,
+    FORECAST_CUBE_FILE,
+    FORECAST_CUBE_DAYS,
+    FORECAST_CUBE_CHECK_SECONDS
+)
+
+
+def get_model_signature(model_file=MODEL_FILE):
+    """Return a string identifying the current model on disk"""
+    return get_model_version(model_file=model_file)
+
+def compute_cube_version(model_signature, averages_version, start, days, routes):
+    """Hash everything a cube's values depend on into a short version string"""
+    key = json.dumps([model_signature, averages_version, start.isoformat(), days, list(routes)])
+    return hashlib.md5(key.encode()).hexdigest()[:12]
+
+
+class ForecastCube:
+    """Predicted passengers for every route and hour from a start midnight"""
+
+    def __init__(self, routes, start, predictions, prev_hour, version, built_at=None,
+                 model_version=None):
+        """
+        Args:
+            routes: List of route IDs (row order of the arrays)
+            start: datetime of the first hour (midnight)
+            predictions: int32 array of shape (n_routes, n_hours)
+            prev_hour: float array of shape (n_routes, 24) with historical averages
+            version: Version string the cube was built for
+            built_at: ISO timestamp of the build
+            model_version: Version of the model that made the predictions
+        """
+        self.routes = list(routes)
+        self.route_index = {route_id: i for i, route_id in enumerate(self.routes)}
+        self.start = start
+        self.predictions = predictions
+        self.prev_hour = prev_hour
+        self.version = version
+        self.built_at = built_at or datetime.now().isoformat()
+        self.model_version = model_version
+
+    @property
+    def hours(self):
+        return self.predictions.shape[1]
+
+    @property
+    def end(self):
+        return self.start + timedelta(hours=self.hours)
+
+    def _offset(self, target_datetime):
+        """Hour offset of a datetime into the cube, or None if out of range"""
+        offset = int((target_datetime - self.start).total_seconds() // 3600)
+        if 0 <= offset < self.hours:
+            return offset
+        return None
+
+    def slice(self, route_id, start_datetime, hours):
+        """
+        Get a contiguous run of hourly predictions for a route
+
+        Args:
+            route_id: Route service number
+            start_datetime: datetime of the first hour
+            hours: Number of hours
+
+        Returns:
+            int32 array of predicted passengers, or None if not fully covered
+        """
+        row = self.route_index.get(route_id)
+        offset = self._offset(start_datetime)
+
+        if row is None or offset is None or offset + hours > self.hours:
+            return None
+
+        return self.predictions[row, offset:offset + hours]
+
+    def lookup(self, items):
+        """
+        Look up predictions for (route_id, datetime) pairs
+
+        Args:
+            items: List of (route_id, target_datetime) tuples
+
+        Returns:
+            Tuple of arrays aligned with items: covered (bool), predicted
+            passengers (int32) and previous-hour passengers (float64); the
+            values of items the cube does not cover are 0
+        """
+        n = len(items)
+        rows = np.fromiter((self.route_index.get(route_id, -1) for route_id, _ in items), dtype=np.int64, count=n)
+        times = np.array([target_datetime for _, target_datetime in items], dtype='datetime64[s]').reshape(n)
+
+        one_hour = np.timedelta64(1, 'h')
+        offsets = (times - np.datetime64(self.start, 's')) // one_hour
+        hours = (times - times.astype('datetime64[D]')) // one_hour
+
+        covered = (rows >= 0) & (offsets >= 0) & (offsets < self.hours)
+        predicted = np.zeros(n, dtype=np.int32)
+        prev_hour = np.zeros(n, dtype=np.float64)
+        predicted[covered] = self.predictions[rows[covered], offsets[covered]]
+        prev_hour[covered] = self.prev_hour[rows[covered], hours[covered]]
+
+        return covered, predicted, prev_hour
+
+    # ==================== PERSISTENCE ====================
+
+    def save(self, path=FORECAST_CUBE_FILE):
+        """Save the cube arrays and index as a compressed .npz file"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        meta = {
+            'routes': self.routes,
+            'start': self.start.isoformat(),
+            'version': self.version,
+            'built_at': self.built_at,
+            'model_version': self.model_version
+        }
+
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            predictions=self.predictions,
+            prev_hour=self.prev_hour,
+            meta=np.array(json.dumps(meta))
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=FORECAST_CUBE_FILE):
+        """Load a cube saved with save(), or return None if there is none"""
+        if not os.path.exists(path):
+            return None
+
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            return cls(
+                routes=meta['routes'],
+                start=datetime.fromisoformat(meta['start']),
+                predictions=data['predictions'],
+                prev_hour=data['prev_hour'],
+                version=meta['version'],
+                built_at=meta['built_at'],
+                model_version=meta.get('model_version')
+            )
+
+
+def build_forecast_cube(model, db_client=None, routes=None, days=FORECAST_CUBE_DAYS,
+                        start=None, version=None):
+    """
+    Predict every route x hour for the next N days with a single model call
+
+    Args:
+        model: Trained model
+        db_client: API client (optional)
+        routes: List of route IDs (default: all available routes)
+        days: Number of days to cover
+        start: Midnight datetime of the first day (default: today)
+        version: Version string to stamp on the cube
+
+    Returns:
+        ForecastCube instance
+    """
+    # Imported here so managers can be created without loading pandas
+    import pandas as pd
+    from prediction_functions import FEATURE_ORDER
+
+    if routes is None:
+        routes = AVAILABLE_ROUTES
+
+    if start is None:
+        start = datetime.combine(datetime.now().date(), datetime.min.time())
+
+    table = get_historical_average_table(db_client)
+    for route_id in routes:
+        if not table.has_route(route_id):
+            table.add_route(route_id, db_client=db_client)
+
+    prev_hour = np.array([table.hourly_profile(route_id) for route_id in routes], dtype=np.float64)
+
+    # Calendar features are shared by every route
+    n_hours = days * 24
+    timestamps = pd.date_range(start, periods=n_hours, freq='h')
+    hour = timestamps.hour.to_numpy()
+    day_of_week = timestamps.dayofweek.to_numpy()
+    is_weekend = (day_of_week >= 5).astype(int)
+    month = timestamps.month.to_numpy()
+
+    n_routes = len(routes)
+    X = pd.DataFrame({
+        'hour': np.tile(hour, n_routes),
+        'day_of_week': np.tile(day_of_week, n_routes),
+        'is_weekend': np.tile(is_weekend, n_routes),
+        'month': np.tile(month, n_routes),
+        'prev_hour_passengers': prev_hour[:, hour].ravel()
+    })[FEATURE_ORDER]
+
+    # The one big model call runs on a native thread on gevent workers
+    raw = np.asarray(run_blocking(model.predict, X)).reshape(n_routes, n_hours)
+    # Same rounding as build_prediction_result, so lookups match live predictions
+    predictions = np.rint(np.maximum(raw, 0)).astype(np.int32)
+
+    return ForecastCube(routes, start, predictions, prev_hour, version,
+                        model_version=getattr(model, 'model_version', None))
+
+
+class ForecastCubeManager:
+    """Keeps a forecast cube current and rebuilds it in the background"""
+
+    def __init__(self, model=None, db_client=None, routes=None, days=FORECAST_CUBE_DAYS,
+                 path=FORECAST_CUBE_FILE, model_file=MODEL_FILE, model_provider=None):
+        """
+        Args:
+            model: Pre-loaded model (optional, reloaded when the model file changes)
+            db_client: API client (optional)
+            routes: List of route IDs (default: all available routes)
+            days: Number of days each cube covers
+            path: File the cube is saved to
+            model_file: Model file whose changes trigger a rebuild
+            model_provider: ModelProvider supplying the model (optional, replaces
+                            model and model_file)
+        """
+        self.model = model
+        self.db_client = db_client
+        self.routes = list(routes or AVAILABLE_ROUTES)
+        self.days = days
+        self.path = path
+        self.model_file = model_file
+        self.model_provider = model_provider
+
+        self.model_signature = get_model_signature(model_file) if model is not None else None
+        self.cube = None
+
+        self._build_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._thread = None
+
+    def _model_signature(self):
+        """Version of the model the cube should be built with"""
+        if self.model_provider is not None:
+            self.model_provider.get()
+            return self.model_provider.version
+        return get_model_signature(self.model_file)
+
+    def _current_version(self):
+        """Version the cube should have right now"""
+        start = datetime.combine(datetime.now().date(), datetime.min.time())
+        averages_version = get_historical_average_table(self.db_client).version
+        version = compute_cube_version(
+            self._model_signature(), averages_version, start, self.days, self.routes
+        )
+        return version, start
+
+    def invalidate(self, model=None, version=None):
+        """
+        Drop the current cube and rebuild it in the background
+
+        Used as a ModelProvider listener, so predictions stop coming from the
+        previous model as soon as a new one is swapped in.
+
+        Args:
+            model: Newly active model (optional)
+            version: Version of the new model (optional)
+        """
+        if model is not None:
+            self.model = model
+            self.model_signature = version
+        self.cube = None
+        self._wake_event.set()
+
+    def get(self):
+        """
+        Get the current cube without blocking
+
+        Returns:
+            ForecastCube, or None while no valid cube has been built
+        """
+        cube = self.cube
+        if cube is None or datetime.now() >= cube.end:
+            return None
+        return cube
+
+    def refresh(self, force=False):
+        """
+        Rebuild the cube if the model, historical averages or day have changed
+
+        Returns:
+            True if a new cube was built or loaded
+        """
+        with self._build_lock:
+            version, start = self._current_version()
+
+            if not force and self.cube is not None and self.cube.version == version:
+                return False
+
+            # Reuse a cube saved by another process if it is still current
+            if not force:
+                saved = ForecastCube.load(self.path)
+                if saved is not None and saved.version == version:
+                    self.cube = saved
+                    return True
+
+            if self.model_provider is not None:
+                self.model = self.model_provider.get()
+                self.model_signature = self.model_provider.version
+            else:
+                signature = get_model_signature(self.model_file)
+                if self.model is None or signature != self.model_signature:
+                    self.model = get_model_provider().get()
+                    self.model_signature = signature
+
+            cube = build_forecast_cube(
+                self.model, self.db_client, self.routes, self.days, start, version
+            )
+            cube.save(self.path)
+            self.cube = cube
+
+            print(f"✓ Forecast cube built: {len(self.routes)} routes x {cube.hours} hours "
+                  f"(version {version})")
+            return True
+
+    def _run(self, interval):
+        while not self._stop_event.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Warning: Could not refresh forecast cube: {e}")
+            self._wake_event.wait(interval)
+            self._wake_event.clear()
+
+    def start(self, interval=FORECAST_CUBE_CHECK_SECONDS):
+        """Start the background refresh job"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(interval,), name='forecast-cube', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background refresh job"""
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+# ==================== TESTING ====================
+
+if __name__ == '__main__':
+    print("="*60)
+    print("FORECAST CUBE BUILD")
+    print("="*60)
+    print()
+
+    manager = ForecastCubeManager(db_client=get_api_client())
+    manager.refresh(force=True)
+    cube = manager.get()
+
+    print(f"Version: {cube.version}")
+    print(f"Covers: {cube.start.isoformat()} to {cube.end.isoformat()}")
+    print(f"Array: {cube.predictions.shape} ({cube.predictions.nbytes / 1024:.1f} KB)")
+    print()
+
+    now = datetime.now()
+    for route_id in cube.routes[:3]:
+        next_hours = cube.slice(route_id, now, 6)
+        print(f"Route {route_id} next 6 hours: {next_hours.tolist()}")
@@ -0,0 +1,231 @@
+"""
+Forest Engine - Array-Based Random Forest Inference
+Flattens a trained sklearn RandomForestRegressor into contiguous NumPy arrays
+and predicts with a pure-NumPy traversal, skipping sklearn's per-call input
+validation and joblib dispatch that dominate small-batch latency
+"""
+import numpy as np
+
+from config import FLAT_FOREST_BLOCK_ENTRIES
+
+# Arrays that fully describe a flattened forest
+FOREST_ARRAYS = ['feature', 'threshold', 'left', 'right', 'value', 'roots', 'missing_go_to_left', 'children']
+
+
+class FlatForest:
+    """Random forest regressor stored as concatenated node arrays"""
+
+    def __init__(self, feature, threshold, left, right, value, roots,
+                 max_depth, n_features, feature_names=None, missing_go_to_left=None,
+                 children=None, block_entries=FLAT_FOREST_BLOCK_ENTRIES):
+        """
+        Initialize from flattened node arrays
+
+        Node indices are global across the forest, and leaves point to themselves.
+
+        Args:
+            feature: Split feature per node (0 for leaves)
+            threshold: Split threshold per node
+            left: Left child per node
+            right: Right child per node
+            value: Prediction per node (only read at leaves)
+            roots: Root node of each tree
+            max_depth: Depth of the deepest tree
+            n_features: Number of input features
+            feature_names: Column order expected from DataFrame inputs (optional)
+            missing_go_to_left: Where NaN inputs go at each node (optional)
+            children: Right and left child of each node, interleaved (optional;
+                      built from left and right when missing)
+            block_entries: Target number of (row, tree) pairs walked together;
+                           large batches are walked a block of trees at a time
+        """
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.n_features_in_ = int(n_features)
+        self.feature_names_in_ = None if feature_names is None else np.asarray(feature_names, dtype=object)
+        self.missing_go_to_left = missing_go_to_left
+        self.children = np.stack([right, left], axis=1).ravel() if children is None else children
+        self.n_trees = len(roots)
+        self.block_entries = int(block_entries)
+        self._is_leaf = left == np.arange(len(left))
+
+        # Index arrays saved as intp are used as-is (memory-mapped and shared);
+        # older int32 artifacts are converted once per process
+        self._children = np.asarray(self.children, dtype=np.intp)
+        self._feature = np.asarray(feature, dtype=np.intp)
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """
+        Flatten a fitted RandomForestRegressor
+
+        Args:
+            model: Fitted single-output sklearn RandomForestRegressor
+
+        Returns:
+            FlatForest
+        """
+        features, thresholds, lefts, rights, values, missing = [], [], [], [], [], []
+        roots = []
+        offset = 0
+        max_depth = 0
+        has_missing = True
+
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            is_leaf = tree.children_left == -1
+            own_index = np.arange(offset, offset + n_nodes)
+
+            roots.append(offset)
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            lefts.append(np.where(is_leaf, own_index, tree.children_left + offset))
+            rights.append(np.where(is_leaf, own_index, tree.children_right + offset))
+            values.append(tree.value[:, 0, 0])
+
+            mgl = getattr(tree, 'missing_go_to_left', None)
+            if mgl is None:
+                has_missing = False
+            else:
+                missing.append(np.asarray(mgl, dtype=bool))
+
+            max_depth = max(max_depth, tree.max_depth)
+            offset += n_nodes
+
+        left = np.concatenate(lefts).astype(np.int32)
+        right = np.concatenate(rights).astype(np.int32)
+
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            left=left,
+            right=right,
+            value=np.concatenate(values).astype(np.float64),
+            roots=np.asarray(roots, dtype=np.int32),
+            max_depth=max_depth,
+            n_features=model.n_features_in_,
+            feature_names=getattr(model, 'feature_names_in_', None),
+            missing_go_to_left=np.concatenate(missing) if has_missing else None,
+            children=np.stack([right, left], axis=1).ravel().astype(np.intp)
+        )
+
+    def _as_array(self, X):
+        """Convert input to the float32 matrix sklearn trees compare against"""
+        # DataFrames are matched by duck type so loading a model does not import pandas
+        if hasattr(X, 'columns') and self.feature_names_in_ is not None:
+            X = X[list(self.feature_names_in_)]
+
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"X has {X.shape[1]} features, but FlatForest expects {self.n_features_in_}"
+            )
+        return X
+
+    def predict(self, X):
+        """
+        Predict with every tree at once
+
+        Matches RandomForestRegressor.predict exactly: inputs are cast to
+        float32, splits use x <= threshold, and tree outputs are summed in
+        tree order before dividing by the number of trees. Large batches are
+        walked one block of trees at a time, so the working arrays stay near
+        block_entries (row, tree) pairs and in cache however many rows come in.
+
+        Args:
+            X: DataFrame or array of shape (n_samples, n_features)
+
+        Returns:
+            Array of predictions, shape (n_samples,)
+        """
+        X = self._as_array(X)
+        n_samples = X.shape[0]
+        if n_samples == 0:
+            return np.empty(0, dtype=np.float64)
+
+        # Feature-major, so rows reading the same feature sit next to each other
+        X_flat = np.ascontiguousarray(X.T).ravel()
+        rows = np.arange(n_samples, dtype=np.intp)
+        block = max(1, min(self.n_trees, self.block_entries // n_samples))
+
+        total = np.zeros(n_samples, dtype=np.float64)
+        for start in range(0, self.n_trees, block):
+            roots = self.roots[start:start + block].astype(np.intp)
+
+            # One entry per (tree, row), walked down until every entry sits on a leaf
+            nodes = np.repeat(roots, n_samples)
+            active = np.flatnonzero(~self._is_leaf[nodes])
+            current = nodes[active]
+            row = np.tile(rows, len(roots))[active]
+            while active.size:
+                x = X_flat[self._feature[current] * n_samples + row]
+                go_left = x <= self.threshold[current]
+                if self.missing_go_to_left is not None:
+                    go_left |= np.isnan(x) & self.missing_go_to_left[current]
+                current = self._children[2 * current + go_left]
+                nodes[active] = current
+                keep = ~self._is_leaf[current]
+                active, current, row = active[keep], current[keep], row[keep]
+
+            # Adding tree by tree keeps the order sklearn accumulates trees in
+            for leaf_values in self.value[nodes].reshape(len(roots), n_samples):
+                total += leaf_values
+
+        return total / self.n_trees
+
+    def arrays(self):
+        """Get the node arrays (for saving as an artifact)"""
+        return {
+            name: getattr(self, name) for name in FOREST_ARRAYS
+            if getattr(self, name) is not None
+        }
+
+    def metadata(self):
+        """Get the scalar attributes needed to rebuild the forest from its arrays"""
+        return {
+            'max_depth': self.max_depth,
+            'n_features': self.n_features_in_,
+            'n_trees': self.n_trees,
+            'n_nodes': int(len(self.feature)),
+            'feature_names': None if self.feature_names_in_ is None else list(self.feature_names_in_)
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays, metadata):
+        """
+        Rebuild a forest from arrays() and metadata() output
+
+        Args:
+            arrays: Dict of node arrays (may be memory-mapped)
+            metadata: Dict from metadata()
+
+        Returns:
+            FlatForest
+        """
+        return cls(
+            feature=arrays['feature'],
+            threshold=arrays['threshold'],
+            left=arrays['left'],
+            right=arrays['right'],
+            value=arrays['value'],
+            roots=arrays['roots'],
+            max_depth=metadata['max_depth'],
+            n_features=metadata['n_features'],
+            feature_names=metadata.get('feature_names'),
+            missing_go_to_left=arrays.get('missing_go_to_left'),
+            children=arrays.get('children')
+        )
+
+    @property
+    def nbytes(self):
+        """Total size of the node arrays in bytes"""
+        return sum(array.nbytes for array in self.arrays().values())
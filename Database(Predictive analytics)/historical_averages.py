@@ -0,0 +1,455 @@
+"""
+Historical Average Table
+Precomputed (route, direction, day type, hour) ridership averages used as the
+prev_hour_passengers fallback, so predictions never pull full route history over HTTP
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from datetime import datetime
+
+from APIClient import get_api_client
+from config import (
+    AVAILABLE_ROUTES,
+    HISTORICAL_AVERAGES_FILE,
+    HISTORICAL_AVERAGES_REFRESH_SECONDS,
+    HISTORICAL_AVERAGES_MISSING_RETRY_SECONDS
+)
+
+DEFAULT_AVERAGE = 100.0
+
+
+class HistoricalAverageTable:
+    """In-memory table of passenger sums and counts keyed by (route, direction, day, hour)"""
+
+    def __init__(self, path=HISTORICAL_AVERAGES_FILE):
+        """
+        Initialize an empty table
+
+        Args:
+            path: JSON file the table is saved to and loaded from
+        """
+        self.path = path
+        self.routes = set()
+
+        # (route, direction) -> months whose volume has been merged for it
+        self.route_months = {}
+        self.version = None
+        self.built_at = None
+        self.last_refresh_check = 0.0
+
+        # (route, direction) -> time a load found no volume data
+        self.missing = {}
+
+        self._cells = {}
+        self._by_hour = {}
+        self._by_route = {}
+        self._lock = threading.Lock()
+
+    @property
+    def months(self):
+        """Every month merged for at least one route"""
+        return set().union(*self.route_months.values())
+
+    # ==================== BUILDING ====================
+
+    def _merge_volume(self, cells, route_id, direction, volume_df):
+        """Add the rows of a volume DataFrame to a cells dict"""
+        months = set()
+
+        if volume_df.empty:
+            return months
+
+        grouped = volume_df.groupby(['day', 'hour'])['total_passengers'].agg(['sum', 'count'])
+        for (day, hour), row in grouped.iterrows():
+            key = (str(route_id), int(direction), str(day), int(hour))
+            total, count = cells.get(key, (0.0, 0))
+            cells[key] = (total + float(row['sum']), count + int(row['count']))
+
+        months.update(int(m) for m in volume_df['month'].unique())
+        return months
+
+    def _reindex(self, cells):
+        """Rebuild the derived hour and route lookups, then swap them in"""
+        by_hour = {}
+        by_route = {}
+
+        for (route_id, direction, day, hour), (total, count) in cells.items():
+            hour_total, hour_count = by_hour.get((route_id, direction, hour), (0.0, 0))
+            by_hour[(route_id, direction, hour)] = (hour_total + total, hour_count + count)
+
+            route_total, route_count = by_route.get((route_id, direction), (0.0, 0))
+            by_route[(route_id, direction)] = (route_total + total, route_count + count)
+
+        digest = hashlib.md5(
+            json.dumps(sorted([list(k) + list(v) for k, v in cells.items()])).encode()
+        ).hexdigest()
+
+        self._cells = cells
+        self._by_hour = by_hour
+        self._by_route = by_route
+        self.version = digest[:12]
+        self.built_at = datetime.now().isoformat()
+
+    def build(self, db_client=None, routes=None, directions=(1,)):
+        """
+        Build the table from the full volume history of each route
+
+        Args:
+            db_client: API client (optional)
+            routes: List of route IDs (default: all available routes)
+            directions: Route directions to include (default: direction 1)
+        """
+        if db_client is None:
+            db_client = get_api_client()
+
+        if routes is None:
+            routes = AVAILABLE_ROUTES
+
+        cells = {}
+        route_months = {}
+        loaded = set()
+        missing = {}
+
+        for route_id in routes:
+            for direction in directions:
+                key = (str(route_id), int(direction))
+                volume_df = db_client.get_bus_volume_by_route(route_id, month=None, direction=direction)
+
+                # Routes without data stay unloaded; add_route retries them later
+                if not volume_df.empty:
+                    route_months[key] = self._merge_volume(cells, route_id, direction, volume_df)
+                    loaded.add(key)
+                else:
+                    missing[key] = time.time()
+
+        with self._lock:
+            self.route_months = route_months
+            self.routes = loaded
+            self.missing = missing
+            self._reindex(cells)
+            self.last_refresh_check = time.time()
+
+        print(f"✓ Historical averages built: {len(loaded)} routes, {len(self.months)} months")
+
+    def add_route(self, route_id, direction=1, db_client=None,
+                  retry_after=HISTORICAL_AVERAGES_MISSING_RETRY_SECONDS):
+        """
+        Load a route that is not in the table yet
+
+        A route found to have no volume data is not fetched again for
+        retry_after seconds, so lookups for it stay in memory meanwhile.
+
+        Args:
+            route_id: Route service number
+            direction: Route direction
+            db_client: API client (optional)
+            retry_after: Seconds before a route without data is fetched again
+        """
+        key = (str(route_id), int(direction))
+        missing_since = self.missing.get(key)
+        if missing_since is not None and time.time() - missing_since < retry_after:
+            return
+
+        if db_client is None:
+            db_client = get_api_client()
+
+        volume_df = db_client.get_bus_volume_by_route(route_id, month=None, direction=direction)
+
+        if volume_df.empty:
+            with self._lock:
+                self.missing[key] = time.time()
+            return
+
+        with self._lock:
+            self.missing.pop(key, None)
+            if key in self.routes:
+                return  # Loaded by another thread meanwhile
+            cells = dict(self._cells)
+            self.route_months[key] = self._merge_volume(cells, route_id, direction, volume_df)
+            self.routes.add(key)
+            self._reindex(cells)
+
+    def refresh(self, db_client=None):
+        """
+        Fold in any months that were published since each route was loaded
+
+        Months are tracked per (route, direction) and marked as merged only for
+        routes whose fetch succeeded, so a failed fetch is retried on the next
+        refresh. The volume is fetched without holding the lock; it is merged
+        into a copy of the cells taken under the lock, so routes added
+        meanwhile are kept.
+
+        Args:
+            db_client: API client (optional)
+
+        Returns:
+            List of months that were added for at least one route
+        """
+        if db_client is None:
+            db_client = get_api_client()
+
+        self.last_refresh_check = time.time()
+
+        available = sorted(int(m) for m in db_client.get_available_months())
+
+        # Routes missing the same months are fetched together, one request per group
+        pending = {}
+        with self._lock:
+            for route_id, direction in sorted(self.routes):
+                merged = self.route_months.get((route_id, direction), set())
+                months = tuple(m for m in available if m not in merged)
+                if months:
+                    pending.setdefault((direction, months), []).append(route_id)
+
+        if not pending:
+            return []
+
+        fetched = []
+        failed = []
+        for (direction, months), route_ids in pending.items():
+            group_failed = []
+            volume = db_client.get_bus_volume_by_routes(
+                route_ids, months=list(months), directions=(direction,), failed=group_failed
+            )
+            failed += [(route_id, direction) for route_id in group_failed]
+            fetched += [
+                (route_id, direction, months, volume[route_id])
+                for route_id in route_ids if route_id not in group_failed
+            ]
+
+        new_months = sorted({month for _, _, months, _ in fetched for month in months})
+
+        if fetched:
+            with self._lock:
+                cells = dict(self._cells)
+                for route_id, direction, months, volume_df in fetched:
+                    self._merge_volume(cells, route_id, direction, volume_df)
+                    self.route_months.setdefault((route_id, direction), set()).update(months)
+                self._reindex(cells)
+
+            print(f"✓ Historical averages refreshed with months: {new_months}")
+            self.save()
+
+        if failed:
+            print(f"⚠️  {len(failed)} routes could not be refreshed and will be retried on the next refresh")
+
+        return new_months
+
+    def maybe_refresh(self, db_client=None, interval=HISTORICAL_AVERAGES_REFRESH_SECONDS):
+        """Refresh the table if the last check is older than interval seconds"""
+        if time.time() - self.last_refresh_check < interval:
+            return []
+
+        try:
+            return self.refresh(db_client)
+        except Exception as e:
+            print(f"Warning: Could not refresh historical averages: {e}")
+            return []
+
+    # ==================== LOOKUPS ====================
+
+    def has_route(self, route_id, direction=1):
+        """Check whether a route has been loaded into the table"""
+        return (str(route_id), int(direction)) in self.routes
+
+    def get(self, route_id, hour, direction=1, day_type=None):
+        """
+        Look up the historical average for a route and hour
+
+        Args:
+            route_id: Route service number
+            hour: Hour of day (0-23)
+            direction: Route direction (default 1)
+            day_type: BusVolume day type, or None to average across all day types
+
+        Returns:
+            Average passenger count, falling back to the route average and then
+            DEFAULT_AVERAGE when the route has no data
+        """
+        route_id = str(route_id)
+        direction = int(direction)
+        hour = int(hour)
+
+        if day_type is not None:
+            total, count = self._cells.get((route_id, direction, str(day_type), hour), (0.0, 0))
+        else:
+            total, count = self._by_hour.get((route_id, direction, hour), (0.0, 0))
+
+        if count:
+            return total / count
+
+        total, count = self._by_route.get((route_id, direction), (0.0, 0))
+        if count:
+            return total / count
+
+        return DEFAULT_AVERAGE
+
+    def hourly_profile(self, route_id, direction=1, day_type=None):
+        """Return the 24 hourly averages for a route"""
+        return [self.get(route_id, hour, direction, day_type) for hour in range(24)]
+
+    # ==================== PERSISTENCE ====================
+
+    def save(self, path=None):
+        """Save the table to disk as JSON"""
+        path = path or self.path
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        payload = {
+            'version': self.version,
+            'built_at': self.built_at,
+            'months': sorted(self.months),
+            'routes': sorted([list(r) for r in self.routes]),
+            'route_months': [[r, d, sorted(months)] for (r, d), months in sorted(self.route_months.items())],
+            'cells': [list(k) + list(v) for k, v in sorted(self._cells.items())]
+        }
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, path)
+
+    def load(self, path=None):
+        """
+        Load the table from disk
+
+        Returns:
+            True if the file existed and was loaded
+        """
+        path = path or self.path
+
+        if not os.path.exists(path):
+            return False
+
+        with open(path) as f:
+            payload = json.load(f)
+
+        cells = {
+            (str(r), int(d), str(day), int(h)): (float(total), int(count))
+            for r, d, day, h, total, count in payload.get('cells', [])
+        }
+
+        routes = set((str(r), int(d)) for r, d in payload.get('routes', []))
+        if 'route_months' in payload:
+            route_months = {
+                (str(r), int(d)): set(int(m) for m in months)
+                for r, d, months in payload['route_months']
+            }
+        else:
+            # Tables saved before months were tracked per route
+            months = set(int(m) for m in payload.get('months', []))
+            route_months = {key: set(months) for key in routes}
+
+        with self._lock:
+            self.route_months = route_months
+            self.routes = routes
+            self._reindex(cells)
+            self.built_at = payload.get('built_at', self.built_at)
+
+        return True
+
+
+# ==================== SINGLETON INSTANCE ====================
+
+_average_table = None
+_average_table_lock = threading.Lock()
+
+def get_historical_average_table(db_client=None):
+    """
+    Get the process-wide historical average table
+
+    Loads the table from disk if it was saved before, otherwise builds it from
+    the API and saves it. New months are folded in by the background job
+    (start_refresh_job), never on the calling thread.
+
+    Args:
+        db_client: API client (optional)
+
+    Returns:
+        HistoricalAverageTable instance
+    """
+    global _average_table
+
+    if _average_table is None:
+        with _average_table_lock:
+            if _average_table is None:
+                table = HistoricalAverageTable()
+                if table.load():
+                    # Saved table may be stale; check for new months on first use
+                    table.last_refresh_check = 0.0
+                else:
+                    table.build(db_client)
+                    if table.routes:
+                        table.save()
+                _average_table = table
+
+    return _average_table
+
+_refresh_thread = None
+_refresh_stop_event = threading.Event()
+
+def _run_refresh_job(db_client, interval):
+    while not _refresh_stop_event.is_set():
+        try:
+            get_historical_average_table(db_client).maybe_refresh(db_client, interval)
+        except Exception as e:
+            print(f"Warning: Historical average refresh failed: {e}")
+        _refresh_stop_event.wait(interval)
+
+def start_refresh_job(db_client=None, interval=HISTORICAL_AVERAGES_REFRESH_SECONDS):
+    """
+    Start the background thread that loads the table and checks for new months
+
+    Args:
+        db_client: API client (optional)
+        interval: Seconds between checks for new months
+    """
+    global _refresh_thread
+
+    if _refresh_thread is not None and _refresh_thread.is_alive():
+        return
+
+    _refresh_stop_event.clear()
+    _refresh_thread = threading.Thread(
+        target=_run_refresh_job, args=(db_client, interval),
+        name='historical-averages-refresh', daemon=True
+    )
+    _refresh_thread.start()
+
+def stop_refresh_job():
+    """Stop the background refresh thread"""
+    global _refresh_thread
+
+    _refresh_stop_event.set()
+    if _refresh_thread is not None:
+        _refresh_thread.join(timeout=5)
+        _refresh_thread = None
+
+
+# ==================== TESTING ====================
+
+if __name__ == '__main__':
+    print("="*60)
+    print("HISTORICAL AVERAGE TABLE")
+    print("="*60)
+    print()
+
+    table = HistoricalAverageTable()
+    table.build()
+    table.save()
+
+    print(f"Saved to: {table.path}")
+    print(f"Version: {table.version}")
+    print(f"Months: {sorted(table.months)}")
+    print()
+
+    for route_id in AVAILABLE_ROUTES[:3]:
+        profile = table.hourly_profile(route_id)
+        peak_hour = max(range(24), key=lambda h: profile[h])
+        print(f"Route {route_id}: peak hour {peak_hour}:00 ({profile[peak_hour]:.0f} avg passengers)")
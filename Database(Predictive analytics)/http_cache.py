@@ -0,0 +1,188 @@
+"""
+HTTP Cache - ETag / Cache-Control Support for Flask GET Endpoints
+Derives strong ETags from the versions a response depends on, answers
+If-None-Match with 304 before any work is done, and keeps the rendered bodies
+of recent ETags in memory so repeated requests are not recomputed. Backend
+data is versioned by the API client's cached copy of it while that is fresh,
+and otherwise by a hash of its content.
+"""
+import json
+import hashlib
+import functools
+import threading
+from collections import OrderedDict
+
+from flask import Response, g, request, make_response
+
+from config import HTTP_CACHE_MAX_AGE, HTTP_CACHE_MAX_ENTRIES
+
+
+def compute_etag(path, args, versions):
+    """
+    Build a strong ETag for a request
+
+    Args:
+        path: Request path
+        args: Query parameters (MultiDict or dict)
+        versions: Version strings of everything the response depends on
+
+    Returns:
+        Unquoted ETag value
+    """
+    items = sorted(args.items(multi=True)) if hasattr(args, 'getlist') else sorted(args.items())
+    payload = json.dumps([path, items, [str(v) for v in versions]])
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+def content_version(payload):
+    """Version of data without a version of its own: a hash of its content"""
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()[:32]
+
+def set_content_version(*payloads):
+    """
+    Record the upstream data a content-versioned response was built from
+
+    Views wrapped by http_cached without a versions function call this once
+    they have data worth caching; a response without it (degraded or empty
+    upstream data) is sent uncached.
+
+    Args:
+        payloads: Upstream data the response is derived from
+    """
+    g.http_content_version = content_version(payloads)
+
+
+class ResponseBodyCache:
+    """Size-bounded LRU of rendered response bodies keyed by ETag"""
+
+    def __init__(self, max_entries=HTTP_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self, etag):
+        with self._lock:
+            entry = self._entries.get(etag)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(etag)
+            self.hits += 1
+            return entry
+
+    def put(self, etag, body, mimetype):
+        with self._lock:
+            self._entries[etag] = (body, mimetype)
+            self._entries.move_to_end(etag)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def stats(self):
+        """
+        Get cache counters
+
+        Returns:
+            Dict with entries, hits, misses and 304 responses
+        """
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified
+            }
+
+
+# Shared by every cached endpoint in the process
+RESPONSE_CACHE = ResponseBodyCache()
+
+def http_cached(name, versions=None):
+    """
+    Serve a GET endpoint with a strong ETag, Cache-Control and 304 responses
+
+    Requests with save=true are passed straight through, since they have a
+    side effect. Only 200 responses are cached.
+
+    When the versions function can name the versions up front, a matching
+    If-None-Match is answered with 304 and a repeated request with the cached
+    body, both without running the view. Otherwise the view runs, and the ETag
+    comes from the versions as they are afterwards, or else from the upstream
+    data the view passed to set_content_version. A response with neither is
+    sent uncached.
+
+    Args:
+        name: Endpoint name in HTTP_CACHE_MAX_AGE
+        versions: Function called with the view's arguments, returning the
+                  version strings the response depends on, or None when they
+                  are not known before the view runs (optional)
+
+    Returns:
+        Decorator for a Flask view function
+    """
+    max_age = HTTP_CACHE_MAX_AGE[name]
+    cache_control = f"public, max-age={max_age}"
+
+    def decorator(view):
+        def current_etag(args, kwargs):
+            """ETag for the current versions, or None if they are unknown"""
+            if versions is None:
+                return None
+            try:
+                current = versions(*args, **kwargs)
+            except Exception as e:
+                print(f"Warning: Could not compute ETag for {request.path}: {e}")
+                return None
+            return None if current is None else compute_etag(request.path, request.args, current)
+
+        def finish(response, etag):
+            if request.if_none_match.contains(etag):
+                RESPONSE_CACHE.record_not_modified()
+                response = Response(status=304)
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = cache_control
+            return response
+
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.args.get('save', 'false').lower() == 'true':
+                return view(*args, **kwargs)
+
+            etag = current_etag(args, kwargs)
+            if etag is not None:
+                if request.if_none_match.contains(etag):
+                    return finish(Response(status=304), etag)
+
+                cached = RESPONSE_CACHE.get(etag)
+                if cached is not None:
+                    body, mimetype = cached
+                    return finish(Response(body, mimetype=mimetype), etag)
+
+            g.http_content_version = None
+            response = make_response(view(*args, **kwargs))
+            content = g.pop('http_content_version', None)
+
+            if response.status_code != 200:
+                return response
+
+            # The view may have refreshed the data the versions describe
+            etag = current_etag(args, kwargs)
+            if etag is not None:
+                RESPONSE_CACHE.put(etag, response.get_data(), response.mimetype)
+            elif content is not None:
+                etag = compute_etag(request.path, request.args, [content])
+            else:
+                response.headers['Cache-Control'] = 'no-store'
+                return response
+
+            return finish(response, etag)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,198 @@
+"""
+Model Artifacts - Memory-Mapped, Checksum-Versioned Model Storage
+Saves the trained forest as raw .npy node arrays plus a manifest, so every
+WSGI worker memory-maps the same read-only files instead of unpickling a
+private copy of the model
+"""
+import os
+import json
+import shutil
+import hashlib
+from datetime import datetime
+
+import numpy as np
+
+from forest_engine import FlatForest
+from config import MODEL_ARTIFACT_DIR, MODEL_ARTIFACT_KEEP, MODEL_FILE
+
+MANIFEST_FILE = 'manifest.json'
+
+
+def _sha256_file(path):
+    """Hash a file in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def read_manifest(artifact_dir=MODEL_ARTIFACT_DIR):
+    """
+    Read the manifest of the current model artifact
+
+    Returns:
+        Manifest dict, or None if no artifact has been saved
+    """
+    try:
+        with open(os.path.join(artifact_dir, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def has_model_artifact(artifact_dir=MODEL_ARTIFACT_DIR):
+    """Check whether a model artifact has been saved"""
+    return read_manifest(artifact_dir) is not None
+
+def get_model_version(artifact_dir=MODEL_ARTIFACT_DIR, model_file=MODEL_FILE):
+    """
+    Identify the model currently on disk
+
+    Returns:
+        The artifact's model_version, else a signature of the pickled model
+        file, or 'missing' if neither exists
+    """
+    manifest = read_manifest(artifact_dir)
+    if manifest is not None:
+        return manifest['model_version']
+
+    try:
+        stat = os.stat(model_file)
+        return f"pkl-{stat.st_mtime_ns}-{stat.st_size}"
+    except OSError:
+        return 'missing'
+
+def save_model_artifact(model, artifact_dir=MODEL_ARTIFACT_DIR, metrics=None, keep=MODEL_ARTIFACT_KEEP):
+    """
+    Save a trained forest as a versioned artifact
+
+    Arrays are written to a new version directory first; the top-level
+    manifest is then replaced atomically, so readers see either the old or
+    the new model, never a partial one. Workers that still map an older
+    version keep working until they reload.
+
+    Args:
+        model: Fitted RandomForestRegressor or FlatForest
+        artifact_dir: Artifact root directory
+        metrics: Evaluation metrics to record in the manifest (optional)
+        keep: Number of version directories to keep on disk
+
+    Returns:
+        Manifest dict of the saved artifact
+    """
+    flat = model if isinstance(model, FlatForest) else FlatForest.from_sklearn(model)
+    arrays = flat.arrays()
+
+    staging_dir = os.path.join(artifact_dir, f".staging-{os.getpid()}")
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(staging_dir)
+
+    files = {}
+    for name in sorted(arrays):
+        path = os.path.join(staging_dir, f"{name}.npy")
+        np.save(path, np.ascontiguousarray(arrays[name]))
+        files[name] = {
+            'file': f"{name}.npy",
+            'sha256': _sha256_file(path),
+            'bytes': os.path.getsize(path)
+        }
+
+    # The content hash covers every array file, so identical forests share a hash
+    content = hashlib.sha256()
+    for name in sorted(files):
+        content.update(f"{name}:{files[name]['sha256']}".encode())
+    sha256 = content.hexdigest()
+
+    created_at = datetime.now()
+    model_version = f"{created_at.strftime('%Y%m%d%H%M%S')}-{sha256[:8]}"
+
+    version_dir = os.path.join(artifact_dir, model_version)
+    shutil.rmtree(version_dir, ignore_errors=True)
+    os.replace(staging_dir, version_dir)
+
+    manifest = {
+        'model_version': model_version,
+        'sha256': sha256,
+        'path': model_version,
+        'created_at': created_at.isoformat(),
+        'engine': 'flat_forest',
+        'metadata': flat.metadata(),
+        'files': files,
+        'metrics': metrics or {}
+    }
+
+    tmp_path = os.path.join(artifact_dir, f"{MANIFEST_FILE}.tmp")
+    with open(tmp_path, 'w') as f:
+        # NumPy scalars in the metrics are written as plain numbers
+        json.dump(manifest, f, indent=2, default=float)
+    os.replace(tmp_path, os.path.join(artifact_dir, MANIFEST_FILE))
+
+    _prune_versions(artifact_dir, keep)
+    return manifest
+
+def _prune_versions(artifact_dir, keep):
+    """Delete all but the newest keep version directories"""
+    versions = sorted(
+        entry for entry in os.listdir(artifact_dir)
+        if os.path.isdir(os.path.join(artifact_dir, entry)) and not entry.startswith('.')
+    )
+    for entry in versions[:-keep] if keep > 0 else []:
+        shutil.rmtree(os.path.join(artifact_dir, entry), ignore_errors=True)
+
+def load_model_artifact(artifact_dir=MODEL_ARTIFACT_DIR, verify=False):
+    """
+    Load the current model artifact with read-only memory-mapped arrays
+
+    The OS page cache backs the mapped files, so every process that loads the
+    same version shares one physical copy and loading does not read the arrays.
+
+    Args:
+        artifact_dir: Artifact root directory
+        verify: Check every array file against its sha256 first (reads the files)
+
+    Returns:
+        FlatForest with model_version and sha256 attributes set
+    """
+    manifest = read_manifest(artifact_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No model artifact found in {artifact_dir}")
+
+    version_dir = os.path.join(artifact_dir, manifest['path'])
+
+    arrays = {}
+    for name, info in manifest['files'].items():
+        path = os.path.join(version_dir, info['file'])
+        if verify and _sha256_file(path) != info['sha256']:
+            raise ValueError(f"Checksum mismatch for {path}")
+        arrays[name] = np.load(path, mmap_mode='r')
+
+    model = FlatForest.from_arrays(arrays, manifest['metadata'])
+    model.model_version = manifest['model_version']
+    model.sha256 = manifest['sha256']
+    return model
+
+
+# ==================== TESTING ====================
+
+if __name__ == '__main__':
+    import time
+
+    print("="*60)
+    print("MODEL ARTIFACT TEST")
+    print("="*60)
+    print()
+
+    manifest = read_manifest()
+    if manifest is None:
+        print(f"✗ No artifact in {MODEL_ARTIFACT_DIR} - run train_model.py first")
+    else:
+        print(f"Version: {manifest['model_version']}")
+        print(f"SHA-256: {manifest['sha256']}")
+        print(f"Size:    {sum(f['bytes'] for f in manifest['files'].values()) / (1024 * 1024):.2f} MB")
+
+        start = time.perf_counter()
+        model = load_model_artifact()
+        print(f"✓ Memory-mapped load: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+        start = time.perf_counter()
+        load_model_artifact(verify=True)
+        print(f"✓ Verified load:      {(time.perf_counter() - start) * 1000:.2f} ms")
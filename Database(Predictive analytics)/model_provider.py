@@ -0,0 +1,254 @@
+"""
+Model Provider - Shared, Hot-Reloading Model Cache
+Holds the active prediction model for the whole process, watches the model
+manifest and swaps in a retrained model in the background without restarting
+the service
+"""
+import os
+import time
+import pickle
+import threading
+from datetime import datetime
+
+from forest_engine import FlatForest
+from model_artifacts import (
+    MANIFEST_FILE,
+    has_model_artifact,
+    load_model_artifact,
+    get_model_version
+)
+from config import MODEL_ARTIFACT_DIR, MODEL_FILE, MODEL_ENGINE, MODEL_RELOAD_CHECK_SECONDS
+
+
+def load_model(engine=MODEL_ENGINE):
+    """
+    Load trained model from file
+
+    The flat engine memory-maps the saved model artifact when there is one,
+    so worker processes share its arrays; otherwise it converts the pickle.
+    Prefer get_model_provider().get(), which only reads from disk when the
+    model has changed.
+
+    Args:
+        engine: 'flat' for the array-based FlatForest engine (default from config),
+                'sklearn' for the unpickled RandomForestRegressor
+
+    Returns:
+        Model with a predict(X) method
+    """
+    if engine == 'flat' and has_model_artifact():
+        return load_model_artifact()
+
+    try:
+        with open(MODEL_FILE, 'rb') as f:
+            model = pickle.load(f)
+        if engine == 'flat':
+            return FlatForest.from_sklearn(model)
+        return model
+    except FileNotFoundError:
+        raise FileNotFoundError(
+            f"Model file not found: {MODEL_FILE}\n"
+            "Please run train_model_db.py first to train the model."
+        )
+
+
+class ModelProvider:
+    """Serves the current model and atomically replaces it when a new one is saved"""
+
+    def __init__(self, artifact_dir=MODEL_ARTIFACT_DIR, model_file=MODEL_FILE, engine=MODEL_ENGINE):
+        """
+        Args:
+            artifact_dir: Model artifact directory whose manifest is watched
+            model_file: Pickled model used when there is no artifact
+            engine: Model engine passed to load_model
+        """
+        self.artifact_dir = artifact_dir
+        self.model_file = model_file
+        self.engine = engine
+
+        self.model = None
+        self.version = None
+        self.loaded_at = None
+        self._disk_stamp = None
+
+        self._load_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._listeners = []
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        self.hits = 0
+        self.loads = 0
+        self.total_load_seconds = 0.0
+        self.last_load_seconds = None
+
+    def _stat_disk(self):
+        """(path, mtime, size) of the file that identifies the model on disk"""
+        path = os.path.join(self.artifact_dir, MANIFEST_FILE)
+        if not os.path.exists(path):
+            path = self.model_file
+        try:
+            stat = os.stat(path)
+            return path, stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def _watching(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def get(self):
+        """
+        Get the active model
+
+        Served from memory. Without the background watcher, each call stats the
+        manifest (or pickle) and reloads only when its mtime or size changed;
+        with the watcher running, the watcher does the checking instead.
+
+        Callers should fetch the model once per request and keep using that
+        reference, so a swap never changes the model mid-request.
+        """
+        model = self.model
+        if model is not None and (self._watching() or self._stat_disk() == self._disk_stamp):
+            with self._stats_lock:
+                self.hits += 1
+            return model
+
+        self.reload()
+        return self.model
+
+    def add_listener(self, callback):
+        """
+        Register a callback run after every swap
+
+        Args:
+            callback: Function called as callback(model, version), used to
+                      invalidate caches derived from the previous model
+        """
+        self._listeners.append(callback)
+
+    def reload(self, force=False):
+        """
+        Load the model on disk if it differs from the active one
+
+        The new model is fully loaded before the reference is replaced, so
+        requests keep using the old model until the swap.
+
+        Returns:
+            True if a new model was swapped in
+        """
+        with self._load_lock:
+            stamp = self._stat_disk()
+            if not force and self.model is not None and stamp == self._disk_stamp:
+                return False
+
+            version = get_model_version(self.artifact_dir, self.model_file)
+            if not force and self.model is not None and version == self.version:
+                # Touched but unchanged (e.g. manifest rewritten with the same version)
+                self._disk_stamp = stamp
+                return False
+
+            start = time.perf_counter()
+            model = load_model(self.engine)
+            elapsed = time.perf_counter() - start
+
+            # Artifacts carry their own version; stamp pickled models with the disk version
+            version = getattr(model, 'model_version', version)
+            model.model_version = version
+
+            previous = self.version
+            self.model = model
+            self.version = version
+            self.loaded_at = datetime.now().isoformat()
+            self._disk_stamp = stamp
+
+            with self._stats_lock:
+                self.loads += 1
+                self.total_load_seconds += elapsed
+                self.last_load_seconds = elapsed
+
+        if previous is None:
+            print(f"✓ Model loaded in {elapsed * 1000:.1f} ms (version {version})")
+        else:
+            print(f"✓ Model reloaded in {elapsed * 1000:.1f} ms: {previous} -> {version}")
+
+        for callback in list(self._listeners):
+            try:
+                callback(model, version)
+            except Exception as e:
+                print(f"Warning: Model reload listener failed: {e}")
+
+        return True
+
+    def _run(self, interval):
+        while not self._stop_event.wait(interval):
+            try:
+                self.reload()
+            except Exception as e:
+                # Keep serving the current model if the new one cannot be loaded
+                print(f"Warning: Could not reload model: {e}")
+
+    def start(self, interval=MODEL_RELOAD_CHECK_SECONDS):
+        """Start watching the model manifest in the background"""
+        if self._watching():
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(interval,), name='model-reload', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop watching the model manifest"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def stats(self):
+        """
+        Get cache counters
+
+        Returns:
+            Dict with cache hits, disk loads and load times
+        """
+        with self._stats_lock:
+            requests = self.hits + self.loads
+            return {
+                'hits': self.hits,
+                'loads': self.loads,
+                'hit_rate': self.hits / requests if requests else 0.0,
+                'last_load_ms': None if self.last_load_seconds is None else self.last_load_seconds * 1000,
+                'total_load_ms': self.total_load_seconds * 1000
+            }
+
+    def info(self):
+        """
+        Get details of the active model
+
+        Returns:
+            Dict with version, load time, engine and cache counters
+        """
+        return {
+            'version': self.version,
+            'loaded_at': self.loaded_at,
+            'engine': type(self.model).__name__ if self.model is not None else None,
+            'watching': self._watching(),
+            'cache': self.stats()
+        }
+
+
+# Process-wide provider shared by the API, alert generator and prediction functions
+_model_provider = None
+_model_provider_lock = threading.Lock()
+
+def get_model_provider():
+    """Get the process-wide ModelProvider (created on first use)"""
+    global _model_provider
+
+    if _model_provider is None:
+        with _model_provider_lock:
+            if _model_provider is None:
+                _model_provider = ModelProvider()
+
+    return _model_provider
@@ -0,0 +1,69 @@
+"""
+Native Threads - CPU-Bound Work Off the gevent Event Loop
+When serve.py monkey-patches threading for gevent workers, threads and
+ThreadPoolExecutor run as greenlets, so CPU-bound model work blocks every
+request and alert stream on the worker until it finishes. These helpers run
+that work on gevent's pool of real OS threads instead, and use plain threads
+when gevent is not in use
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+
+def get_native_threadpool():
+    """
+    Get gevent's pool of real OS threads
+
+    Returns:
+        The hub's ThreadPool when threading is monkey-patched, otherwise None
+    """
+    try:
+        from gevent import monkey
+    except ImportError:
+        return None
+
+    if not monkey.is_module_patched('threading'):
+        return None
+
+    import gevent
+    return gevent.get_hub().threadpool
+
+def run_blocking(func, *args):
+    """
+    Run a CPU-bound call without blocking the event loop
+
+    Under gevent the call runs on a native thread while the calling greenlet
+    waits, so other greenlets keep being served; otherwise it runs inline.
+
+    Args:
+        func: Function to call
+        *args: Arguments passed to func
+
+    Returns:
+        Whatever func returns (its exceptions propagate)
+    """
+    pool = get_native_threadpool()
+    if pool is None:
+        return func(*args)
+    return pool.apply(func, args)
+
+def map_threads(func, items, max_workers):
+    """
+    Map a CPU-bound function over items concurrently, keeping the input order
+
+    Args:
+        func: Function called once per item
+        items: List of items
+        max_workers: Threads used without gevent (gevent's pool has its own size)
+
+    Returns:
+        List of results, one per item
+    """
+    pool = get_native_threadpool()
+    if pool is not None:
+        return list(pool.imap(func, items))
+
+    if len(items) <= 1 or max_workers <= 1:
+        return [func(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        return list(executor.map(func, items))
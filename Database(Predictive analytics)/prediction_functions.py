@@ -2,95 +2,76 @@
 Prediction Functions with MySQL Database Integration
 Makes predictions using real-time data from the database
 """
-import pickle
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 from APIClient import get_api_client
-from config import MODEL_FILE, CAPACITY_PER_BUS
+from historical_averages import get_historical_average_table
+from model_provider import load_model, get_model_provider
+from prediction_writer import get_prediction_writer, prediction_record
+from config import CAPACITY_PER_BUS
 
-def load_model():
-    """Load trained model from file"""
-    try:
-        with open(MODEL_FILE, 'rb') as f:
-            model = pickle.load(f)
-        return model
-    except FileNotFoundError:
-        raise FileNotFoundError(
-            f"Model file not found: {MODEL_FILE}\n"
-            "Please run train_model_db.py first to train the model."
-        )
-
-def get_historical_average(route_id, hour, db_client=None):
+def get_historical_average(route_id, hour, db_client=None, direction=1, day_type=None):
     """
     Get historical average ridership for a route at a specific hour
     Used as fallback for prev_hour_passengers
 
+    Looks the value up in the precomputed historical average table, which is
+    built once from the volume data and refreshed when new months arrive.
+
     Args:
         route_id: Route service number
         hour: Hour of day (0-23)
         db_client: Database client (optional)
+        direction: Route direction (default 1)
+        day_type: BusVolume day type, or None to average across all day types
 
     Returns:
         Average passenger count
     """
-    if db_client is None:
-        db_client = get_api_client()
-
     try:
-        # Get volume data for this route using the API
-        # Use all available data to calculate average
-        volume_df = db_client.get_bus_volume_by_route(route_id, month=None)
+        table = get_historical_average_table(db_client)
 
-        if not volume_df.empty:
-            # Filter by hour if data is available
-            hour_data = volume_df[volume_df['hour'] == hour]
+        # Routes outside the prebuilt set are loaded once, then served from memory
+        if not table.has_route(route_id, direction):
+            table.add_route(route_id, direction, db_client)
 
-            if not hour_data.empty:
-                return float(hour_data['total_passengers'].mean())
-            else:
-                # Fallback: return overall average for the route
-                return float(volume_df['total_passengers'].mean())
-        else:
-            # Final fallback
-            return 100.0
+        return table.get(route_id, hour, direction, day_type)
 
     except Exception as e:
         print(f"Warning: Could not get historical average: {e}")
         return 100.0
 
-def predict_ridership(route_id, target_datetime, model=None, db_client=None, save_to_db=False):
+FEATURE_ORDER = ['hour', 'day_of_week', 'is_weekend', 'month', 'prev_hour_passengers']
+
+def build_features(route_id, target_datetime, db_client=None, prev_hour_passengers=None):
     """
-    Predict ridership for a specific route and time
-    
+    Build the model feature dict for a route and time
+
     Args:
         route_id: Route service number
         target_datetime: datetime object for prediction
-        model: Pre-loaded model (optional)
         db_client: Database client (optional)
-        save_to_db: Whether to save prediction to database (default False)
-    
+        prev_hour_passengers: Known historical average (optional, looked up if None)
+
     Returns:
-        dict with prediction results
+        dict of feature values
     """
-    if model is None:
-        model = load_model()
-    
-    if db_client is None:
-        db_client = get_api_client()
-    
-    # Prepare features
+    if prev_hour_passengers is None:
+        prev_hour_passengers = get_historical_average(
+            route_id,
+            target_datetime.hour,
+            db_client
+        )
+
     features = {
         'hour': target_datetime.hour,
         'day_of_week': target_datetime.weekday(),
         'is_weekend': 1 if target_datetime.weekday() in [5, 6] else 0,
         'month': target_datetime.month,
-        'prev_hour_passengers': get_historical_average(
-            route_id, 
-            target_datetime.hour, 
-            db_client
-        )
+        'prev_hour_passengers': prev_hour_passengers
     }
-    
+
     # Check for NaN values
     for key, value in features.items():
         if pd.isna(value):
@@ -99,14 +80,22 @@ def predict_ridership(route_id, target_datetime, model=None, db_client=None, sav
                 features[key] = 100.0
             else:
                 features[key] = 0
-    
-    # Create DataFrame for prediction
-    feature_order = ['hour', 'day_of_week', 'is_weekend', 'month', 'prev_hour_passengers']
-    X = pd.DataFrame([[features[f] for f in feature_order]], columns=feature_order)
-    
-    # Make prediction
-    prediction = model.predict(X)[0]
-    
+
+    return features
+
+def build_prediction_result(route_id, target_datetime, features, prediction):
+    """
+    Turn a raw model output into a prediction result dict
+
+    Args:
+        route_id: Route service number
+        target_datetime: datetime object for prediction
+        features: Feature dict used for the prediction
+        prediction: Raw model output
+
+    Returns:
+        dict with prediction results
+    """
     # Calculate confidence (based on feature values and model performance)
     # Higher confidence during weekdays and normal hours
     base_confidence = 0.85
@@ -114,13 +103,13 @@ def predict_ridership(route_id, target_datetime, model=None, db_client=None, sav
         base_confidence -= 0.07  # Less data for weekends
     if features['hour'] < 6 or features['hour'] > 22:
         base_confidence -= 0.05  # Less confident late night/early morning
-    
+
     confidence = max(0.70, min(0.95, base_confidence))
-    
+
     # Determine if peak hour
     is_peak = features['hour'] in [7, 8, 9, 17, 18, 19] and features['is_weekend'] == 0
-    
-    result = {
+
+    return {
         'route_id': route_id,
         'predicted_passengers': int(round(max(0, prediction))),  # No negative predictions
         'datetime': target_datetime.isoformat(),
@@ -128,24 +117,87 @@ def predict_ridership(route_id, target_datetime, model=None, db_client=None, sav
         'is_peak': is_peak,
         'features': features
     }
-    
-    # Save to database if requested
+
+def predict_ridership_batch(items, model=None, db_client=None, save_to_db=False, cube=None):
+    """
+    Predict ridership for many (route, datetime) pairs with a single model call
+
+    Args:
+        items: List of (route_id, target_datetime) tuples
+        model: Pre-loaded model (optional)
+        db_client: Database client (optional)
+        save_to_db: Queue predictions for saving to database (default False;
+                    written in bulk by the background PredictionWriter)
+        cube: Precomputed ForecastCube (optional); covered items are read
+              from it and only the rest go to the model
+
+    Returns:
+        List of prediction dicts, in the same order as items
+    """
+    if not items:
+        return []
+
+    if db_client is None:
+        db_client = get_api_client()
+
+    results = [None] * len(items)
+    misses = list(range(len(items)))
+
+    # Serve whatever the forecast cube covers straight from its arrays
+    if cube is not None:
+        covered, predicted, prev_hour = cube.lookup(items)
+        for i in np.flatnonzero(covered):
+            route_id, target_datetime = items[i]
+            features = build_features(route_id, target_datetime, db_client, prev_hour_passengers=float(prev_hour[i]))
+            results[i] = build_prediction_result(route_id, target_datetime, features, int(predicted[i]))
+        misses = np.flatnonzero(~covered).tolist()
+
+    if misses:
+        if model is None:
+            model = get_model_provider().get()
+
+        # Prepare one feature matrix for the whole batch
+        feature_rows = [build_features(items[i][0], items[i][1], db_client) for i in misses]
+        X = pd.DataFrame([[features[f] for f in FEATURE_ORDER] for features in feature_rows],
+                         columns=FEATURE_ORDER)
+
+        # Make predictions
+        predictions = model.predict(X)
+
+        for i, features, prediction in zip(misses, feature_rows, predictions):
+            route_id, target_datetime = items[i]
+            results[i] = build_prediction_result(route_id, target_datetime, features, prediction)
+
+    # Queue for saving; the write-behind writer stores them in bulk in the background
     if save_to_db:
-        try:
-            db_client.save_prediction(
-                route_id=route_id,
-                prediction_datetime=target_datetime,
-                predicted_passengers=result['predicted_passengers'],
-                confidence=confidence,
-                is_peak=is_peak,
-                model_version='v1.0'
-            )
-        except Exception as e:
-            print(f"Warning: Could not save prediction to database: {e}")
+        model_version = getattr(model, 'model_version', None)
+        if model_version is None and cube is not None:
+            model_version = cube.model_version
+
+        get_prediction_writer().enqueue([prediction_record(result, model_version) for result in results])
+
+    return results
+
+def predict_ridership(route_id, target_datetime, model=None, db_client=None, save_to_db=False, cube=None):
+    """
+    Predict ridership for a specific route and time
     
-    return result
+    Args:
+        route_id: Route service number
+        target_datetime: datetime object for prediction
+        model: Pre-loaded model (optional)
+        db_client: Database client (optional)
+        save_to_db: Whether to save prediction to database (default False)
+        cube: Precomputed ForecastCube (optional)
+    
+    Returns:
+        dict with prediction results
+    """
+    return predict_ridership_batch(
+        [(route_id, target_datetime)], model, db_client, save_to_db, cube
+    )[0]
 
-def predict_multiple_hours(route_id, hours=6, model=None, db_client=None, save_to_db=False):
+def predict_multiple_hours(route_id, hours=6, model=None, db_client=None, save_to_db=False, cube=None):
     """
     Predict ridership for next N hours
     
@@ -155,53 +207,28 @@ def predict_multiple_hours(route_id, hours=6, model=None, db_client=None, save_t
         model: Pre-loaded model (optional)
         db_client: Database client (optional)
         save_to_db: Whether to save predictions to database
+        cube: Precomputed ForecastCube (optional)
     
     Returns:
         List of prediction dicts
     """
-    if model is None:
-        model = load_model()
-    
-    if db_client is None:
-        db_client = get_api_client()
-    
-    predictions = []
     now = datetime.now()
+    items = [(route_id, now + timedelta(hours=i)) for i in range(hours)]
     
-    for i in range(hours):
-        target_time = now + timedelta(hours=i)
-        pred = predict_ridership(route_id, target_time, model, db_client, save_to_db)
-        predictions.append(pred)
-    
-    return predictions
+    return predict_ridership_batch(items, model, db_client, save_to_db, cube)
 
-def predict_daily_forecast(route_id, target_date, model=None, db_client=None, save_to_db=False):
+def summarize_daily_forecast(route_id, target_date, predictions):
     """
-    Predict ridership for all 24 hours of a specific day
-    
+    Build a daily forecast dict from 24 hourly predictions
+
     Args:
         route_id: Route service number
         target_date: date object
-        model: Pre-loaded model (optional)
-        db_client: Database client (optional)
-        save_to_db: Whether to save predictions to database
-    
+        predictions: List of 24 hourly prediction dicts
+
     Returns:
         dict with daily forecast
     """
-    if model is None:
-        model = load_model()
-    
-    if db_client is None:
-        db_client = get_api_client()
-    
-    predictions = []
-    
-    for hour in range(24):
-        target_datetime = datetime.combine(target_date, datetime.min.time()).replace(hour=hour)
-        pred = predict_ridership(route_id, target_datetime, model, db_client, save_to_db)
-        predictions.append(pred)
-    
     daily_total = sum(p['predicted_passengers'] for p in predictions)
     peak_hour_pred = max(predictions, key=lambda x: x['predicted_passengers'])
     
@@ -214,14 +241,66 @@ def predict_daily_forecast(route_id, target_date, model=None, db_client=None, sa
         'peak_passengers': peak_hour_pred['predicted_passengers']
     }
 
-def get_recent_predictions(route_id, hours=24, db_client=None):
+def predict_daily_forecast(route_id, target_date, model=None, db_client=None, save_to_db=False, cube=None):
+    """
+    Predict ridership for all 24 hours of a specific day
+    
+    Args:
+        route_id: Route service number
+        target_date: date object
+        model: Pre-loaded model (optional)
+        db_client: Database client (optional)
+        save_to_db: Whether to save predictions to database
+        cube: Precomputed ForecastCube (optional)
+    
+    Returns:
+        dict with daily forecast
+    """
+    return predict_multi_day_forecast(
+        route_id, target_date, 1, model, db_client, save_to_db, cube
+    )[0]
+
+def predict_multi_day_forecast(route_id, start_date, days, model=None, db_client=None, save_to_db=False, cube=None):
+    """
+    Predict ridership for every hour of several consecutive days in one model call
+    
+    Args:
+        route_id: Route service number
+        start_date: date object of the first day
+        days: Number of days to forecast
+        model: Pre-loaded model (optional)
+        db_client: Database client (optional)
+        save_to_db: Whether to save predictions to database
+        cube: Precomputed ForecastCube (optional)
+    
+    Returns:
+        List of daily forecast dicts, one per day
+    """
+    dates = [start_date + timedelta(days=day_offset) for day_offset in range(days)]
+    items = [
+        (route_id, datetime.combine(target_date, datetime.min.time()).replace(hour=hour))
+        for target_date in dates
+        for hour in range(24)
+    ]
+    
+    predictions = predict_ridership_batch(items, model, db_client, save_to_db, cube)
+    
+    return [
+        summarize_daily_forecast(route_id, target_date, predictions[i * 24:(i + 1) * 24])
+        for i, target_date in enumerate(dates)
+    ]
+
+def get_recent_predictions(route_id, hours=24, db_client=None, limit=100):
     """
     Get recent predictions from database
     
+    For longer windows, use db_client.iter_prediction_pages instead.
+    
     Args:
         route_id: Route service number
         hours: How many hours back to retrieve
         db_client: Database client (optional)
+        limit: Maximum number of predictions
     
     Returns:
         List of predictions from database
@@ -235,7 +314,7 @@ def get_recent_predictions(route_id, hours=24, db_client=None):
         predictions = db_client.get_predictions(
             route_id=route_id,
             start_date=start_time,
-            limit=100
+            limit=limit
         )
         return predictions
     except Exception as e:
@@ -0,0 +1,424 @@
+"""
+Prediction Writer - Write-Behind Queue for Saved Predictions
+Collects predictions in memory and saves them in bulk on a background thread,
+so requests never wait on the database. Batches that cannot be saved are
+spooled to disk and retried with backoff until they succeed; batches the
+backend rejects as invalid are moved to a dead-letter directory instead, so
+one bad batch never blocks the ones behind it.
+"""
+import os
+import json
+import time
+import uuid
+import atexit
+import threading
+from datetime import datetime
+
+from config import (
+    API_BULK_PREDICTIONS_PER_REQUEST,
+    PREDICTION_WRITE_BATCH_SIZE,
+    PREDICTION_WRITE_FLUSH_SECONDS,
+    PREDICTION_WRITE_MAX_QUEUE,
+    PREDICTION_SPOOL_DIR,
+    PREDICTION_SPOOL_RETRY_SECONDS,
+    PREDICTION_SPOOL_RETRY_MAX_SECONDS,
+    PREDICTION_DEAD_LETTER_DIR
+)
+
+SPOOL_SUFFIX = '.json'
+CLAIM_SUFFIX = '.sending'
+
+# Outcomes of saving one batch
+SAVED = 'saved'
+FAILED = 'failed'  # Transient (backend down, timeout, 5xx): retry later
+REJECTED = 'rejected'  # Invalid batch (4xx): retrying cannot help
+
+
+class PredictionsRejectedError(Exception):
+    """Raised by save_predictions when the backend refuses a batch as invalid"""
+
+
+
+def prediction_record(result, model_version):
+    """
+    Build the save_predictions row for a prediction result
+
+    Args:
+        result: Prediction dict from build_prediction_result
+        model_version: Version of the model that made it
+
+    Returns:
+        Dict with the fields of APIClient.save_prediction
+    """
+    return {
+        'route_id': result['route_id'],
+        'prediction_datetime': result['datetime'],
+        'predicted_passengers': result['predicted_passengers'],
+        'confidence': result['confidence'],
+        'is_peak': result['is_peak'],
+        'model_version': model_version or 'unknown'
+    }
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+class PredictionWriter:
+    """Buffers predictions and saves them in bulk from a background thread"""
+
+    def __init__(self, db_client=None, batch_size=PREDICTION_WRITE_BATCH_SIZE,
+                 flush_seconds=PREDICTION_WRITE_FLUSH_SECONDS, max_queue=PREDICTION_WRITE_MAX_QUEUE,
+                 spool_dir=PREDICTION_SPOOL_DIR, dead_letter_dir=PREDICTION_DEAD_LETTER_DIR):
+        """
+        Args:
+            db_client: Client with save_predictions (default: get_api_client() at flush time)
+            batch_size: Queue length that triggers an immediate flush
+            flush_seconds: Longest time a prediction waits in the queue
+            max_queue: Queue length beyond which predictions are spooled directly
+            spool_dir: Directory holding batches waiting to be retried
+            dead_letter_dir: Directory holding batches the backend rejected
+        """
+        self.db_client = db_client
+        self.batch_size = min(batch_size, API_BULK_PREDICTIONS_PER_REQUEST)
+        self.flush_seconds = flush_seconds
+        self.max_queue = max_queue
+        self.spool_dir = spool_dir
+        self.dead_letter_dir = dead_letter_dir
+
+        self._queue = []
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._atexit_registered = False
+
+        self._retry_delay = PREDICTION_SPOOL_RETRY_SECONDS
+        self._next_retry = 0.0
+
+        self.enqueued = 0
+        self.written = 0
+        self.failed_batches = 0
+        self.spooled = 0
+        self.dead_lettered = 0
+        self.last_error = None
+
+    # ==================== QUEUE ====================
+
+    def enqueue(self, records):
+        """
+        Queue predictions for saving without blocking
+
+        Starts the background thread on first use.
+
+        Args:
+            records: List of prediction_record dicts
+        """
+        if not records:
+            return
+
+        self.start()
+
+        with self._lock:
+            if len(self._queue) + len(records) > self.max_queue:
+                overflow = True
+            else:
+                overflow = False
+                if not self._queue:
+                    self._oldest = time.monotonic()
+                self._queue.extend(records)
+                full = len(self._queue) >= self.batch_size
+            self.enqueued += len(records)
+
+        if overflow:
+            # The database is not keeping up; keep the predictions on disk instead
+            self._spool(records)
+        elif full:
+            self._wake_event.set()
+
+    def _take_batch(self, force):
+        """Pop the next batch if it is full, old enough or force is set"""
+        with self._lock:
+            if not self._queue:
+                return []
+            due = time.monotonic() - self._oldest >= self.flush_seconds
+            if not (force or due or len(self._queue) >= self.batch_size):
+                return []
+
+            batch = self._queue[:self.batch_size]
+            del self._queue[:self.batch_size]
+            self._oldest = time.monotonic() if self._queue else None
+            return batch
+
+    def _client(self):
+        if self.db_client is None:
+            from APIClient import get_api_client
+            return get_api_client()
+        return self.db_client
+
+    def _save(self, batch, batch_id):
+        """
+        Save one batch
+
+        Args:
+            batch: List of prediction_record dicts
+            batch_id: Idempotency key, kept for every resend of the batch
+
+        Returns:
+            Tuple of (SAVED, FAILED or REJECTED, error message or None)
+        """
+        try:
+            saved = self._client().save_predictions(batch, batch_id=batch_id)
+            error = 'save_predictions failed'
+        except PredictionsRejectedError as e:
+            self.failed_batches += 1
+            self.last_error = str(e)
+            return REJECTED, str(e)
+        except Exception as e:
+            saved = None
+            error = str(e)
+
+        if saved is None:
+            self.failed_batches += 1
+            self.last_error = error
+            return FAILED, error
+
+        self.written += len(batch)
+        return SAVED, None
+
+    def flush(self, force=False):
+        """
+        Save every due batch now
+
+        Failed batches are spooled to disk for retry; rejected batches are
+        dead-lettered.
+
+        Args:
+            force: Save everything queued, not just full or old batches
+
+        Returns:
+            Number of predictions saved
+        """
+        saved = 0
+        with self._flush_lock:
+            while True:
+                batch = self._take_batch(force)
+                if not batch:
+                    break
+                batch_id = uuid.uuid4().hex
+                outcome, error = self._save(batch, batch_id)
+                if outcome == SAVED:
+                    saved += len(batch)
+                elif outcome == REJECTED:
+                    self._dead_letter(batch, batch_id, error)
+                else:
+                    self._spool(batch, batch_id)
+        return saved
+
+    # ==================== SPOOL ====================
+
+    def _spool(self, records, batch_id=None):
+        """
+        Write records to the spool directory (atomically, one file per batch)
+
+        Args:
+            records: List of prediction_record dicts
+            batch_id: Key of a batch that was already sent (records must fit
+                      one batch); new batches get a new key
+        """
+        os.makedirs(self.spool_dir, exist_ok=True)
+        for start in range(0, len(records), self.batch_size):
+            chunk = records[start:start + self.batch_size]
+            name = f"{datetime.now().strftime('%Y%m%d%H%M%S%f')}-{uuid.uuid4().hex[:8]}"
+            tmp_path = os.path.join(self.spool_dir, f".{name}.tmp")
+            with open(tmp_path, 'w') as f:
+                json.dump({'batch_id': batch_id or uuid.uuid4().hex, 'predictions': chunk}, f)
+            os.replace(tmp_path, os.path.join(self.spool_dir, name + SPOOL_SUFFIX))
+            self.spooled += len(chunk)
+
+    def _dead_letter(self, records, batch_id, error):
+        """Keep a rejected batch, with the backend's reason, for inspection"""
+        os.makedirs(self.dead_letter_dir, exist_ok=True)
+        name = f"{datetime.now().strftime('%Y%m%d%H%M%S%f')}-{uuid.uuid4().hex[:8]}"
+        tmp_path = os.path.join(self.dead_letter_dir, f".{name}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'batch_id': batch_id,
+                'error': error,
+                'rejected_at': datetime.now().isoformat(),
+                'predictions': records
+            }, f)
+        os.replace(tmp_path, os.path.join(self.dead_letter_dir, name + SPOOL_SUFFIX))
+        self.dead_lettered += len(records)
+        print(f"⚠️  Dead-lettered {len(records)} rejected predictions: {error}")
+
+    def dead_letter_files(self):
+        """Batches the backend rejected, oldest first"""
+        try:
+            return sorted(f for f in os.listdir(self.dead_letter_dir) if f.endswith(SPOOL_SUFFIX))
+        except OSError:
+            return []
+
+    def spool_files(self):
+        """Spooled batches waiting for retry, oldest first"""
+        try:
+            return sorted(f for f in os.listdir(self.spool_dir) if f.endswith(SPOOL_SUFFIX))
+        except OSError:
+            return []
+
+    def _release_abandoned_claims(self):
+        """Return batches claimed by processes that exited mid-retry to the spool"""
+        try:
+            names = os.listdir(self.spool_dir)
+        except OSError:
+            return
+
+        for name in names:
+            if not name.endswith(CLAIM_SUFFIX):
+                continue
+            base, pid = name[:-len(CLAIM_SUFFIX)].rsplit('.', 1)
+            if pid.isdigit() and not _pid_alive(int(pid)):
+                try:
+                    os.replace(os.path.join(self.spool_dir, name), os.path.join(self.spool_dir, base))
+                except OSError:
+                    pass
+
+    def retry_spool(self, force=False):
+        """
+        Resend spooled batches, oldest first, stopping at the first failure
+
+        A batch is claimed by renaming it before it is sent, so workers sharing
+        the spool directory never send the same batch twice. Each batch keeps
+        the key it was first sent with, so the backend ignores the resend of a
+        batch it saved before the original request timed out. Batches the
+        backend rejects are dead-lettered and the retry moves on; only
+        transient failures stop it and back off.
+
+        Args:
+            force: Retry now, ignoring the backoff delay
+
+        Returns:
+            Number of predictions saved
+        """
+        if not force and time.monotonic() < self._next_retry:
+            return 0
+
+        self._release_abandoned_claims()
+
+        saved = 0
+        for name in self.spool_files():
+            path = os.path.join(self.spool_dir, name)
+            claimed = f"{path}.{os.getpid()}{CLAIM_SUFFIX}"
+            try:
+                os.replace(path, claimed)
+            except OSError:
+                continue  # Another worker claimed it
+
+            with open(claimed) as f:
+                spooled = json.load(f)
+            batch, batch_id = spooled['predictions'], spooled['batch_id']
+
+            outcome, error = self._save(batch, batch_id)
+            if outcome == FAILED:
+                os.replace(claimed, path)
+                self._next_retry = time.monotonic() + self._retry_delay
+                self._retry_delay = min(self._retry_delay * 2, PREDICTION_SPOOL_RETRY_MAX_SECONDS)
+                break
+
+            if outcome == REJECTED:
+                self._dead_letter(batch, batch_id, error)
+            else:
+                saved += len(batch)
+            os.remove(claimed)
+        else:
+            self._retry_delay = PREDICTION_SPOOL_RETRY_SECONDS
+
+        return saved
+
+    # ==================== BACKGROUND THREAD ====================
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self._wake_event.wait(self.flush_seconds)
+            self._wake_event.clear()
+            try:
+                self.flush()
+                self.retry_spool()
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Warning: Prediction writer failed: {e}")
+
+    def start(self):
+        """Start the background flush thread (also restarts it after fork)"""
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+
+            self._stop_event.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='prediction-writer', daemon=True)
+            self._thread.start()
+
+            # Scripts that exit right after predicting still get their predictions saved
+            if not self._atexit_registered:
+                atexit.register(self.stop)
+                self._atexit_registered = True
+
+    def stop(self):
+        """Stop the thread and save (or spool) everything still queued"""
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush(force=True)
+
+    def stats(self):
+        """
+        Get writer counters
+
+        Returns:
+            Dict with queued, written, spooled, dead-lettered and failed counts
+            (spooled and dead_lettered count predictions this process handled;
+            spool_files and dead_letter_files are what is on disk)
+        """
+        with self._lock:
+            queued = len(self._queue)
+        return {
+            'queued': queued,
+            'enqueued': self.enqueued,
+            'written': self.written,
+            'failed_batches': self.failed_batches,
+            'spooled': self.spooled,
+            'spool_files': len(self.spool_files()),
+            'dead_lettered': self.dead_lettered,
+            'dead_letter_files': len(self.dead_letter_files()),
+            'last_error': self.last_error
+        }
+
+
+# Process-wide writer used by the prediction functions
+_prediction_writer = None
+_prediction_writer_lock = threading.Lock()
+
+def get_prediction_writer():
+    """Get the process-wide PredictionWriter (created on first use)"""
+    global _prediction_writer
+
+    if _prediction_writer is None:
+        with _prediction_writer_lock:
+            if _prediction_writer is None:
+                _prediction_writer = PredictionWriter()
+
+    return _prediction_writer
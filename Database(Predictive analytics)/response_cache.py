@@ -0,0 +1,269 @@
+"""
+Response Cache - Persistent On-Disk Cache for APIClient
+Size-bounded LRU store keyed by action and parameters, with per-action TTLs
+and ETag revalidation against Analytics_api.php
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+from urllib.parse import urlencode
+
+from config import API_CACHE_TTL, API_CACHE_IMMUTABLE_PARAMS, API_CACHE_MAX_MB
+
+FOREVER = None  # TTL value for responses that never expire
+
+
+def cache_key(params):
+    """Build a stable cache key from request parameters"""
+    items = sorted((str(k), str(v)) for k, v in (params or {}).items())
+    return urlencode(items)
+
+def cache_ttl(params):
+    """
+    Look up the TTL policy for a request
+
+    Volume queries pinned to explicit months are immutable and cached forever;
+    everything else uses the per-action TTL from API_CACHE_TTL.
+
+    Args:
+        params: Request query parameters (including 'action')
+
+    Returns:
+        TTL in seconds, FOREVER, or 0 if the action must not be cached
+    """
+    params = params or {}
+    action = params.get('action')
+
+    if action not in API_CACHE_TTL:
+        return 0
+
+    immutable_param = API_CACHE_IMMUTABLE_PARAMS.get(action)
+    if immutable_param and params.get(immutable_param):
+        return FOREVER
+
+    return API_CACHE_TTL[action]
+
+
+class ResponseCache:
+    """SQLite-backed LRU cache of API responses"""
+
+    def __init__(self, cache_dir, max_mb=API_CACHE_MAX_MB):
+        """
+        Initialize the cache
+
+        Args:
+            cache_dir: Directory holding the cache database
+            max_mb: Maximum total size of cached bodies in megabytes
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self.path = os.path.join(cache_dir, 'api_cache.sqlite3')
+        self.max_bytes = int(max_mb * 1024 * 1024)
+
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        with self._lock:
+            self._db()
+
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+
+    def _db(self):
+        """
+        Get this process's connection to the cache database (lock held)
+
+        A SQLite connection must not be used across fork, so a worker forked
+        from a process that already opened the cache opens its own.
+        """
+        if self._pid == os.getpid():
+            return self._conn
+
+        # The parent's connection is left alone: closing it here could release
+        # the parent's file locks
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                action TEXT,
+                body TEXT NOT NULL,
+                etag TEXT,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                expires_at REAL,
+                last_access REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)")
+        conn.commit()
+
+        self._conn = conn
+        self._pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        """
+        Look up a cached response
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Dict with 'body', 'etag' and 'fresh', or None if not cached
+            (fresh entries count as hits, stale or absent ones as misses)
+        """
+        now = time.time()
+
+        with self._lock:
+            conn = self._db()
+            row = conn.execute(
+                "SELECT body, etag, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            conn.commit()
+
+            body, etag, expires_at = row
+            fresh = expires_at is None or expires_at > now
+
+            # Stale entries still need a round trip, so they count as misses
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        return {
+            'body': json.loads(body),
+            'etag': etag,
+            'fresh': fresh
+        }
+
+    def fresh_version(self, key):
+        """
+        Identify a fresh cached response without reading its body
+
+        The version changes whenever a new body is stored, but not when a stale
+        entry is revalidated. Lookups are not counted as hits or misses.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            The server's ETag (or the time the body was stored) if the entry is
+            fresh, otherwise None
+        """
+        with self._lock:
+            row = self._db().execute(
+                "SELECT etag, stored_at, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        etag, stored_at, expires_at = row
+        if expires_at is not None and expires_at <= time.time():
+            return None
+        return etag or repr(stored_at)
+
+    def put(self, key, action, body, etag=None, ttl=FOREVER):
+        """
+        Store a response and evict least recently used entries over the size limit
+
+        Args:
+            key: Cache key
+            action: API action (for inspection)
+            body: Decoded JSON response
+            etag: ETag returned by the server (optional)
+            ttl: Seconds until the entry goes stale, or FOREVER
+        """
+        now = time.time()
+        payload = json.dumps(body)
+        expires_at = None if ttl is FOREVER else now + ttl
+
+        with self._lock:
+            conn = self._db()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, action, body, etag, size, stored_at, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, action, payload, etag, len(payload), now, expires_at, now)
+            )
+            self._evict()
+            conn.commit()
+
+    def revalidated(self, key, ttl=FOREVER):
+        """Mark a stale entry fresh again after a 304 Not Modified"""
+        now = time.time()
+        expires_at = None if ttl is FOREVER else now + ttl
+
+        with self._lock:
+            conn = self._db()
+            conn.execute(
+                "UPDATE responses SET expires_at = ?, last_access = ? WHERE key = ?",
+                (expires_at, now, key)
+            )
+            conn.commit()
+            self.revalidations += 1
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits (lock held)"""
+        conn = self._db()
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        rows = conn.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    def clear(self):
+        """Remove every cached response"""
+        with self._lock:
+            conn = self._db()
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+
+    def stats(self):
+        """
+        Get cache counters
+
+        Returns:
+            Dict with hit/miss counters, entry count and size
+        """
+        with self._lock:
+            entries, size = self._db().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+
+        lookups = self.hits + self.misses
+        return {
+            'enabled': True,
+            'hits': self.hits,
+            'misses': self.misses,
+            'revalidations': self.revalidations,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': entries,
+            'size_bytes': size,
+            'max_bytes': self.max_bytes
+        }
+
+    def close(self):
+        """Close the cache database"""
+        with self._lock:
+            if self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+            self._pid = None
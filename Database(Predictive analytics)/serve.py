@@ -0,0 +1,125 @@
+"""
+Production Server - Preforked Gunicorn Workers for the Analytics API
+Loads the model and builds the forecast cube and alert snapshot once in the
+master process, then forks workers that share them copy-on-write
+
+Usage:
+    python serve.py
+    SERVE_WORKERS=4 SERVE_THREADS=16 SERVE_BIND=0.0.0.0:5001 python serve.py
+"""
+from config import SERVE_WORKER_CLASS
+
+if SERVE_WORKER_CLASS == 'gevent':
+    # Patch before anything creates a lock or thread, so the app can still be
+    # preloaded in the master and shared with the gevent workers
+    from gevent import monkey
+    monkey.patch_all()
+
+import gc
+
+from gunicorn.app.base import BaseApplication
+
+from config import (
+    SERVE_BIND,
+    SERVE_WORKERS,
+    SERVE_THREADS,
+    SERVE_WORKER_CONNECTIONS,
+    SERVE_TIMEOUT,
+    SERVE_GRACEFUL_TIMEOUT,
+    SERVE_KEEPALIVE
+)
+
+
+def warm_up(api):
+    """
+    Build the shared caches before forking
+
+    Workers inherit the loaded model, forecast cube and alert snapshot instead
+    of each rebuilding them. Freezing the GC afterwards keeps the collector
+    from touching (and so copying) those inherited objects in every worker.
+    """
+    api.init()
+    api.MODEL_PROVIDER.get()
+    import prediction_functions, alert_generator  # noqa: F401
+
+    try:
+        api.FORECAST_CUBE.refresh()
+        api.ALERT_SNAPSHOT.refresh()
+    except Exception as e:
+        # Workers build them in the background instead
+        print(f"Warning: Could not warm caches before fork: {e}")
+
+    gc.collect()
+    gc.freeze()
+
+def post_fork(server, worker):
+    """Reset per-process state inherited from the master, then start the jobs"""
+    if not server.cfg.preload_app:
+        return  # load() starts them once the worker has imported the app
+
+    import api
+
+    # Connections opened while warming up belong to the master (the response
+    # cache reopens its SQLite database in each process on first use)
+    api.DB_CLIENT.close()
+    api.start_background_jobs()
+
+def worker_exit(server, worker):
+    """Stop the background jobs when a worker shuts down"""
+    import api
+    api.stop_background_jobs()
+
+
+class AnalyticsServer(BaseApplication):
+    """Gunicorn application serving api.create_app()"""
+
+    def __init__(self, options=None):
+        """
+        Args:
+            options: Gunicorn settings overriding the SERVE_* config
+        """
+        self.options = {
+            'bind': SERVE_BIND,
+            'workers': SERVE_WORKERS,
+            'threads': SERVE_THREADS,
+            'worker_class': SERVE_WORKER_CLASS,
+            'worker_connections': SERVE_WORKER_CONNECTIONS,
+            'timeout': SERVE_TIMEOUT,
+            'graceful_timeout': SERVE_GRACEFUL_TIMEOUT,
+            'keepalive': SERVE_KEEPALIVE,
+            'preload_app': True,
+            'post_fork': post_fork,
+            'worker_exit': worker_exit
+        }
+        self.options.update(options or {})
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key.lower(), value)
+
+    def load(self):
+        import api
+
+        if not self.cfg.preload_app:
+            return api.create_app(start_jobs=True)
+
+        warm_up(api)
+        return api.create_app(start_jobs=False)
+
+
+if __name__ == '__main__':
+    print("="*70)
+    print("PREDICTIVE ANALYTICS API SERVER (production)")
+    print("="*70)
+    print(f"Bind:     {SERVE_BIND}")
+    if SERVE_WORKER_CLASS == 'gevent':
+        print(f"Workers:  {SERVE_WORKERS} x {SERVE_WORKER_CONNECTIONS} connections (gevent)")
+    else:
+        print(f"Workers:  {SERVE_WORKERS} x {SERVE_THREADS} threads ({SERVE_WORKER_CLASS})")
+    print(f"Shutdown: {SERVE_GRACEFUL_TIMEOUT}s graceful timeout (SIGTERM)")
+    print("="*70)
+    print()
+
+    AnalyticsServer().run()
@@ -0,0 +1,102 @@
+"""
+Single Flight - Request Coalescing for Concurrent Identical Calls
+While a call for a key is in flight, later callers with the same key wait for
+it and share its result instead of starting their own, so a burst of identical
+backend requests (e.g. a dashboard opening several panels for one route) costs
+one upstream call
+"""
+import copy
+import threading
+
+
+class _Call:
+    """One in-flight call and the result its waiters will share"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Thread-safe coalescing of concurrent calls that share a key"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+        self.calls = 0
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """
+        Run fn, or wait for the identical call already in flight
+
+        The caller that starts the call gets its result; every caller that
+        joined it gets a deep copy, so no two callers share a mutable object.
+        Exceptions are shared the same way. Calls that finish before the next
+        one starts are not coalesced (caching is the response cache's job).
+
+        Args:
+            key: Hashable identity of the call
+            fn: Function with no arguments that performs the call
+
+        Returns:
+            Result of fn
+        """
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        result = None
+        try:
+            result = fn()
+        except BaseException as e:
+            call.error = e
+
+        with self._lock:
+            del self._calls[key]
+            waiters = call.waiters
+
+        try:
+            # Waiters copy from a snapshot, never from the object returned here
+            if waiters and call.error is None:
+                call.result = copy.deepcopy(result)
+        finally:
+            call.done.set()
+
+        if call.error is not None:
+            raise call.error
+        return result
+
+    def stats(self):
+        """
+        Get coalescing counters
+
+        Returns:
+            Dict with calls, calls that ran fn, calls that shared another
+            call's result and calls in flight
+        """
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'executed': self.executed,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._calls)
+            }
@@ -0,0 +1,153 @@
+"""
+TEST: Circuit Breaker State Transitions
+Walks one breaker through closed, open and half-open; needs neither the PHP
+backend nor a trained model
+"""
+import sys
+import time
+
+from circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+
+RESET_SECONDS = 0.05
+
+
+def make_breaker():
+    return CircuitBreaker(failure_threshold=3, reset_seconds=RESET_SECONDS)
+
+def wait_for_reset():
+    time.sleep(RESET_SECONDS * 1.5)
+
+def trip(breaker):
+    """Record failures until the breaker opens"""
+    for _ in range(breaker.failure_threshold):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == OPEN
+
+
+# ==================== TESTS ====================
+
+def test_stays_closed_below_threshold():
+    """Failures below the threshold keep it closed, and a success resets the count"""
+    breaker = make_breaker()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow()
+
+    breaker.record_success()
+    assert breaker.failures == 0
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED, "a success must reset the consecutive failures"
+    assert breaker.trips == 0
+    return True
+
+def test_opens_and_rejects():
+    """Reaching the threshold opens the circuit and calls are refused"""
+    breaker = make_breaker()
+    trip(breaker)
+
+    assert not breaker.allow()
+    assert not breaker.allow()
+    stats = breaker.stats()
+    assert stats['state'] == OPEN and stats['trips'] == 1 and stats['rejected'] == 2, stats
+    return True
+
+def test_half_open_single_trial():
+    """After the reset period exactly one trial call is let through"""
+    breaker = make_breaker()
+    trip(breaker)
+    wait_for_reset()
+
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow(), "only one trial call may be in flight"
+    return True
+
+def test_failed_trial_reopens():
+    """A failed trial reopens the circuit for another reset period"""
+    breaker = make_breaker()
+    trip(breaker)
+    wait_for_reset()
+
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN and breaker.trips == 2
+    assert not breaker.allow(), "the reset period starts again"
+
+    wait_for_reset()
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    return True
+
+def test_skipped_trial_is_handed_on():
+    """A trial that never reached the backend gives the next call the trial"""
+    breaker = make_breaker()
+    trip(breaker)
+    wait_for_reset()
+
+    assert breaker.allow()
+    breaker.record_skipped()
+    assert breaker.state == OPEN
+    assert breaker.trips == 1, "a skipped call is not a failure"
+
+    assert breaker.allow(), "the reset period has already passed"
+    assert breaker.state == HALF_OPEN
+    return True
+
+def test_successful_trial_closes():
+    """A successful trial closes the circuit"""
+    breaker = make_breaker()
+    trip(breaker)
+    wait_for_reset()
+
+    assert breaker.allow()
+    breaker.record_success()
+    stats = breaker.stats()
+    assert stats['state'] == CLOSED and stats['failures'] == 0, stats
+    assert breaker.allow() and breaker.allow()
+
+    trip(breaker)
+    assert breaker.trips == 2
+    return True
+
+def test_skipped_while_closed_is_ignored():
+    """record_skipped does nothing outside the half-open state"""
+    breaker = make_breaker()
+    breaker.record_failure()
+    breaker.record_skipped()
+    assert breaker.state == CLOSED and breaker.failures == 1
+    return True
+
+
+if __name__ == '__main__':
+    print("="*60)
+    print("CIRCUIT BREAKER TEST")
+    print("="*60)
+
+    tests = [
+        ("Closed below threshold", test_stays_closed_below_threshold),
+        ("Opens and rejects", test_opens_and_rejects),
+        ("Half-open single trial", test_half_open_single_trial),
+        ("Failed trial reopens", test_failed_trial_reopens),
+        ("Skipped trial handed on", test_skipped_trial_is_handed_on),
+        ("Successful trial closes", test_successful_trial_closes),
+        ("Skipped while closed", test_skipped_while_closed_is_ignored)
+    ]
+
+    results = []
+    for name, test in tests:
+        try:
+            passed = test()
+        except AssertionError as e:
+            print(f"  {name}: {e}")
+            passed = False
+        results.append((name, passed))
+
+    print()
+    for name, passed in results:
+        print(f"{'✓ PASS' if passed else '❌ FAIL'}  {name}")
+
+    failed = sum(1 for _, passed in results if not passed)
+    print("="*60)
+    print(f"Results: {len(results) - failed}/{len(results)} tests passed")
+    sys.exit(1 if failed else 0)
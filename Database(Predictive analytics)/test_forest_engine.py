@@ -0,0 +1,84 @@
+"""
+TEST: Array-Based Forest Engine
+Checks that FlatForest predictions are identical to the trained sklearn model
+and compares small-batch latency
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from prediction_functions import load_model, FEATURE_ORDER
+from forest_engine import FlatForest
+
+BATCH_SIZES = [1, 10, 24, 240, 10000]
+REPEATS = 50
+
+
+def make_inputs(n, seed=0):
+    """Random feature rows covering the ranges seen in production"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'hour': rng.integers(0, 24, n),
+        'day_of_week': rng.integers(0, 7, n),
+        'is_weekend': rng.integers(0, 2, n),
+        'month': rng.integers(1, 13, n),
+        'prev_hour_passengers': rng.uniform(0, 400, n)
+    }, columns=FEATURE_ORDER)
+
+def time_predict(model, X, repeats=REPEATS):
+    """Median seconds per predict call"""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict(X)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+if __name__ == '__main__':
+    print("="*60)
+    print("FOREST ENGINE TEST")
+    print("="*60)
+    print()
+
+    model = load_model(engine='sklearn')
+    # Parallel prediction sums trees in completion order; compare against the sequential order
+    model.set_params(n_jobs=1)
+
+    start = time.perf_counter()
+    flat = FlatForest.from_sklearn(model)
+    print(f"✓ Flattened {flat.n_trees} trees ({len(flat.feature):,} nodes, "
+          f"depth {flat.max_depth}) in {time.perf_counter() - start:.3f}s")
+    print(f"  Node arrays: {flat.nbytes / (1024 * 1024):.2f} MB")
+    print()
+
+    # Rebuilt from its arrays, the way workers load the saved artifact
+    engine = FlatForest.from_arrays(flat.arrays(), flat.metadata())
+
+    # Test 1: identical predictions
+    print("[Test 1] Predictions match sklearn exactly")
+    X = make_inputs(10000)
+    expected = model.predict(X)
+    actual = engine.predict(X)
+    identical = np.array_equal(expected, actual)
+    print(f"  {'✓ PASS' if identical else '❌ FAIL'} "
+          f"(max abs diff {np.max(np.abs(expected - actual)):.3g})")
+    np.testing.assert_array_equal(actual, expected, err_msg="FlatForest predictions differ from sklearn")
+    print()
+
+    # Test 2: latency by batch size
+    print(f"[Test 2] Latency by batch size ({engine.block_entries:,} (row, tree) pairs per block)")
+    print(f"  {'Rows':>6} | {'sklearn ms':>10} | {'flat ms':>8} | {'Speedup':>7}")
+    for n in BATCH_SIZES:
+        X = make_inputs(n, seed=n)
+        repeats = 5 if n > 1000 else REPEATS
+        sklearn_time = time_predict(model, X, repeats)
+        flat_time = time_predict(engine, X, repeats)
+        print(f"  {n:>6} | {sklearn_time * 1000:>10.3f} | {flat_time * 1000:>8.3f} | "
+              f"{sklearn_time / flat_time:>6.1f}x")
+    print()
+
+    print("="*60)
+    print("✓ ALL TESTS PASSED")
+    print("="*60)
@@ -0,0 +1,230 @@
+"""
+TEST: Prediction Writer Spool, Dead Letters and Idempotent Resends
+Runs against a throwaway local SQLite database, so neither the PHP backend nor
+a trained model is needed
+"""
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+import subprocess
+
+from APIClient import APIClient
+from LocalDataClient import LocalDataClient, SCHEMA
+from prediction_writer import PredictionWriter, CLAIM_SUFFIX
+from config import API_BULK_PREDICTIONS_PER_REQUEST
+
+
+def make_records(n, route_id='118'):
+    """Valid prediction_record rows"""
+    return [{
+        'route_id': route_id,
+        'prediction_datetime': f"2025-11-01T{hour % 24:02d}:00:00",
+        'predicted_passengers': 100 + hour,
+        'confidence': 0.8,
+        'is_peak': hour in (7, 8, 17, 18),
+        'model_version': 'test'
+    } for hour in range(n)]
+
+def make_local_client(directory):
+    """LocalDataClient on an empty database with the full schema"""
+    path = os.path.join(directory, 'predictions.sqlite3')
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    conn.close()
+    return LocalDataClient(db_path=path, verbose=False)
+
+def make_writer(directory, client):
+    """
+    Writer whose spool and dead-letter directories live in a temp directory
+
+    Its background thread never flushes on its own during a test: batches are
+    bigger than any test queues and the flush interval is an hour.
+    """
+    return PredictionWriter(
+        db_client=client, batch_size=50, flush_seconds=3600,
+        spool_dir=os.path.join(directory, 'spool'),
+        dead_letter_dir=os.path.join(directory, 'dead_letter')
+    )
+
+def dead_pid():
+    """PID of a process that has already exited"""
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+class FlakyClient:
+    """Wraps a client and fails its first saves, optionally after they were applied"""
+
+    def __init__(self, client, failures=0, applied=False):
+        """
+        Args:
+            client: Client that actually saves
+            failures: Number of saves that fail
+            applied: Save before failing, like a request that timed out after
+                     the backend committed it
+        """
+        self.client = client
+        self.failures = failures
+        self.applied = applied
+        self.batch_ids = []
+
+    def save_predictions(self, predictions, batch_id=None):
+        self.batch_ids.append(batch_id)
+        if self.failures:
+            self.failures -= 1
+            if self.applied:
+                self.client.save_predictions(predictions, batch_id=batch_id)
+            raise TimeoutError("simulated read timeout")
+        return self.client.save_predictions(predictions, batch_id=batch_id)
+
+
+class RecordingAPIClient(APIClient):
+    """APIClient that records save requests instead of sending them"""
+
+    def __init__(self):
+        super().__init__(base_url='http://backend.invalid/analytics_api.php', verbose=False)
+        self.sent = []
+
+    def _make_request(self, endpoint, method='GET', params=None, data=None, retry=None, idempotent=None):
+        self.sent.append((data['batch_id'], len(data['predictions']), idempotent))
+        return {'success': True, 'inserted': len(data['predictions'])}
+
+
+# ==================== TESTS ====================
+
+def test_spool_and_resend(directory):
+    """A failed flush is spooled, and the retry saves it exactly once"""
+    local = make_local_client(directory)
+    client = FlakyClient(local, failures=1, applied=True)
+    writer = make_writer(directory, client)
+
+    writer.enqueue(make_records(10))
+    assert writer.flush(force=True) == 0
+    assert len(writer.spool_files()) == 1, writer.spool_files()
+    assert local.count_predictions() == 10, "the timed-out request was applied"
+
+    assert writer.retry_spool(force=True) == 10
+    assert writer.spool_files() == []
+    assert len(client.batch_ids) == 2
+    assert client.batch_ids[0] == client.batch_ids[1], "the resend must reuse the batch key"
+    assert local.count_predictions() == 10, "the resent batch was saved twice"
+    writer.stop()
+    return True
+
+def test_api_client_batch_keys(directory):
+    """APIClient derives the same per-request keys whenever a batch is resent"""
+    client = RecordingAPIClient()
+    records = make_records(24) * ((API_BULK_PREDICTIONS_PER_REQUEST // 24) + 1)
+
+    assert client.save_predictions(records, batch_id='batch') == len(records)
+    first = list(client.sent)
+    client.sent.clear()
+    assert client.save_predictions(records, batch_id='batch') == len(records)
+
+    assert len(first) == 2, first
+    assert client.sent == first
+    assert [key for key, _, _ in first] == ['batch-0', 'batch-1']
+    assert all(idempotent for _, _, idempotent in first)
+    return True
+
+def test_failed_retry_releases_claim(directory):
+    """A batch whose retry fails goes back to the spool, unclaimed, with backoff"""
+    local = make_local_client(directory)
+    client = FlakyClient(local, failures=2)
+    writer = make_writer(directory, client)
+
+    writer.enqueue(make_records(10))
+    writer.flush(force=True)
+    spooled = writer.spool_files()
+
+    assert writer.retry_spool(force=True) == 0
+    assert writer.spool_files() == spooled
+    assert not [name for name in os.listdir(writer.spool_dir) if name.endswith(CLAIM_SUFFIX)]
+    assert writer.retry_spool() == 0, "the backoff delay should skip this retry"
+    assert len(client.batch_ids) == 2
+
+    assert writer.retry_spool(force=True) == 10
+    assert local.count_predictions() == 10
+    writer.stop()
+    return True
+
+def test_claims(directory):
+    """A claim held by a live worker is skipped; a dead worker's claim is released"""
+    local = make_local_client(directory)
+    writer = make_writer(directory, local)
+
+    writer._spool(make_records(10, route_id='10'))
+    writer._spool(make_records(10, route_id='36'))
+    live, abandoned = writer.spool_files()
+
+    live_claim = os.path.join(writer.spool_dir, f"{live}.{os.getpid()}{CLAIM_SUFFIX}")
+    os.replace(os.path.join(writer.spool_dir, live), live_claim)
+    os.replace(os.path.join(writer.spool_dir, abandoned),
+               os.path.join(writer.spool_dir, f"{abandoned}.{dead_pid()}{CLAIM_SUFFIX}"))
+
+    assert writer.retry_spool(force=True) == 10
+    assert [p['route_id'] for p in local.get_predictions(limit=100)] == ['36'] * 10
+    assert os.path.exists(live_claim), "a live worker's claim must be left alone"
+    assert writer.spool_files() == []
+    return True
+
+def test_dead_letter(directory):
+    """A batch the backend rejects is dead-lettered and the retry moves on"""
+    local = make_local_client(directory)
+    writer = make_writer(directory, local)
+
+    bad = make_records(10)
+    del bad[3]['predicted_passengers']
+    writer._spool(bad)
+    writer._spool(make_records(10))
+
+    assert writer.retry_spool(force=True) == 10
+    assert writer.spool_files() == []
+    assert len(writer.dead_letter_files()) == 1
+    assert writer.dead_lettered == 10
+    assert local.count_predictions() == 10
+
+    writer.enqueue(bad)
+    assert writer.flush(force=True) == 0
+    assert len(writer.dead_letter_files()) == 2
+    assert writer.spool_files() == [], "rejected batches must not be spooled for retry"
+    writer.stop()
+    return True
+
+
+if __name__ == '__main__':
+    print("="*60)
+    print("PREDICTION WRITER TEST")
+    print("="*60)
+
+    tests = [
+        ("Spooled batch resent once", test_spool_and_resend),
+        ("APIClient batch keys", test_api_client_batch_keys),
+        ("Failed retry releases claim", test_failed_retry_releases_claim),
+        ("Live and abandoned claims", test_claims),
+        ("Dead-letter on rejection", test_dead_letter)
+    ]
+
+    results = []
+    for name, test in tests:
+        directory = tempfile.mkdtemp(prefix='prediction-writer-test-')
+        try:
+            passed = test(directory)
+        except AssertionError as e:
+            print(f"  {name}: {e}")
+            passed = False
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        results.append((name, passed))
+
+    print()
+    for name, passed in results:
+        print(f"{'✓ PASS' if passed else '❌ FAIL'}  {name}")
+
+    failed = sum(1 for _, passed in results if not passed)
+    print("="*60)
+    print(f"Results: {len(results) - failed}/{len(results)} tests passed")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,156 @@
+"""
+TEST: Single Flight Request Coalescing
+Concurrent identical calls must share one execution; needs neither the PHP
+backend nor a trained model
+"""
+import sys
+import threading
+
+from single_flight import SingleFlight
+
+THREADS = 8
+TIMEOUT = 5
+
+
+def run_concurrently(sf, key, fn, n):
+    """
+    Call sf.do(key, fn) from n threads once the leader's call is in flight
+
+    Returns:
+        List of (result, error) per thread
+    """
+    outcomes = [None] * n
+
+    def worker(index):
+        try:
+            outcomes[index] = (sf.do(key, fn), None)
+        except Exception as e:
+            outcomes[index] = (None, e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(TIMEOUT)
+        assert not thread.is_alive(), "a caller never returned"
+    return outcomes
+
+def leader_waiting_for(sf, joined, release=None):
+    """
+    Build a call that blocks until `joined` other callers have coalesced onto it
+
+    Args:
+        sf: SingleFlight being tested
+        joined: Number of callers expected to join
+        release: Function run once they have, whose value is returned
+
+    Returns:
+        (fn, counter) where counter['runs'] counts executions of fn
+    """
+    counter = {'runs': 0}
+    everyone_joined = threading.Event()
+
+    def watch():
+        while sf.stats()['coalesced'] < joined:
+            threading.Event().wait(0.001)
+        everyone_joined.set()
+
+    def fn():
+        counter['runs'] += 1
+        threading.Thread(target=watch, daemon=True).start()
+        assert everyone_joined.wait(TIMEOUT), "callers did not join the call in flight"
+        return release() if release else {'route_id': '118', 'stops': [1, 2, 3]}
+
+    return fn, counter
+
+
+# ==================== TESTS ====================
+
+def test_coalesces_concurrent_calls():
+    """N concurrent callers on one key run fn once and get equal, unshared results"""
+    sf = SingleFlight()
+    fn, counter = leader_waiting_for(sf, THREADS - 1)
+
+    outcomes = run_concurrently(sf, 'route_details:118', fn, THREADS)
+
+    assert counter['runs'] == 1, counter
+    assert all(error is None for _, error in outcomes), outcomes
+    results = [result for result, _ in outcomes]
+    assert all(result == results[0] for result in results)
+    assert len({id(result) for result in results}) == THREADS, "callers must not share one object"
+    assert len({id(result['stops']) for result in results}) == THREADS, "copies must be deep"
+
+    stats = sf.stats()
+    assert stats['calls'] == THREADS, stats
+    assert stats['executed'] == 1, stats
+    assert stats['coalesced'] == THREADS - 1, stats
+    assert stats['in_flight'] == 0, stats
+    return True
+
+def test_shares_exceptions():
+    """Every caller that joined a failing call sees its exception"""
+    sf = SingleFlight()
+
+    def fail():
+        raise ConnectionError("backend down")
+
+    fn, counter = leader_waiting_for(sf, THREADS - 1, release=fail)
+    outcomes = run_concurrently(sf, 'routes', fn, THREADS)
+
+    assert counter['runs'] == 1, counter
+    assert all(isinstance(error, ConnectionError) for _, error in outcomes), outcomes
+    assert sf.stats()['in_flight'] == 0
+    return True
+
+def test_sequential_calls_not_coalesced():
+    """Calls that finish before the next one starts each run fn"""
+    sf = SingleFlight()
+    counter = {'runs': 0}
+
+    def fn():
+        counter['runs'] += 1
+        return counter['runs']
+
+    assert [sf.do('routes', fn) for _ in range(3)] == [1, 2, 3]
+    stats = sf.stats()
+    assert stats['executed'] == 3 and stats['coalesced'] == 0, stats
+    return True
+
+def test_keys_are_independent():
+    """Different keys never share a call"""
+    sf = SingleFlight()
+    assert sf.do('route_details:10', lambda: '10') == '10'
+    assert sf.do('route_details:36', lambda: '36') == '36'
+    assert sf.stats()['executed'] == 2
+    return True
+
+
+if __name__ == '__main__':
+    print("="*60)
+    print("SINGLE FLIGHT TEST")
+    print("="*60)
+
+    tests = [
+        ("Concurrent calls coalesce", test_coalesces_concurrent_calls),
+        ("Exceptions are shared", test_shares_exceptions),
+        ("Sequential calls run separately", test_sequential_calls_not_coalesced),
+        ("Keys are independent", test_keys_are_independent)
+    ]
+
+    results = []
+    for name, test in tests:
+        try:
+            passed = test()
+        except AssertionError as e:
+            print(f"  {name}: {e}")
+            passed = False
+        results.append((name, passed))
+
+    print()
+    for name, passed in results:
+        print(f"{'✓ PASS' if passed else '❌ FAIL'}  {name}")
+
+    failed = sum(1 for _, passed in results if not passed)
+    print("="*60)
+    print(f"Results: {len(results) - failed}/{len(results)} tests passed")
+    sys.exit(1 if failed else 0)
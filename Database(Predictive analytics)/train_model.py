@@ -12,15 +12,22 @@ from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 from datetime import datetime
 
 from DataAggregator import DataAggregator
-from config import RANDOM_STATE, TEST_SIZE, N_ESTIMATORS, MODEL_FILE, AVAILABLE_ROUTES
+from feature_store import FeatureStore
+from model_artifacts import save_model_artifact
+from config import RANDOM_STATE, TEST_SIZE, N_ESTIMATORS, MODEL_FILE, MODEL_ARTIFACT_DIR, AVAILABLE_ROUTES
 
-def load_training_data_from_db(routes=None, months=None):
+def load_training_data_from_db(routes=None, months=None, concurrent=True, use_feature_store=True):
     """
     Load training data from MySQL database
     
+    With the feature store, only (route, month) partitions that are not on disk
+    yet are fetched; everything else is read from the local shards.
+    
     Args:
         routes: List of route IDs (default: all available)
         months: List of months in YYYYMM format (default: all available)
+        concurrent: Fetch all (route, month) slices concurrently (default True)
+        use_feature_store: Sync and read the partitioned feature store (default True)
     
     Returns:
         DataFrame ready for training
@@ -33,7 +40,18 @@ def load_training_data_from_db(routes=None, months=None):
     aggregator = DataAggregator()
     
     # Prepare training data
-    df = aggregator.prepare_training_data(routes=routes, months=months)
+    if use_feature_store:
+        if routes is None:
+            routes = AVAILABLE_ROUTES
+        if months is None:
+            months = aggregator.api.get_available_months()
+        
+        store = FeatureStore()
+        store.sync(aggregator, routes=routes, months=months, concurrent=concurrent)
+        df = store.load(routes=routes, months=months)
+        print(f"\n✓ Training data loaded from feature store: {len(df):,} records")
+    else:
+        df = aggregator.prepare_training_data(routes=routes, months=months, concurrent=concurrent)
     
     if df.empty:
         raise ValueError("No training data loaded from database!")
@@ -223,11 +241,19 @@ def save_model(model, metrics):
         pickle.dump(metrics, f)
     
     print(f"✓ Metrics saved to: {metrics_file}")
+    
+    # Save memory-mappable artifact served by the API workers
+    manifest = save_model_artifact(model, MODEL_ARTIFACT_DIR, metrics=metrics)
+    print(f"✓ Model artifact saved to: {MODEL_ARTIFACT_DIR}")
+    print(f"  Version: {manifest['model_version']}")
+    print(f"  SHA-256: {manifest['sha256']}")
     print()
     
     # Display file info
     model_size = os.path.getsize(MODEL_FILE) / (1024 * 1024)
+    artifact_size = sum(f['bytes'] for f in manifest['files'].values()) / (1024 * 1024)
     print(f"Model file size: {model_size:.2f} MB")
+    print(f"Artifact size: {artifact_size:.2f} MB")
 
 
 if __name__ == '__main__':